@@ -4,13 +4,66 @@ warnings.filterwarnings("ignore", message="pkg_resources is deprecated", categor
 
 import argparse
 import asyncio
+import os
+import time
+from contextlib import AsyncExitStack
 from colorama import init, Fore, Style
 
-from aznuke.src.auth import get_subscriptions
-from aznuke.src.discovery import discover_all_resources
-from aznuke.src.filtering import load_exclusions, filter_resources
-from aznuke.src.deletion import delete_resources
+from aznuke.src.auth import (
+    CachedTokenCredential,
+    SubscriptionIndex,
+    get_credentials,
+    get_subscriptions,
+    token_claims,
+    AUTH_METHODS,
+    MANAGEMENT_SCOPE,
+)
+from aznuke.src.discovery import (
+    discover_all_resources,
+    iter_all_resource_batches,
+    normalize_region,
+    DEFAULT_DISCOVERY_WORKERS,
+    DEFAULT_SHARD_WORKERS,
+)
+from aznuke.src.resource_graph import (
+    discover_all_resources_graph,
+    iter_all_resource_batches_graph,
+    iter_incremental_resource_batches_graph,
+    CHANGE_HISTORY_RETENTION,
+    CHANGE_RECORD_DELAY,
+)
+from aznuke.src.columnar import require_numpy, COLUMNAR_BATCH_SIZE
+from aznuke.src.filtering import (
+    load_exclusions,
+    filter_resources,
+    ExclusionConfigError,
+    ParallelFilter,
+    FILTER_ENGINES,
+    PARALLEL_BATCH_SIZE,
+)
+from aznuke.src.explain import ExclusionExplainer
+from aznuke.src.tags import TagIndex, parse_tag, select_tagged
+from aznuke.src.deletion import (
+    delete_resources,
+    verify_resources,
+    DEFAULT_MAX_PARALLEL,
+    DEFAULT_MAX_PARALLEL_PER_SUBSCRIPTION,
+)
 from aznuke.src.safety import require_confirmation, is_protected_subscription
+from aznuke.src.report import ScanSummary, JsonScanWriter
+from aznuke.src.cache import (
+    InventoryCache,
+    SubscriptionCache,
+    TokenStore,
+    cache_key,
+    get_cache_dir,
+    subscription_cache_key,
+    token_store_name,
+    DEFAULT_CACHE_TTL,
+)
+from aznuke.src import aio
+from aznuke.src.clients import client_registry, subscription_tenants
+from aznuke.src.lro import lro_manager
 from aznuke.src.animations import (
     show_startup_animation,
     async_spinner,
@@ -25,27 +78,298 @@ init(autoreset=True)
 # Default configuration file path
 DEFAULT_CONFIG_PATH = "config/exclusions.yaml"
 
-async def get_subscriptions_async(credentials):
+async def open_credentials(args, stack):
+    """
+    Create the Azure credentials for a command.
+    
+    In native async mode the async credential and the shared aiohttp session
+    are registered on the exit stack so they are closed when the command ends.
+    Tokens are cached and refreshed ahead of expiry, and with --token-cache
+    kept in an encrypted store between runs. Management clients are shared
+    for the whole command through a client registry, also closed with the stack.
+    """
+    store = open_token_store(args) if args.token_cache else None
+    if args.native_async:
+        await stack.enter_async_context(aio.shared_session())
+        credentials = aio.AsyncCachedTokenCredential(aio.get_async_credentials(args.all_tenants, args.auth), store)
+        stack.push_async_callback(credentials.close)
+    else:
+        credentials = CachedTokenCredential(get_credentials(args.auth, args.all_tenants), store)
+        stack.callback(credentials.close)
+    
+    await stack.enter_async_context(client_registry())
+    return credentials
+
+def open_token_store(args):
+    """Return the persistent token store for the selected credential type and identity, or None if unavailable"""
+    try:
+        return TokenStore(token_store_name(args.auth, args.all_tenants))
+    except Exception as e:
+        print(f"{Fore.YELLOW}Warning: Persistent token cache unavailable ({e}); "
+              f"tokens are kept for this run only.{Style.RESET_ALL}")
+        return None
+
+async def get_subscriptions_async(credentials, all_tenants=False):
     """Async wrapper for getting subscriptions"""
-    result = await asyncio.to_thread(get_subscriptions, credentials)
+    if aio.is_async_credential(credentials):
+        return await aio.get_subscriptions_aio(credentials, all_tenants)
+    result = await asyncio.to_thread(get_subscriptions, credentials, all_tenants)
     return result
 
-async def discover_resources_async(credentials, subscriptions, resource_types=None):
+async def load_subscriptions_async(args, credentials):
+    """
+    Return the accessible subscriptions, reusing the subscription cache when fresh.
+    
+    Cache entries are keyed by the signed-in identity, read from the claims
+    of its management token.
+    """
+    if args.no_cache:
+        return await get_subscriptions_async(credentials, args.all_tenants)
+    
+    token = await aio.call(credentials.get_token, MANAGEMENT_SCOPE)
+    claims = token_claims(token.token)
+    if not claims.get("oid") and not claims.get("sub"):
+        return await get_subscriptions_async(credentials, args.all_tenants)
+    
+    cache = SubscriptionCache()
+    key = subscription_cache_key(claims, args.all_tenants)
+    if not args.refresh:
+        subscriptions = cache.read(key)
+        if subscriptions is not None:
+            return subscriptions
+    
+    subscriptions = await get_subscriptions_async(credentials, args.all_tenants)
+    try:
+        cache.write(key, subscriptions)
+    except OSError:
+        pass
+    return subscriptions
+
+async def discover_resources_async(credentials, subscriptions, resource_types=None,
+                                  max_workers=DEFAULT_DISCOVERY_WORKERS, backend="arm", regions=None):
     """Async wrapper for resource discovery"""
-    result = await asyncio.to_thread(discover_all_resources, credentials, subscriptions, resource_types)
+    if backend == "graph":
+        result = await asyncio.to_thread(discover_all_resources_graph, credentials, subscriptions, resource_types,
+                                         regions=regions)
+    else:
+        result = await asyncio.to_thread(discover_all_resources, credentials, subscriptions, resource_types,
+                                         max_workers, regions=regions)
     return result
 
-async def filter_resources_async(all_resources, exclusions, progress_bar):
+async def iterate_in_thread(batches):
+    """Yield the items of a blocking iterator without blocking the event loop"""
+    try:
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            yield batch
+    finally:
+        await asyncio.to_thread(batches.close)
+
+async def stream_resources_async(credentials, subscriptions, resource_types=None,
+                                 max_workers=DEFAULT_DISCOVERY_WORKERS, backend="arm", regions=None,
+                                 errors=None, details=False, shard_workers=None):
+    """Yield batches of discovered resources without waiting for the whole scan"""
+    if backend != "graph" and aio.is_async_credential(credentials):
+        # Native async discovery runs entirely on the event loop
+        async for batch in aio.iter_all_resource_batches_aio(credentials, subscriptions, resource_types,
+                                                             max_workers, errors, regions=regions,
+                                                             details=details, shard_workers=shard_workers):
+            yield batch
+        return
+    
+    if backend == "graph":
+        sync_credentials = await aio.to_sync_credential(credentials)
+        batches = iter_all_resource_batches_graph(sync_credentials, subscriptions, resource_types,
+                                                  regions=regions, details=details)
+    else:
+        batches = iter_all_resource_batches(credentials, subscriptions, resource_types, max_workers, errors,
+                                            regions=regions, details=details, shard_workers=shard_workers)
+    
+    async for batch in iterate_in_thread(batches):
+        yield batch
+
+async def stream_incremental_async(credentials, subscriptions, snapshot_batches, since,
+                                   resource_types=None, regions=None, details=False):
+    """Yield batches of a snapshot brought up to date with the changes made after since"""
+    sync_credentials = await aio.to_sync_credential(credentials)
+    batches = iter_incremental_resource_batches_graph(sync_credentials, subscriptions, snapshot_batches, since,
+                                                      resource_types, regions=regions, details=details)
+    async for batch in iterate_in_thread(batches):
+        yield batch
+
+async def write_through_cache(batches, writer, errors, warning=None):
+    """
+    Yield batches while writing them to the cache, committing once discovery completes.
+    
+    A cache that cannot be written is given up on without interrupting the
+    stream; warning, when given, is printed with the error.
+    """
+    def give_up(e):
+        writer.discard()
+        if warning:
+            print(f"{Fore.YELLOW}Warning: {warning}: {e}{Style.RESET_ALL}")
+    
+    writing = True
+    try:
+        async for batch in batches:
+            if writing:
+                try:
+                    writer.add(batch)
+                except OSError as e:
+                    give_up(e)
+                    writing = False
+            yield batch
+    except BaseException:
+        writer.discard()
+        raise
+    
+    # A partial inventory would hide the resources of the failed subscriptions
+    if errors or not writing:
+        writer.discard()
+        return
+    try:
+        writer.commit()
+    except OSError as e:
+        give_up(e)
+
+def open_snapshot_store():
+    """Return the store holding the snapshots used by --incremental"""
+    return InventoryCache(os.path.join(get_cache_dir(), "snapshots"), ttl=CHANGE_HISTORY_RETENTION)
+
+def open_inventory_cache(args):
+    """Return the inventory cache for a command, or None when caching is disabled"""
+    if args.no_cache:
+        return None
+    return InventoryCache(ttl=args.cache_ttl)
+
+def open_resource_stream(args, cache, credentials, subscriptions, resource_types=None, regions=None,
+                         quiet=False, details=False):
+    """
+    Return (batches, from_cache) for a command.
+    
+    A fresh cached inventory for the same selection is reused unless --refresh
+    was given. Otherwise resources are discovered and written to the cache as
+    they stream through. With --incremental the previous snapshot is brought
+    up to date from the Resource Graph change history instead of being
+    rediscovered. from_cache is True whenever the inventory was not fully
+    rediscovered by this run. details asks discovery for the extra fields
+    deletion handlers need.
+    """
+    if cache or args.incremental:
+        key = cache_key(subscriptions, resource_types, regions, args.backend, details)
+    else:
+        key = None
+    
+    if cache and not args.refresh:
+        cached = cache.read(key)
+        if cached:
+            created, batches = cached
+            if not quiet:
+                print(f"{Fore.CYAN}Using cached inventory from {int(time.time() - created)}s ago "
+                      f"(use --refresh to rediscover){Style.RESET_ALL}")
+            return iterate_in_thread(batches), True
+    
+    errors = []
+    snapshot = None
+    if args.incremental and args.backend != "graph":
+        if not quiet:
+            print(f"{Fore.YELLOW}Warning: --incremental needs --backend graph; running a full scan{Style.RESET_ALL}")
+    elif args.incremental:
+        snapshots = open_snapshot_store()
+        snapshot = snapshots.read(key)
+    
+    if snapshot:
+        created, snapshot_batches = snapshot
+        if not quiet:
+            print(f"{Fore.CYAN}Applying changes since the snapshot from "
+                  f"{int(time.time() - created)}s ago{Style.RESET_ALL}")
+        batches = stream_incremental_async(credentials, subscriptions, snapshot_batches,
+                                           created - CHANGE_RECORD_DELAY, resource_types, regions, details)
+    else:
+        shard_workers = DEFAULT_SHARD_WORKERS if args.shard_by_resource_group else None
+        batches = stream_resources_async(credentials, subscriptions, resource_types, args.discovery_workers,
+                                         args.backend, regions, errors=errors, details=details,
+                                         shard_workers=shard_workers)
+    
+    if args.incremental and args.backend == "graph":
+        batches = write_through_cache(batches, snapshots.writer(key), errors,
+                                      None if quiet else "Snapshot not saved")
+    if cache:
+        batches = write_through_cache(batches, cache.writer(key), errors,
+                                      None if quiet else "Inventory cache disabled")
+    return batches, snapshot is not None
+
+async def filter_resources_async(all_resources, exclusions, progress_bar, engine="python", tag_index=None,
+                                 explain=None):
     """Async wrapper for resource filtering"""
-    result = await asyncio.to_thread(filter_resources, all_resources, exclusions, progress_bar)
+    result = await asyncio.to_thread(filter_resources, all_resources, exclusions, progress_bar, engine, tag_index,
+                                     explain)
     return result
 
+def index_batch(batch, selector):
+    """Index the tags of a batch and keep the resources matching every --tag, returning (batch, tag_index)"""
+    tag_index = TagIndex(batch)
+    return select_tagged(batch, selector, tag_index), tag_index
+
+async def select_tagged_async(batch, selector):
+    """
+    Return (batch, tag_index) for a filter batch.
+    
+    With a --tag selector the tags of the batch are indexed once, and the
+    same index answers the tag exclusions; without one tag_index is None.
+    """
+    if not selector:
+        return batch, None
+    return await asyncio.to_thread(index_batch, batch, selector)
+
+async def rebatch_async(batches, size):
+    """Merge a stream of batches into batches of at least size resources (the last may be smaller)"""
+    pending = []
+    async for batch in batches:
+        pending.extend(batch)
+        if len(pending) >= size:
+            yield pending
+            pending = []
+    if pending:
+        yield pending
+
+def open_filter_batches(args, batches):
+    """Gather the discovery stream into large batches for the columnar and parallel filter engines"""
+    if args.filter_engine == "columnar":
+        require_numpy()
+        return rebatch_async(batches, COLUMNAR_BATCH_SIZE)
+    if args.filter_engine == "parallel":
+        return rebatch_async(batches, PARALLEL_BATCH_SIZE)
+    return batches
+
+def open_exclusions(args, stack):
+    """Load the exclusion rules, on a worker pool closed with the stack for the parallel filter engine"""
+    exclusions = load_exclusions(args.config)
+    if args.filter_engine == "parallel":
+        return stack.enter_context(ParallelFilter(exclusions))
+    return exclusions
+
 def parse_resource_types(checks_str):
     """Parse comma-separated resource types string"""
     if not checks_str:
         return None
     return [check.strip() for check in checks_str.split(',')]
 
+def parse_tag_selector(value):
+    """Parse a --tag key=value argument"""
+    try:
+        return parse_tag(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def parse_regions(region_str):
+    """Parse comma-separated regions string into normalized region names"""
+    if not region_str:
+        return None
+    return [normalize_region(region) for region in region_str.split(',') if region.strip()]
+
 
 def create_parser(default_config_path=DEFAULT_CONFIG_PATH, version_string=None):
     """Create the Azure Nuke argument parser."""
@@ -64,6 +388,9 @@ Examples:
     # Scan a specific subscription and region
     aznuke scan --profile production --region westus2
 
+    # Scan several regions
+    aznuke scan --region westus2,eastus
+
     # Scan only Storage and VM resources
     aznuke scan --checks storage,virtualmachines
 
@@ -86,31 +413,103 @@ Examples:
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
 
     scan_parser = subparsers.add_parser("scan", help="Scan for resources in Azure")
-    scan_parser.add_argument("--profile", help="Azure subscription profile name")
-    scan_parser.add_argument("--region", help="Azure region to scan")
+    scan_parser.add_argument("--profile", help="Azure subscription name or ID")
+    scan_parser.add_argument("--all-tenants", action="store_true",
+                             help="Include the subscriptions of every tenant you can access")
+    scan_parser.add_argument("--auth", choices=AUTH_METHODS, default="default",
+                             help="Credential type to use instead of probing the whole DefaultAzureCredential chain")
+    scan_parser.add_argument("--token-cache", action="store_true",
+                             help="Keep access tokens in an encrypted on-disk cache between runs")
+    scan_parser.add_argument("--region", help="Comma-separated list of Azure regions to scan")
+    scan_parser.add_argument("--tag", action="append", type=parse_tag_selector, metavar="KEY=VALUE",
+                             help="Only scan resources with this tag (repeat to require several tags)")
     scan_parser.add_argument("--checks", help="Comma-separated list of resource types to scan")
+    scan_parser.add_argument("--backend", choices=["arm", "graph"], default="arm",
+                             help="Discovery backend: per-subscription ARM listing or Azure Resource Graph")
+    scan_parser.add_argument("--discovery-workers", type=int, default=None,
+                             help=f"Number of subscriptions to scan concurrently (default: {DEFAULT_DISCOVERY_WORKERS}, "
+                                  f"or {aio.DEFAULT_MAX_CONCURRENCY} with --native-async)")
+    scan_parser.add_argument("--shard-by-resource-group", action="store_true",
+                             help="List each subscription's resource groups concurrently instead of "
+                                  "in one page chain (for very large subscriptions)")
     scan_parser.add_argument("--output", choices=["text", "json"], default="text",
                              help="Output format (text or json)")
     scan_parser.add_argument("--severity", choices=["low", "medium", "high"],
                              help="Filter results by severity")
+    scan_parser.add_argument("--filter-engine", choices=FILTER_ENGINES, default="python",
+                             help="Exclusion engine: per resource (python), column arrays (columnar, needs numpy) "
+                                  "or worker processes (parallel)")
+    scan_parser.add_argument("--explain", metavar="PATH",
+                             help="Write a JSON report of the exclusion rules that matched and their sampled cost")
     scan_parser.add_argument("--config", default=default_config_path,
                              help="Path to exclusions configuration file")
+    scan_parser.add_argument("--cache-ttl", type=int, default=DEFAULT_CACHE_TTL,
+                             help="Seconds a cached inventory is reused by follow-up commands")
+    scan_parser.add_argument("--refresh", action="store_true",
+                             help="Rediscover resources instead of using the cached inventory")
+    scan_parser.add_argument("--no-cache", action="store_true",
+                             help="Neither read nor write the inventory cache")
+    scan_parser.add_argument("--incremental", action="store_true",
+                             help="Update the previous snapshot from the change history instead of "
+                                  "rediscovering everything (requires --backend graph)")
+    scan_parser.add_argument("--native-async", action="store_true",
+                             help="Use the Azure SDK async clients on a single event loop (requires aiohttp)")
     scan_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
 
     delete_parser = subparsers.add_parser("delete", help="Delete resources in Azure")
-    delete_parser.add_argument("--profile", help="Azure subscription profile name")
-    delete_parser.add_argument("--region", help="Azure region to target")
+    delete_parser.add_argument("--profile", help="Azure subscription name or ID")
+    delete_parser.add_argument("--all-tenants", action="store_true",
+                               help="Include the subscriptions of every tenant you can access")
+    delete_parser.add_argument("--auth", choices=AUTH_METHODS, default="default",
+                               help="Credential type to use instead of probing the whole DefaultAzureCredential chain")
+    delete_parser.add_argument("--token-cache", action="store_true",
+                               help="Keep access tokens in an encrypted on-disk cache between runs")
+    delete_parser.add_argument("--region", help="Comma-separated list of Azure regions to target")
+    delete_parser.add_argument("--tag", action="append", type=parse_tag_selector, metavar="KEY=VALUE",
+                               help="Only target resources with this tag (repeat to require several tags)")
     delete_parser.add_argument("--checks", help="Comma-separated list of resource types to delete")
+    delete_parser.add_argument("--backend", choices=["arm", "graph"], default="arm",
+                               help="Discovery backend: per-subscription ARM listing or Azure Resource Graph")
+    delete_parser.add_argument("--discovery-workers", type=int, default=None,
+                               help=f"Number of subscriptions to scan concurrently (default: {DEFAULT_DISCOVERY_WORKERS}, "
+                                    f"or {aio.DEFAULT_MAX_CONCURRENCY} with --native-async)")
+    delete_parser.add_argument("--shard-by-resource-group", action="store_true",
+                               help="List each subscription's resource groups concurrently instead of "
+                                    "in one page chain (for very large subscriptions)")
     delete_parser.add_argument("--dry-run", action="store_true",
                                help="Perform a dry run without actually deleting resources")
+    delete_parser.add_argument("--filter-engine", choices=FILTER_ENGINES, default="python",
+                               help="Exclusion engine: per resource (python), column arrays (columnar, needs numpy) "
+                                    "or worker processes (parallel)")
+    delete_parser.add_argument("--explain", metavar="PATH",
+                               help="Write a JSON report of the exclusion rules that matched and their sampled cost")
     delete_parser.add_argument("--config", default=default_config_path,
                                help="Path to exclusions configuration file")
     delete_parser.add_argument("--protected-subscriptions", nargs="+",
                                help="List of subscription IDs that should not be modified")
+    delete_parser.add_argument("--max-parallel", type=int, default=DEFAULT_MAX_PARALLEL,
+                               help="Maximum number of resources deleted at the same time")
+    delete_parser.add_argument("--max-parallel-per-subscription", type=int,
+                               default=DEFAULT_MAX_PARALLEL_PER_SUBSCRIPTION,
+                               help="Maximum number of resources of one subscription deleted at the same time")
     delete_parser.add_argument("--cleanup-empty-resource-groups", action="store_true",
                                help="Delete resource groups that are empty after deleting selected resources")
     delete_parser.add_argument("--yes", "-y", action="store_true",
                                help="Skip confirmation prompt")
+    delete_parser.add_argument("--cache-ttl", type=int, default=DEFAULT_CACHE_TTL,
+                               help="Seconds a cached inventory is reused by follow-up commands")
+    delete_parser.add_argument("--refresh", action="store_true",
+                               help="Rediscover resources instead of using the cached inventory")
+    delete_parser.add_argument("--no-cache", action="store_true",
+                               help="Neither read nor write the inventory cache")
+    delete_parser.add_argument("--fetch-details", action="store_true",
+                               help="Fetch the fields deletion handlers need during discovery instead of "
+                                    "looking them up per resource")
+    delete_parser.add_argument("--incremental", action="store_true",
+                               help="Update the previous snapshot from the change history instead of "
+                                    "rediscovering everything (requires --backend graph)")
+    delete_parser.add_argument("--native-async", action="store_true",
+                               help="Use the Azure SDK async clients on a single event loop (requires aiohttp)")
     delete_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
 
     return parser
@@ -127,108 +526,108 @@ async def dispatch_command(args, parser):
 
 async def cmd_scan(args):
     """Scan for resources in Azure"""
+    json_writer = None
+    stack = AsyncExitStack()
     try:
         # Show startup animation if not in JSON output mode
         if args.output != 'json':
             show_startup_animation()
         
-        from azure.identity import DefaultAzureCredential
-        credentials = DefaultAzureCredential()
+        # Load and validate exclusions before signing in, so a broken file
+        # fails fast and resources can be filtered as they arrive
+        exclusions = open_exclusions(args, stack)
+        explainer = ExclusionExplainer(exclusions) if args.explain else None
+        
+        credentials = await open_credentials(args, stack)
         
         # Get subscriptions with proper async handling
         subscriptions = await async_spinner("Retrieving subscriptions...", 
-                                            get_subscriptions_async(credentials), 
+                                            load_subscriptions_async(args, credentials),
                                             silent=args.output == 'json')
         
         # Filter subscriptions by profile if specified
         if args.profile:
-            subscriptions = [sub for sub in subscriptions if sub.display_name.lower() == args.profile.lower()]
+            subscriptions = SubscriptionIndex(subscriptions).find(args.profile)
             if not subscriptions:
                 print(f"{Fore.RED}No subscriptions found matching profile '{args.profile}'{Style.RESET_ALL}")
                 return
         
-        # Filter subscriptions by region if specified
-        if args.region:
-            # Note: This is a simplification. In a real app, you'd need to filter resources by region, not subscriptions
-            print(f"{Fore.CYAN}Filtering by region: {args.region}{Style.RESET_ALL}")
+        # Subscriptions of other tenants only accept tokens of their own tenant
+        if args.all_tenants:
+            stack.enter_context(subscription_tenants(subscriptions))
+        
+        # Regions are pushed down into the discovery queries
+        regions = parse_regions(args.region)
+        if regions and args.output != 'json':
+            print(f"{Fore.CYAN}Filtering by region: {', '.join(regions)}{Style.RESET_ALL}")
         
         if args.output != 'json':
             print(f"{Fore.CYAN}Found {len(subscriptions)} accessible subscriptions{Style.RESET_ALL}")
         
+        tag_selector = dict(args.tag) if args.tag else None
+        if tag_selector and args.output != 'json':
+            print(f"{Fore.CYAN}Filtering by tag: "
+                  f"{', '.join(f'{key}={value}' for key, value in tag_selector.items())}{Style.RESET_ALL}")
+        
         # Convert checks to resource types
         resource_types = parse_resource_types(args.checks)
         
-        # Discover resources with progress animation
-        if args.output != 'json':
-            print(f"{Fore.YELLOW}[DISCOVERING]{Style.RESET_ALL} Starting resource discovery...")
-        
-        all_resources = await async_spinner("Scanning Azure resources...", 
-                                           discover_resources_async(credentials, subscriptions, resource_types),
-                                           silent=args.output == 'json')
-        
-        if args.output != 'json':
-            print(f"{Fore.CYAN}Found {len(all_resources)} total resources{Style.RESET_ALL}")
-        
-        # Load exclusions and filter resources
-        exclusions = load_exclusions(args.config)
+        # Filter by severity if specified
+        if args.severity:
+            # This is a placeholder - you would implement severity filtering
+            print(f"{Fore.CYAN}Filtering by severity: {args.severity}{Style.RESET_ALL}")
         
         if args.output != 'json':
-            progress_bar = create_progress_bar(len(all_resources), "Filtering resources")
+            print(f"{Fore.YELLOW}[DISCOVERING]{Style.RESET_ALL} Starting resource discovery...")
+            summary = report = ScanSummary()
+            progress_bar = create_progress_bar(None, "Scanning resources")
         else:
+            json_writer = report = JsonScanWriter()
+            summary = json_writer.summary
             progress_bar = None
-            
-        # Use async wrapper for filtering
-        resources_to_process, resources_to_preserve = await filter_resources_async(
-            all_resources, exclusions, progress_bar
-        )
         
-        if progress_bar:
+        # Discover and filter resources page by page; the report keeps running
+        # totals instead of the resources themselves
+        batches, _ = open_resource_stream(args, open_inventory_cache(args), credentials, subscriptions,
+                                          resource_types, regions, quiet=args.output == 'json')
+        async for batch in open_filter_batches(args, batches):
+            batch, tag_index = await select_tagged_async(batch, tag_selector)
+            resources_to_process, resources_to_preserve = await filter_resources_async(
+                batch, exclusions, progress_bar, args.filter_engine, tag_index, explainer
+            )
+            for resource in resources_to_process:
+                report.add(resource, preserved=False)
+            for resource in resources_to_preserve:
+                report.add(resource, preserved=True)
+        
+        if progress_bar is not None:
             progress_bar.close()
         
-        # Filter by severity if specified
-        if args.severity:
-            # This is a placeholder - you would implement severity filtering
-            print(f"{Fore.CYAN}Filtering by severity: {args.severity}{Style.RESET_ALL}")
-            # resources_to_process = [r for r in resources_to_process if r.severity == args.severity]
+        if explainer is not None:
+            explainer.write(args.explain)
+            if args.output != 'json':
+                print(f"{Fore.CYAN}Exclusion report written to {args.explain}{Style.RESET_ALL}")
         
-        if args.output != 'json':
-            print(f"{Fore.YELLOW}[SELECTED]{Style.RESET_ALL} {len(resources_to_process)} resources identified")
-            print(f"{Fore.GREEN}[EXCLUDED]{Style.RESET_ALL} {len(resources_to_preserve)} resources excluded")
+        if json_writer:
+            json_writer.close()
+        else:
+            print(f"{Fore.CYAN}Found {summary.total_resources} total resources{Style.RESET_ALL}")
+            print(f"{Fore.YELLOW}[SELECTED]{Style.RESET_ALL} {summary.resources_identified} resources identified")
+            print(f"{Fore.GREEN}[EXCLUDED]{Style.RESET_ALL} {summary.resources_excluded} resources excluded")
             
             # Show summary of resources by type
-            resources_by_type = {}
-            for resource in resources_to_process:
-                if resource.type not in resources_by_type:
-                    resources_by_type[resource.type] = []
-                resources_by_type[resource.type].append(resource)
-            
             print(f"\n{Fore.CYAN}Resources Selected:{Style.RESET_ALL}")
-            show_summary_by_type(resources_by_type)
-        else:
-            # Output in JSON format
-            import json
-            result = {
-                "scan_results": {
-                    "total_resources": len(all_resources),
-                    "resources_identified": len(resources_to_process),
-                    "resources_excluded": len(resources_to_preserve),
-                    "resources": []
-                }
-            }
-            
-            for resource in resources_to_process:
-                result["scan_results"]["resources"].append({
-                    "name": resource.name,
-                    "type": resource.type,
-                    "subscription_id": resource.subscription_id,
-                    "resource_group": resource.resource_group
-                })
-            
-            print(json.dumps(result, indent=2))
+            summary.show()
         
     except KeyboardInterrupt:
         if args.output != 'json':
             print(f"\n{Fore.YELLOW}[INTERRUPTED]{Style.RESET_ALL} Operation cancelled by user")
+    except ExclusionConfigError as e:
+        if args.output != 'json':
+            print(f"\n{Fore.RED}[CONFIG ERROR]{Style.RESET_ALL} {e}")
+        else:
+            import json
+            print(json.dumps({"error": str(e)}))
     except Exception as e:
         if args.output != 'json':
             print(f"\n{Fore.RED}[ERROR]{Style.RESET_ALL} An unexpected error occurred: {e}")
@@ -236,29 +635,41 @@ async def cmd_scan(args):
             if args.verbose:
                 import traceback
                 print(traceback.format_exc())
+        elif json_writer:
+            # Keep the partially written document valid
+            json_writer.close(error=e)
         else:
             import json
             error_result = {
                 "error": str(e)
             }
             print(json.dumps(error_result))
+    finally:
+        await stack.aclose()
 
 async def cmd_delete(args):
     """Delete resources in Azure"""
+    stack = AsyncExitStack()
     try:
         if not args.yes:
             show_startup_animation()
         
-        from azure.identity import DefaultAzureCredential
-        credentials = DefaultAzureCredential()
+        # Load and validate exclusions before signing in, so a broken file
+        # fails fast and resources can be filtered as they arrive
+        exclusions = open_exclusions(args, stack)
+        explainer = ExclusionExplainer(exclusions) if args.explain else None
+        
+        credentials = await open_credentials(args, stack)
+        # Poll every deletion from one loop instead of a thread per operation
+        await stack.enter_async_context(lro_manager())
         
         # Get subscriptions with proper async handling
         subscriptions = await async_spinner("Retrieving subscriptions...", 
-                                           get_subscriptions_async(credentials))
+                                           load_subscriptions_async(args, credentials))
         
         # Filter subscriptions by profile if specified
         if args.profile:
-            subscriptions = [sub for sub in subscriptions if sub.display_name.lower() == args.profile.lower()]
+            subscriptions = SubscriptionIndex(subscriptions).find(args.profile)
             if not subscriptions:
                 print(f"{Fore.RED}No subscriptions found matching profile '{args.profile}'{Style.RESET_ALL}")
                 return
@@ -268,31 +679,53 @@ async def cmd_delete(args):
             subscriptions = [sub for sub in subscriptions 
                              if not is_protected_subscription(sub.subscription_id, args.protected_subscriptions)]
         
+        # Subscriptions of other tenants only accept tokens of their own tenant
+        if args.all_tenants:
+            stack.enter_context(subscription_tenants(subscriptions))
+        
         print(f"{Fore.CYAN}Found {len(subscriptions)} accessible subscriptions{Style.RESET_ALL}")
         
         # Convert checks to resource types
         resource_types = parse_resource_types(args.checks)
         
-        # Discover resources with progress animation
-        print(f"{Fore.YELLOW}[DISCOVERING]{Style.RESET_ALL} Starting resource discovery...")
-        all_resources = await async_spinner("Scanning Azure resources...", 
-                                           discover_resources_async(credentials, subscriptions, resource_types))
+        # Regions are pushed down into the discovery queries
+        regions = parse_regions(args.region)
+        if regions:
+            print(f"{Fore.CYAN}Filtering by region: {', '.join(regions)}{Style.RESET_ALL}")
         
-        print(f"{Fore.CYAN}Found {len(all_resources)} total resources{Style.RESET_ALL}")
+        tag_selector = dict(args.tag) if args.tag else None
+        if tag_selector:
+            print(f"{Fore.CYAN}Filtering by tag: "
+                  f"{', '.join(f'{key}={value}' for key, value in tag_selector.items())}{Style.RESET_ALL}")
         
-        # Load exclusions and filter resources
-        exclusions = load_exclusions(args.config)
-        progress_bar = create_progress_bar(len(all_resources), "Filtering resources")
-            
-        # Use async wrapper for filtering
-        resources_to_delete, resources_to_preserve = await filter_resources_async(
-            all_resources, exclusions, progress_bar
-        )
+        # Discover and filter resources page by page; only the resources
+        # selected for deletion are kept in memory
+        print(f"{Fore.YELLOW}[DISCOVERING]{Style.RESET_ALL} Starting resource discovery...")
+        cache = open_inventory_cache(args)
+        batches, from_cache = open_resource_stream(args, cache, credentials, subscriptions,
+                                                   resource_types, regions, details=args.fetch_details)
+        progress_bar = create_progress_bar(None, "Scanning resources")
+        
+        resources_to_delete = []
+        total_resources = 0
+        excluded_count = 0
+        async for batch in open_filter_batches(args, batches):
+            batch, tag_index = await select_tagged_async(batch, tag_selector)
+            selected, preserved = await filter_resources_async(batch, exclusions, progress_bar,
+                                                               args.filter_engine, tag_index, explainer)
+            resources_to_delete.extend(selected)
+            total_resources += len(batch)
+            excluded_count += len(preserved)
         
         progress_bar.close()
         
+        if explainer is not None:
+            explainer.write(args.explain)
+            print(f"{Fore.CYAN}Exclusion report written to {args.explain}{Style.RESET_ALL}")
+        
+        print(f"{Fore.CYAN}Found {total_resources} total resources{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}[SELECTED]{Style.RESET_ALL} {len(resources_to_delete)} resources for deletion")
-        print(f"{Fore.GREEN}[EXCLUDED]{Style.RESET_ALL} {len(resources_to_preserve)} resources based on filters")
+        print(f"{Fore.GREEN}[EXCLUDED]{Style.RESET_ALL} {excluded_count} resources based on filters")
         
         # Show summary of resources to be deleted
         resources_by_type = {}
@@ -314,13 +747,39 @@ async def cmd_delete(args):
             dry_run,
             cleanup_empty_resource_groups=args.cleanup_empty_resource_groups,
         ):
+            if from_cache and not dry_run:
+                # The cached inventory may be out of date; skip resources that are already gone
+                # and decide again on their current tags
+                verify_errors = []
+                verified = await async_spinner("Verifying cached resources...",
+                                               verify_resources(credentials, resources_to_delete,
+                                                                errors=verify_errors))
+                gone = len(resources_to_delete) - len(verified) - len(verify_errors)
+                if gone:
+                    print(f"{Fore.CYAN}Skipping {gone} cached resources that no longer exist{Style.RESET_ALL}")
+                if verify_errors:
+                    print(f"{Fore.YELLOW}Skipping {len(verify_errors)} cached resources whose current tags "
+                          f"could not be read; use --refresh to rediscover them{Style.RESET_ALL}")
+                if tag_selector:
+                    verified = select_tagged(verified, tag_selector)
+                resources_to_delete, _ = await filter_resources_async(verified, exclusions, None)
+                if len(resources_to_delete) < len(verified):
+                    print(f"{Fore.GREEN}[EXCLUDED]{Style.RESET_ALL} {len(verified) - len(resources_to_delete)} "
+                          f"cached resources no longer selected for deletion since the scan")
+            
             deleted, failed = await delete_resources(
                 credentials,
                 resources_to_delete,
                 dry_run,
                 cleanup_empty_rgs=args.cleanup_empty_resource_groups,
+                max_parallel=args.max_parallel,
+                max_parallel_per_subscription=args.max_parallel_per_subscription,
             )
             
+            # Deleting resources makes every cached inventory stale
+            if cache and not dry_run:
+                cache.clear()
+            
             # Show completion animation
             success = len(failed) == 0
             show_completion_animation(success, len(deleted), len(failed))
@@ -333,12 +792,16 @@ async def cmd_delete(args):
             print(f"\n{Fore.YELLOW}[CANCELLED]{Style.RESET_ALL} Operation cancelled by user")
     except KeyboardInterrupt:
         print(f"\n{Fore.YELLOW}[INTERRUPTED]{Style.RESET_ALL} Operation cancelled by user")
+    except ExclusionConfigError as e:
+        print(f"\n{Fore.RED}[CONFIG ERROR]{Style.RESET_ALL} {e}")
     except Exception as e:
         print(f"\n{Fore.RED}[ERROR]{Style.RESET_ALL} An unexpected error occurred: {e}")
         # Print more detailed error information in verbose mode
         if args.verbose:
             import traceback
             print(traceback.format_exc())
+    finally:
+        await stack.aclose()
 
 async def _main():
     parser = create_parser()
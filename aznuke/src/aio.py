@@ -0,0 +1,459 @@
+# aio.py
+import asyncio
+import contextvars
+import inspect
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from azure.core.async_paging import AsyncItemPaged
+from azure.core.credentials import AccessToken
+from azure.core.exceptions import ResourceNotFoundError
+from azure.core.polling import AsyncLROPoller
+
+from aznuke.src.auth import (
+    CachedTokenCredential,
+    SubscriptionInfo,
+    create_credential,
+    token_cache_key,
+    DEFAULT_REFRESH_MARGIN,
+    DEFAULT_TENANT_WORKERS,
+)
+from aznuke.src.clients import AsyncTenantCredential, get_async_client, release_async_client
+from aznuke.src.lro import get_lro_manager
+from aznuke.src.discovery import (
+    build_filters,
+    in_regions,
+    list_operation,
+    resource_key,
+    DEFAULT_SHARD_WORKERS,
+    STREAM_BATCH_SIZE,
+    STREAM_QUEUE_SIZE,
+)
+from aznuke.src.resources import Resource
+
+# Maximum number of subscriptions scanned at the same time on the event loop
+DEFAULT_MAX_CONCURRENCY = 64
+
+# Maximum number of open connections in the shared aiohttp session
+DEFAULT_CONNECTION_LIMIT = 100
+
+MANAGEMENT_SCOPE = "https://management.azure.com/.default"
+
+# Transport shared by the async clients created inside shared_session()
+_shared_transport = contextvars.ContextVar("aznuke_shared_transport", default=None)
+
+def is_async_credential(credentials):
+    """Return True for credentials from azure.identity.aio."""
+    return inspect.iscoroutinefunction(getattr(credentials, 'get_token', None))
+
+def get_async_credentials(all_tenants=False, auth="default"):
+    """Authenticate using the async DefaultAzureCredential, or the credential type selected by auth."""
+    import azure.identity.aio
+    return create_credential(azure.identity.aio, auth, all_tenants)
+
+class AsyncCachedTokenCredential(CachedTokenCredential):
+    """
+    Async counterpart of auth.CachedTokenCredential.
+
+    Background refreshes run as tasks on the event loop.
+    """
+
+    def __init__(self, credentials, store=None, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        super().__init__(credentials, store, refresh_margin)
+        self._async_fetch_locks = {}
+        self._tasks = set()
+
+    async def _refresh_async(self, key, scopes, options):
+        try:
+            self._remember(key, await self.credentials.get_token(*scopes, **options))
+        except Exception:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def get_token(self, *scopes, **kwargs):
+        if kwargs.get("claims"):
+            return await self.credentials.get_token(*scopes, **kwargs)
+
+        key = token_cache_key(scopes, kwargs)
+        token, refresh = self._lookup(key)
+        if refresh:
+            task = asyncio.create_task(self._refresh_async(key, scopes, kwargs))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if token is not None:
+            return token
+
+        lock = self._async_fetch_locks.get(key)
+        if lock is None:
+            # Created here so it binds to the running loop on Python 3.9
+            lock = self._async_fetch_locks[key] = asyncio.Lock()
+        async with lock:
+            token, _ = self._lookup(key)
+            if token is None:
+                token = await self.credentials.get_token(*scopes, **kwargs)
+                self._remember(key, token)
+            return token
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.credentials.close()
+
+@asynccontextmanager
+async def shared_session(connection_limit=DEFAULT_CONNECTION_LIMIT):
+    """
+    Share one aiohttp session between every async client created in this block.
+
+    Args:
+        connection_limit: Maximum number of open connections in the session
+    """
+    try:
+        import aiohttp
+        from azure.core.pipeline.transport import AioHttpTransport
+    except ImportError as e:
+        raise ImportError("Native async mode requires aiohttp. Install it with: pip install 'aznuke[async]'") from e
+
+    # Same session settings azure-core uses for the sessions it owns
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=connection_limit),
+        cookie_jar=aiohttp.DummyCookieJar(),
+        trust_env=True,
+        auto_decompress=False,
+    )
+    transport = AioHttpTransport(session=session, session_owner=False)
+    token = _shared_transport.set(transport)
+    try:
+        yield transport
+    finally:
+        _shared_transport.reset(token)
+        await session.close()
+
+def _client_options():
+    """Return constructor options that attach the shared transport, if any."""
+    transport = _shared_transport.get()
+    return {"transport": transport} if transport is not None else {}
+
+def get_async_resource_client(credentials, subscription_id):
+    """Create an async resource management client for a specific subscription."""
+    from azure.mgmt.resource.resources.aio import ResourceManagementClient
+    return ResourceManagementClient(credentials, subscription_id, **_client_options())
+
+def get_async_network_client(credentials, subscription_id):
+    """Create an async network management client for a specific subscription."""
+    from azure.mgmt.network.aio import NetworkManagementClient
+    return NetworkManagementClient(credentials, subscription_id, **_client_options())
+
+def get_async_compute_client(credentials, subscription_id):
+    """Create an async compute management client for a specific subscription."""
+    from azure.mgmt.compute.aio import ComputeManagementClient
+    return ComputeManagementClient(credentials, subscription_id, **_client_options())
+
+def get_async_subscription_client(credentials):
+    """Create an async subscription client."""
+    from azure.mgmt.subscription.aio import SubscriptionClient
+    return SubscriptionClient(credentials, **_client_options())
+
+async def call(func, *args, **kwargs):
+    """
+    Run a client operation without blocking the event loop.
+
+    Operations of async clients are awaited directly; sync operations run in
+    a worker thread.
+    """
+    if inspect.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+async def begin(func, *args, **kwargs):
+    """
+    Start a long-running operation and return its poller.
+
+    Inside lro_manager(), the operation is polled by the shared LROManager
+    and a future of its result is returned instead.
+    """
+    manager = get_lro_manager()
+    if manager is not None:
+        return await manager.begin(func, *args, **kwargs)
+    if inspect.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    # The first request of a sync begin_* is sent right away
+    result = await asyncio.to_thread(func, *args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+async def collect(func, *args, **kwargs):
+    """Run a list operation and return all items."""
+    pager = func(*args, **kwargs)
+    if isinstance(pager, AsyncItemPaged):
+        return [item async for item in pager]
+    return await asyncio.to_thread(list, pager)
+
+async def wait(poller):
+    """Wait for a long-running operation to finish and return its result."""
+    if isinstance(poller, asyncio.Future):
+        return await poller
+    if isinstance(poller, AsyncLROPoller):
+        return await poller.result()
+    return await asyncio.to_thread(poller.result)
+
+class LoopTokenCredential:
+    """
+    Sync credential that hands out the tokens of an async credential.
+
+    Tokens are fetched on the event loop that owns the async credential and
+    fetched again once they are within refresh_margin seconds of expiry, so
+    long runs of sync code (the Resource Graph backend) keep valid tokens.
+    It is meant for worker threads: called on the loop itself, it can only
+    hand out a cached token that has not expired yet.
+    """
+
+    def __init__(self, credentials, loop, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        self.credentials = credentials
+        self.loop = loop
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def remember(self, scopes, options, token):
+        """Cache a token fetched for these scopes and options."""
+        with self._lock:
+            self._tokens[token_cache_key(scopes, options)] = AccessToken(token.token, token.expires_on)
+
+    def get_token(self, *scopes, **kwargs):
+        key = token_cache_key(scopes, kwargs)
+        with self._lock:
+            token = self._tokens.get(key)
+            remaining = token.expires_on - time.time() if token is not None else 0
+            if remaining > self.refresh_margin:
+                return token
+
+            try:
+                on_loop = asyncio.get_running_loop() is self.loop
+            except RuntimeError:
+                on_loop = False
+            if on_loop:
+                # Waiting on the loop from the loop would deadlock
+                if remaining > 0:
+                    return token
+                raise RuntimeError("LoopTokenCredential cannot fetch a token on its own event loop")
+
+            future = asyncio.run_coroutine_threadsafe(self.credentials.get_token(*scopes, **kwargs), self.loop)
+            fetched = future.result()
+            token = self._tokens[key] = AccessToken(fetched.token, fetched.expires_on)
+            return token
+
+async def to_sync_credential(credentials, scope=MANAGEMENT_SCOPE):
+    """
+    Return a sync credential usable from worker threads for a single run.
+
+    Async credentials are wrapped in a LoopTokenCredential bound to the
+    running loop, with a token for scope fetched up front.
+    """
+    if not is_async_credential(credentials):
+        return credentials
+    sync_credentials = LoopTokenCredential(credentials, asyncio.get_running_loop())
+    sync_credentials.remember((scope,), {}, await credentials.get_token(scope))
+    return sync_credentials
+
+async def _list_subscriptions_aio(credentials):
+    subscription_client = get_async_subscription_client(credentials)
+    try:
+        return [SubscriptionInfo.from_sdk(sub) async for sub in subscription_client.subscriptions.list()]
+    finally:
+        await subscription_client.close()
+
+async def get_subscriptions_aio(credentials, all_tenants=False, max_concurrency=DEFAULT_TENANT_WORKERS):
+    """
+    Get all Azure subscriptions the authenticated user has access to.
+
+    With all_tenants, the subscriptions of every accessible tenant are listed
+    concurrently, as in auth.get_subscriptions.
+    """
+    if not all_tenants:
+        return await _list_subscriptions_aio(credentials)
+
+    subscription_client = get_async_subscription_client(credentials)
+    try:
+        tenant_ids = [tenant.tenant_id async for tenant in subscription_client.tenants.list()]
+    finally:
+        await subscription_client.close()
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def list_tenant(tenant_id):
+        async with semaphore:
+            return await _list_subscriptions_aio(AsyncTenantCredential(credentials, tenant_id))
+
+    results = await asyncio.gather(*(list_tenant(tenant_id) for tenant_id in tenant_ids), return_exceptions=True)
+    subscriptions = {}
+    for tenant_id, result in zip(tenant_ids, results):
+        if isinstance(result, Exception):
+            print(f"Warning: Failed to list subscriptions in tenant {tenant_id}: {result}", file=sys.stderr)
+            continue
+        for sub in result:
+            subscriptions.setdefault(sub.subscription_id.lower(), sub)
+    return list(subscriptions.values())
+
+async def iter_resources_aio(resource_client, resource_types=None, regions=None, resource_group=None):
+    """
+    Yield resources in a subscription from an async resource client.
+
+    Filters are built the same way as discovery.iter_resources.
+
+    Args:
+        resource_client: The async Azure resource client
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+        resource_group: Optional resource group to restrict the listing to
+    """
+    list_resources = list_operation(resource_client, resource_group)
+    filters = build_filters(resource_types, regions)
+    if filters == [None]:
+        async for resource in list_resources():
+            yield resource
+        return
+
+    region_set = set(regions) if regions else None
+    seen = set()
+    for filter_str in filters:
+        async for resource in list_resources(filter=filter_str):
+            if region_set and not in_regions(resource, region_set):
+                continue
+            key = resource_key(resource)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield resource
+
+async def iter_resources_by_resource_group_aio(resource_client, resource_types=None, regions=None,
+                                              max_concurrency=DEFAULT_SHARD_WORKERS):
+    """
+    Yield resources in a subscription by listing its resource groups concurrently.
+
+    The async counterpart of discovery.iter_resources_by_resource_group.
+
+    Args:
+        resource_client: The async Azure resource client
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+        max_concurrency: Maximum number of resource groups listed at the same time
+    """
+    groups = [group.name async for group in resource_client.resource_groups.list()]
+    if not groups:
+        return
+
+    results = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def scan(group):
+        try:
+            async with semaphore:
+                batch = []
+                async for resource in iter_resources_aio(resource_client, resource_types, regions, group):
+                    batch.append(resource)
+                    if len(batch) >= STREAM_BATCH_SIZE:
+                        await results.put(("batch", batch))
+                        batch = []
+                if batch:
+                    await results.put(("batch", batch))
+        except ResourceNotFoundError:
+            # The resource group was deleted while the subscription was scanned
+            pass
+        except Exception as e:
+            await results.put(("error", e))
+        # Not in a finally block: a cancelled task must not wait on the queue
+        await results.put(("done", None))
+
+    tasks = [asyncio.create_task(scan(group)) for group in groups]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            kind, payload = await results.get()
+            if kind == "batch":
+                for resource in payload:
+                    yield resource
+            elif kind == "error":
+                raise payload
+            else:
+                remaining -= 1
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def iter_all_resource_batches_aio(credentials, subscriptions, resource_types=None,
+                                        max_concurrency=DEFAULT_MAX_CONCURRENCY, errors=None, regions=None,
+                                        details=False, shard_workers=None):
+    """
+    Yield batches of resources across all subscriptions using async clients.
+
+    Every subscription is listed by its own task on the event loop, bounded by
+    max_concurrency. Batches are handed over through a bounded queue and a
+    failure in one subscription is reported without aborting the others.
+
+    Args:
+        credentials: Async Azure credentials
+        subscriptions: List of subscriptions to scan
+        resource_types: Optional list of resource types to filter by
+        max_concurrency: Maximum number of subscriptions listed at the same time
+        errors: Optional list that receives (subscription, exception) pairs
+        regions: Optional list of normalized region names to filter by
+        details: Whether to keep the fields deletion handlers need
+        shard_workers: Optional number of resource groups of each
+            subscription listed at the same time
+    """
+    subscriptions = list(subscriptions)
+    if not subscriptions:
+        return
+
+    results = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or DEFAULT_MAX_CONCURRENCY))
+
+    async def scan(subscription):
+        try:
+            async with semaphore:
+                resource_client = get_async_client(get_async_resource_client, credentials,
+                                                   subscription.subscription_id)
+                try:
+                    batch = []
+                    if shard_workers:
+                        resources = iter_resources_by_resource_group_aio(resource_client, resource_types, regions,
+                                                                         shard_workers)
+                    else:
+                        resources = iter_resources_aio(resource_client, resource_types, regions)
+                    async for resource in resources:
+                        batch.append(Resource.from_sdk(resource, subscription, details))
+                        if len(batch) >= STREAM_BATCH_SIZE:
+                            await results.put(("batch", subscription, batch))
+                            batch = []
+                    if batch:
+                        await results.put(("batch", subscription, batch))
+                finally:
+                    await release_async_client(resource_client)
+        except Exception as e:
+            await results.put(("error", subscription, e))
+        # Not in a finally block: a cancelled task must not wait on the queue
+        await results.put(("done", subscription, None))
+
+    tasks = [asyncio.create_task(scan(subscription)) for subscription in subscriptions]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            kind, subscription, payload = await results.get()
+            if kind == "batch":
+                yield payload
+            elif kind == "error":
+                print(f"Warning: Failed to discover resources in subscription "
+                      f"{subscription.display_name} ({subscription.subscription_id}): {payload}", file=sys.stderr)
+                if errors is not None:
+                    errors.append((subscription, payload))
+            else:
+                remaining -= 1
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -113,21 +113,24 @@ def create_progress_bar(total, description="Processing"):
     """Create a tqdm progress bar that can be updated."""
     return tqdm(total=total, desc=description, bar_format='{l_bar}{bar:30}{r_bar}')
 
-def show_summary_by_type(resources_by_type, max_display=10):
+def show_summary_by_type(resources_by_type, max_display=10, counts=None):
     """
     Display a colored summary of resources by type.
     
     Args:
         resources_by_type (dict): Dictionary of resources grouped by type
         max_display (int): Maximum number of resources to display per type
+        counts (dict, optional): Total number of resources per type, when
+            resources_by_type only holds a sample of each type
     """
     for resource_type, resources in resources_by_type.items():
-        print(f"\n{Fore.CYAN}{resource_type}{Style.RESET_ALL} ({len(resources)}):")
+        total = counts.get(resource_type, len(resources)) if counts else len(resources)
+        print(f"\n{Fore.CYAN}{resource_type}{Style.RESET_ALL} ({total}):")
         for resource in resources[:max_display]:
             subscription_name = getattr(resource, 'subscription_name', 'Unknown')
             print(f"  {Fore.WHITE}- {resource.name} {Fore.YELLOW}(Subscription: {subscription_name}){Style.RESET_ALL}")
-        if len(resources) > max_display:
-            print(f"  {Fore.YELLOW}... and {len(resources) - max_display} more{Style.RESET_ALL}")
+        if total > max_display:
+            print(f"  {Fore.YELLOW}... and {total - max_display} more{Style.RESET_ALL}")
 
 def show_completion_animation(success, resources_deleted, resources_failed):
     """
@@ -1,17 +1,295 @@
 # auth.py
-from azure.identity import DefaultAzureCredential
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from azure.mgmt.resource import ResourceManagementClient
 from azure.mgmt.subscription import SubscriptionClient
 
-def get_credentials():
-    """Authenticate using DefaultAzureCredential."""
-    return DefaultAzureCredential()
+from aznuke.src.clients import TenantCredential, get_client
+
+MANAGEMENT_SCOPE = "https://management.azure.com/.default"
+
+# Number of tenants whose subscriptions are listed at the same time
+DEFAULT_TENANT_WORKERS = 8
+
+# Credential types selectable with --auth; "default" walks the whole
+# DefaultAzureCredential chain
+AUTH_METHODS = ("default", "cli", "msi", "env")
+
+# Environment variables that select the identity of EnvironmentCredential
+# and ManagedIdentityCredential
+IDENTITY_ENVIRONMENT_VARIABLES = (
+    "AZURE_TENANT_ID",
+    "AZURE_CLIENT_ID",
+    "AZURE_USERNAME",
+    "AZURE_CLIENT_CERTIFICATE_PATH",
+    "AZURE_FEDERATED_TOKEN_FILE",
+)
+
+# Cached tokens expiring within this many seconds are refreshed in the background
+DEFAULT_REFRESH_MARGIN = 600
+
+# Cached tokens closer than this many seconds to expiry are never handed out
+MIN_TOKEN_VALIDITY = 120
+
+class SubscriptionInfo:
+    """The subscription fields aznuke uses, as returned by get_subscriptions."""
+
+    __slots__ = ("subscription_id", "display_name", "tenant_id", "state")
+
+    def __init__(self, subscription_id, display_name, tenant_id=None, state=None):
+        self.subscription_id = subscription_id
+        self.display_name = display_name
+        self.tenant_id = tenant_id
+        self.state = state
+
+    @classmethod
+    def from_sdk(cls, subscription):
+        """Build a record from an SDK subscription model."""
+        state = getattr(subscription, 'state', None)
+        return cls(
+            subscription.subscription_id,
+            subscription.display_name,
+            tenant_id=getattr(subscription, 'tenant_id', None),
+            state=getattr(state, 'value', state),
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from the dictionary returned by to_dict."""
+        return cls(data["subscription_id"], data.get("display_name"), data.get("tenant_id"), data.get("state"))
+
+    def to_dict(self):
+        """Return the record as a JSON-serializable dictionary."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+class SubscriptionIndex:
+    """Look up subscriptions by ID or by case-insensitive display name."""
+
+    def __init__(self, subscriptions):
+        self.by_id = {}
+        self.by_name = {}
+        for subscription in subscriptions:
+            self.by_id[str(subscription.subscription_id).lower()] = subscription
+            self.by_name.setdefault(str(subscription.display_name).lower(), []).append(subscription)
+
+    def find(self, profile):
+        """Return the subscriptions whose ID or display name matches profile."""
+        key = profile.lower()
+        if key in self.by_id:
+            return [self.by_id[key]]
+        return list(self.by_name.get(key, []))
+
+def token_claims(token):
+    """Return the claims of a JWT access token without validating it."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError):
+        return {}
+
+def token_cache_key(scopes, options):
+    """Return the key a token for these scopes and get_token options is cached under."""
+    return "|".join([
+        options.get("tenant_id") or "",
+        "cae" if options.get("enable_cae") else "",
+        " ".join(sorted(scopes)),
+    ])
+
+class CachedTokenCredential:
+    """
+    Credential wrapper that caches access tokens and refreshes them ahead of expiry.
+
+    Tokens are kept per scope and tenant. Once a cached token is within
+    refresh_margin seconds of expiry it is still handed out while a background
+    thread fetches its replacement, so a long deletion never waits on a token
+    request. With a store (see cache.TokenStore) tokens also outlive the run.
+    """
 
-def get_subscriptions(credentials):
-    """Get all Azure subscriptions the authenticated user has access to."""
+    def __init__(self, credentials, store=None, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        self.credentials = credentials
+        self.store = store
+        self.refresh_margin = refresh_margin
+        self._tokens = store.load() if store is not None else {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+
+    def _lookup(self, key):
+        """
+        Return (token, refresh) for a cached token that can still be used.
+
+        token is None when a new token must be fetched first; refresh is True
+        when the caller should start a background refresh.
+        """
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                return None, False
+            remaining = token.expires_on - time.time()
+            if remaining <= MIN_TOKEN_VALIDITY:
+                return None, False
+            refresh = remaining <= self.refresh_margin and key not in self._refreshing
+            if refresh:
+                self._refreshing.add(key)
+            return token, refresh
+
+    def _fetch_lock(self, key):
+        """Return the lock serializing foreground fetches of one cache key."""
+        with self._lock:
+            lock = self._fetch_locks.get(key)
+            if lock is None:
+                lock = self._fetch_locks[key] = threading.Lock()
+            return lock
+
+    def _remember(self, key, token):
+        """Cache a new token and persist the cache when a store is used."""
+        with self._lock:
+            self._tokens[key] = token
+            self._refreshing.discard(key)
+            tokens = dict(self._tokens)
+        if self.store is not None:
+            self.store.save(tokens)
+
+    def _refresh(self, key, scopes, options):
+        try:
+            self._remember(key, self.credentials.get_token(*scopes, **options))
+        except Exception:
+            # Retried by a later call, or fetched in the foreground once the
+            # cached token gets too close to expiry
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_token(self, *scopes, **kwargs):
+        if kwargs.get("claims"):
+            # Claims challenges always need a new token
+            return self.credentials.get_token(*scopes, **kwargs)
+
+        key = token_cache_key(scopes, kwargs)
+        token, refresh = self._lookup(key)
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, scopes, kwargs),
+                             name="aznuke-token-refresh", daemon=True).start()
+        if token is not None:
+            return token
+
+        # One foreground fetch per scope and tenant, so concurrent workers
+        # share it while other tenants are fetched in parallel
+        with self._fetch_lock(key):
+            token, _ = self._lookup(key)
+            if token is None:
+                token = self.credentials.get_token(*scopes, **kwargs)
+                self._remember(key, token)
+            return token
+
+    def close(self):
+        close = getattr(self.credentials, 'close', None)
+        if close is not None:
+            close()
+
+def create_credential(identity, auth="default", all_tenants=False):
+    """
+    Create a credential of the selected type from an azure.identity module.
+
+    Args:
+        identity: azure.identity or azure.identity.aio
+        auth: One of AUTH_METHODS. Pinning a single credential type skips
+            probing the rest of the DefaultAzureCredential chain
+        all_tenants: Allow tokens for every tenant the identity can access
+    """
+    options = {"additionally_allowed_tenants": ["*"]} if all_tenants else {}
+    if auth == "cli":
+        return identity.AzureCliCredential(**options)
+    if auth == "msi":
+        return identity.ManagedIdentityCredential(client_id=os.environ.get("AZURE_CLIENT_ID"))
+    if auth == "env":
+        return identity.EnvironmentCredential(**options)
+    if auth == "default":
+        return identity.DefaultAzureCredential(**options)
+    raise ValueError(f"Unknown authentication method: {auth}")
+
+def _cli_account():
+    """Return the user and tenant of the active Azure CLI account, read from its profile, or None."""
+    config_dir = os.environ.get("AZURE_CONFIG_DIR") or os.path.join(os.path.expanduser("~"), ".azure")
+    try:
+        # The CLI writes its profile with a byte order mark
+        with open(os.path.join(config_dir, "azureProfile.json"), encoding="utf-8-sig") as file:
+            profile = json.load(file)
+        for subscription in profile.get("subscriptions") or []:
+            if subscription.get("isDefault"):
+                return {"user": (subscription.get("user") or {}).get("name"), "tenant": subscription.get("tenantId")}
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+def credential_identity(auth="default"):
+    """
+    Return the settings that decide which identity a credential type signs in as.
+
+    These are the identity environment variables for env, msi and default,
+    and the active Azure CLI account for cli and default. Signing in as
+    someone else changes the result, without requesting a token.
+    """
+    identity = {"auth": auth}
+    if auth in ("env", "msi", "default"):
+        identity["environment"] = {name: os.environ.get(name) for name in IDENTITY_ENVIRONMENT_VARIABLES}
+    if auth in ("cli", "default"):
+        identity["cli"] = _cli_account()
+    return identity
+
+def get_credentials(auth="default", all_tenants=False):
+    """Authenticate using DefaultAzureCredential, or the credential type selected by auth."""
+    import azure.identity
+    return create_credential(azure.identity, auth, all_tenants)
+
+def get_tenant_ids(credentials):
+    """Get the IDs of all tenants the authenticated user has access to."""
     subscription_client = SubscriptionClient(credentials)
+    return [tenant.tenant_id for tenant in subscription_client.tenants.list()]
+
+def _list_tenant_subscriptions(credentials, tenant_id):
+    subscription_client = SubscriptionClient(TenantCredential(credentials, tenant_id))
     return list(subscription_client.subscriptions.list())
 
+def get_subscriptions(credentials, all_tenants=False, max_workers=DEFAULT_TENANT_WORKERS):
+    """
+    Get all Azure subscriptions the authenticated user has access to.
+
+    Args:
+        credentials: Azure credentials
+        all_tenants: List the subscriptions of every accessible tenant, one
+            tenant per worker, instead of only the home tenant
+        max_workers: Maximum number of tenants listed at the same time
+    """
+    if not all_tenants:
+        subscription_client = SubscriptionClient(credentials)
+        return [SubscriptionInfo.from_sdk(sub) for sub in subscription_client.subscriptions.list()]
+
+    tenant_ids = get_tenant_ids(credentials)
+    subscriptions = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tenant_ids) or 1)),
+                            thread_name_prefix="aznuke-tenants") as executor:
+        futures = {
+            tenant_id: executor.submit(_list_tenant_subscriptions, credentials, tenant_id)
+            for tenant_id in tenant_ids
+        }
+        for tenant_id, future in futures.items():
+            try:
+                tenant_subscriptions = future.result()
+            except Exception as e:
+                # A tenant can require its own sign-in (e.g. MFA); keep the others
+                print(f"Warning: Failed to list subscriptions in tenant {tenant_id}: {e}", file=sys.stderr)
+                continue
+            for sub in tenant_subscriptions:
+                subscriptions.setdefault(sub.subscription_id.lower(), SubscriptionInfo.from_sdk(sub))
+    return list(subscriptions.values())
+
 def get_resource_client(credentials, subscription_id):
-    """Create a resource management client for a specific subscription."""
-    return ResourceManagementClient(credentials, subscription_id)
\ No newline at end of file
+    """Return the resource management client for a specific subscription."""
+    return get_client(ResourceManagementClient, credentials, subscription_id)
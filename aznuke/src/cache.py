@@ -0,0 +1,344 @@
+# cache.py
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from azure.core.credentials import AccessToken
+
+from aznuke.src.auth import SubscriptionInfo, credential_identity
+from aznuke.src.discovery import STREAM_BATCH_SIZE
+from aznuke.src.resources import Resource
+
+# Seconds a cached inventory is reused before it is discovered again
+DEFAULT_CACHE_TTL = 300
+
+# Seconds the list of accessible subscriptions is reused
+DEFAULT_SUBSCRIPTION_CACHE_TTL = 900
+
+# Bumped whenever the layout of a cache file changes
+CACHE_FORMAT_VERSION = 1
+
+def get_cache_dir():
+    """
+    Return the directory holding cached inventories.
+
+    Uses AZNUKE_CACHE_DIR when set, otherwise $XDG_CACHE_HOME/aznuke
+    (defaulting to ~/.cache/aznuke).
+    """
+    path = os.environ.get("AZNUKE_CACHE_DIR")
+    if path:
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "aznuke")
+
+def cache_key(subscriptions, resource_types=None, regions=None, backend="arm", details=False):
+    """
+    Return the cache key for a discovery run.
+
+    The key covers the tenants and subscriptions scanned, the resource type
+    and region selection, the discovery backend and whether detail fields
+    were fetched.
+    """
+    selection = {
+        "tenants": sorted({str(getattr(sub, 'tenant_id', None) or "") for sub in subscriptions}),
+        "subscriptions": sorted(sub.subscription_id.lower() for sub in subscriptions),
+        "resource_types": sorted({t.lower() for t in resource_types}) if resource_types else None,
+        "regions": sorted(set(regions)) if regions else None,
+        "backend": backend,
+    }
+    if details:
+        selection["details"] = True
+    return hashlib.sha256(json.dumps(selection, sort_keys=True).encode("utf-8")).hexdigest()
+
+def subscription_cache_key(claims, all_tenants=False):
+    """
+    Return the subscription cache key for a signed-in identity.
+
+    Args:
+        claims: Claims of an access token of the identity (see auth.token_claims)
+        all_tenants: Whether subscriptions of every tenant were listed
+    """
+    identity = {
+        "tenant": claims.get("tid"),
+        "object": claims.get("oid") or claims.get("sub"),
+        "all_tenants": bool(all_tenants),
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+def token_store_name(auth="default", all_tenants=False):
+    """
+    Return the name of the token store for a credential type.
+
+    The name covers the identity the credential signs in as (see
+    auth.credential_identity), so the tokens of a previous account are
+    never handed out after signing in as someone else.
+    """
+    identity = dict(credential_identity(auth), all_tenants=bool(all_tenants))
+    digest = hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{auth}-{digest[:16]}"
+
+def _open_temp(directory):
+    """Create a private temporary file in directory and return (file, path)."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    return os.fdopen(fd, "w", encoding="utf-8"), temp_path
+
+class CacheWriter:
+    """
+    Write an inventory to a temporary file and move it into place on commit.
+
+    Readers only ever see complete inventories: the file is renamed over the
+    previous entry with os.replace once discovery has finished. The temporary
+    file is only created by the first add or commit, so a writer that is
+    never used leaves nothing behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.created = time.time()
+        self.file = None
+        self.temp_path = None
+
+    def _open(self):
+        if self.file is None:
+            self.file, self.temp_path = _open_temp(os.path.dirname(self.path))
+            self.file.write(json.dumps({"version": CACHE_FORMAT_VERSION, "created": self.created}) + "\n")
+        return self.file
+
+    def add(self, resources):
+        """Append a batch of resources."""
+        file = self._open()
+        for resource in resources:
+            file.write(json.dumps(resource.to_dict()) + "\n")
+
+    def commit(self):
+        """Replace the cache entry with the inventory written so far."""
+        file = self._open()
+        file.flush()
+        os.fsync(file.fileno())
+        file.close()
+        os.replace(self.temp_path, self.path)
+        self.file = self.temp_path = None
+
+    def discard(self):
+        """Drop the inventory written so far, leaving the cache entry untouched."""
+        if self.file is None:
+            return
+        self.file.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+        self.file = self.temp_path = None
+
+class InventoryCache:
+    """On-disk cache of discovered resources, one file per cache key."""
+
+    def __init__(self, directory=None, ttl=DEFAULT_CACHE_TTL):
+        self.directory = directory or get_cache_dir()
+        self.ttl = ttl
+
+    def path(self, key):
+        """Return the file holding the inventory for a cache key."""
+        return os.path.join(self.directory, f"{key}.jsonl")
+
+    def read(self, key, batch_size=STREAM_BATCH_SIZE):
+        """
+        Return (created, batches) for a fresh cache entry, or None.
+
+        created is the time discovery of the cached inventory started and
+        batches yields lists of up to batch_size resources. Entries older than
+        the TTL, written by another format version or unreadable are ignored;
+        damaged ones (a corrupt or truncated record) are also removed.
+        """
+        try:
+            file = open(self.path(key), encoding="utf-8")
+        except OSError:
+            return None
+
+        try:
+            header = json.loads(file.readline())
+            created = float(header["created"])
+            fresh = header.get("version") == CACHE_FORMAT_VERSION and time.time() - created <= self.ttl
+        except (ValueError, KeyError, TypeError):
+            fresh = False
+        if not fresh:
+            file.close()
+            return None
+
+        # Check every record before the first batch goes out: a damaged entry
+        # found halfway through would leave the caller with half an inventory
+        start = file.tell()
+        try:
+            intact = all(isinstance(record, dict) and "id" in record
+                         for record in map(json.loads, file))
+        except ValueError:
+            intact = False
+        if not intact:
+            file.close()
+            self.remove(key)
+            return None
+        file.seek(start)
+
+        def batches():
+            with file:
+                batch = []
+                for line in file:
+                    batch.append(Resource.from_dict(json.loads(line)))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+
+        return created, batches()
+
+    def writer(self, key):
+        """Return a CacheWriter that replaces the entry for a cache key on commit."""
+        return CacheWriter(self.path(key))
+
+    def remove(self, key):
+        """Remove the entry for a cache key, if any."""
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Remove every cached inventory."""
+        for path in glob.glob(os.path.join(self.directory, "*.jsonl")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+class SubscriptionCache:
+    """On-disk cache of the subscriptions an identity can access."""
+
+    def __init__(self, directory=None, ttl=DEFAULT_SUBSCRIPTION_CACHE_TTL):
+        self.directory = os.path.join(directory or get_cache_dir(), "subscriptions")
+        self.ttl = ttl
+
+    def path(self, key):
+        """Return the file holding the subscriptions for a cache key."""
+        return os.path.join(self.directory, f"{key}.json")
+
+    def read(self, key):
+        """Return the cached subscriptions for a key, or None when missing or expired."""
+        try:
+            with open(self.path(key), encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") != CACHE_FORMAT_VERSION or time.time() - float(data["created"]) > self.ttl:
+                return None
+            return [SubscriptionInfo.from_dict(sub) for sub in data["subscriptions"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def write(self, key, subscriptions):
+        """Atomically replace the cached subscriptions for a key."""
+        file, temp_path = _open_temp(self.directory)
+        try:
+            with file:
+                json.dump({
+                    "version": CACHE_FORMAT_VERSION,
+                    "created": time.time(),
+                    "subscriptions": [sub.to_dict() for sub in subscriptions],
+                }, file)
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+class ExclusionsCache:
+    """
+    On-disk cache of validated exclusion configurations.
+
+    Entries are keyed by the absolute path of the exclusions file and only
+    used while the file keeps the size and modification time it had when
+    it was parsed.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = os.path.join(directory or get_cache_dir(), "exclusions")
+
+    def path(self, config_path):
+        """Return the file caching the exclusions file at config_path."""
+        key = hashlib.sha256(os.path.abspath(config_path).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def read(self, config_path, stat):
+        """Return the cached configuration for config_path, or None when missing or stale."""
+        try:
+            with open(self.path(config_path), encoding="utf-8") as file:
+                data = json.load(file)
+            if (data.get("version") != CACHE_FORMAT_VERSION
+                    or data.get("mtime_ns") != stat.st_mtime_ns
+                    or data.get("size") != stat.st_size):
+                return None
+            return data["config"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def write(self, config_path, stat, config):
+        """Atomically replace the cached configuration for config_path."""
+        file, temp_path = _open_temp(self.directory)
+        try:
+            with file:
+                json.dump({
+                    "version": CACHE_FORMAT_VERSION,
+                    "path": os.path.abspath(config_path),
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "config": config,
+                }, file)
+            os.replace(temp_path, self.path(config_path))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+class TokenStore:
+    """
+    Encrypted on-disk store of access tokens, shared between runs.
+
+    Uses the platform secret store of msal-extensions (DPAPI, Keychain or
+    libsecret). Creating a store raises when none is available; tokens are
+    never written unencrypted.
+    """
+
+    def __init__(self, name, directory=None):
+        from msal_extensions import build_encrypted_persistence
+
+        directory = os.path.join(directory or get_cache_dir(), "tokens")
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.persistence = build_encrypted_persistence(os.path.join(directory, f"{name}.bin"))
+
+    def load(self):
+        """Return the stored tokens that have not expired, by token_cache_key."""
+        try:
+            data = json.loads(self.persistence.load())
+        except Exception:
+            return {}
+        now = time.time()
+        try:
+            return {
+                key: AccessToken(token, int(expires_on))
+                for key, (token, expires_on) in data.items()
+                if expires_on > now
+            }
+        except (AttributeError, TypeError, ValueError):
+            return {}
+
+    def save(self, tokens):
+        """Replace the stored tokens."""
+        data = {key: [token.token, token.expires_on] for key, token in tokens.items()}
+        try:
+            self.persistence.save(json.dumps(data))
+        except Exception:
+            # The in-memory tokens keep working for this run
+            pass
+
@@ -0,0 +1,194 @@
+# clients.py
+import contextvars
+import inspect
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+# Maximum number of pooled connections per host in the shared sync transport
+DEFAULT_POOL_SIZE = 100
+
+# Registry used by get_client and get_async_client inside client_registry()
+_registry = contextvars.ContextVar("aznuke_client_registry", default=None)
+
+# Tenant of each subscription inside subscription_tenants(), by lower-cased ID
+_tenants = contextvars.ContextVar("aznuke_subscription_tenants", default=None)
+
+class TenantCredential:
+    """Credential that requests tokens for a specific tenant."""
+
+    def __init__(self, credentials, tenant_id):
+        self.credentials = credentials
+        self.tenant_id = tenant_id
+
+    def get_token(self, *scopes, **kwargs):
+        kwargs.setdefault("tenant_id", self.tenant_id)
+        return self.credentials.get_token(*scopes, **kwargs)
+
+    def __eq__(self, other):
+        # Equal wrappers share the clients of a ClientRegistry
+        return (type(other) is type(self)
+                and (other.credentials, other.tenant_id) == (self.credentials, self.tenant_id))
+
+    def __hash__(self):
+        return hash((type(self), self.credentials, self.tenant_id))
+
+class AsyncTenantCredential(TenantCredential):
+    """Async credential that requests tokens for a specific tenant."""
+
+    async def get_token(self, *scopes, **kwargs):
+        kwargs.setdefault("tenant_id", self.tenant_id)
+        return await self.credentials.get_token(*scopes, **kwargs)
+
+@contextmanager
+def subscription_tenants(subscriptions):
+    """
+    Request the tokens of each subscription from its own tenant in this block.
+
+    Subscriptions listed with --all-tenants can belong to other tenants than
+    the one signed in to, which reject tokens of the home tenant. Clients from
+    get_client and get_async_client, and Resource Graph queries, use the
+    tenant registered here for their subscription.
+    """
+    tenants = {
+        str(sub.subscription_id).lower(): sub.tenant_id
+        for sub in subscriptions
+        if getattr(sub, 'tenant_id', None)
+    }
+    token = _tenants.set(tenants)
+    try:
+        yield tenants
+    finally:
+        _tenants.reset(token)
+
+def get_subscription_tenant(subscription_id):
+    """Return the tenant registered for a subscription with subscription_tenants(), or None."""
+    tenants = _tenants.get()
+    if not tenants or not subscription_id:
+        return None
+    return tenants.get(str(subscription_id).lower())
+
+def tenant_credentials(credentials, tenant_id):
+    """Return credentials that request tokens from tenant_id, or credentials itself when it is None."""
+    if not tenant_id:
+        return credentials
+    if inspect.iscoroutinefunction(getattr(credentials, 'get_token', None)):
+        return AsyncTenantCredential(credentials, tenant_id)
+    return TenantCredential(credentials, tenant_id)
+
+class ClientRegistry:
+    """
+    Management clients shared per (client type, credential, subscription).
+
+    Every sync client is built on one connection-pooled requests transport,
+    so a run opens a handful of connections per host instead of a new
+    pipeline and TLS session for every resource. Async clients already share
+    the aiohttp session of aio.shared_session().
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+        self.pool_size = pool_size
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._session = None
+        self._transport = None
+
+    def transport(self):
+        """Return the shared sync transport, creating it on first use."""
+        with self._lock:
+            if self._transport is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from azure.core.pipeline.transport import RequestsTransport
+
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+                self._transport = RequestsTransport(session=self._session, session_owner=False)
+            return self._transport
+
+    def get(self, factory, credentials, subscription_id=None, **options):
+        """
+        Return the client factory builds for credentials and subscription_id.
+
+        The client is created on first use and reused afterwards; options are
+        passed to factory only then.
+        """
+        key = (factory, credentials, subscription_id)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory(credentials, subscription_id, **options)
+                self._clients[key] = client
+            return client
+
+    def __len__(self):
+        return len(self._clients)
+
+    async def aclose(self):
+        """Close every client and the shared sync transport."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            session, self._session, self._transport = self._session, None, None
+        for client in clients:
+            try:
+                result = client.close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                # Closing is best effort; the run has finished either way
+                pass
+        if session is not None:
+            session.close()
+
+@asynccontextmanager
+async def client_registry(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Share management clients between discovery and deletion in this block.
+
+    The clients are closed when the block exits.
+
+    Args:
+        pool_size: Maximum number of pooled connections per host
+    """
+    registry = ClientRegistry(pool_size)
+    token = _registry.set(registry)
+    try:
+        yield registry
+    finally:
+        _registry.reset(token)
+        await registry.aclose()
+
+def get_client(client_class, credentials, subscription_id):
+    """
+    Return a sync management client for a subscription.
+
+    Inside client_registry() the client is shared and uses the pooled
+    transport; outside it a new client is created. Inside
+    subscription_tenants() it requests tokens from the subscription's tenant.
+    """
+    credentials = tenant_credentials(credentials, get_subscription_tenant(subscription_id))
+    registry = _registry.get()
+    if registry is None:
+        return client_class(credentials, subscription_id)
+    return registry.get(client_class, credentials, subscription_id, transport=registry.transport())
+
+def get_async_client(factory, credentials, subscription_id):
+    """
+    Return an async management client built by factory for a subscription.
+
+    Inside client_registry() the client is shared; outside it a new client
+    is created and the caller closes it (see release_async_client). Inside
+    subscription_tenants() it requests tokens from the subscription's tenant.
+    """
+    credentials = tenant_credentials(credentials, get_subscription_tenant(subscription_id))
+    registry = _registry.get()
+    if registry is None:
+        return factory(credentials, subscription_id)
+    return registry.get(factory, credentials, subscription_id)
+
+async def release_async_client(client):
+    """Close an async client unless it is owned by the active registry."""
+    if _registry.get() is None:
+        await client.close()
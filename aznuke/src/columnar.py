@@ -0,0 +1,199 @@
+# columnar.py
+from functools import cached_property
+from itertools import compress
+from operator import attrgetter, not_
+
+from aznuke.src.filtering import _resource_group, _resource_region, compile_exclusions
+
+# Resources gathered from the discovery stream before the columnar engine
+# evaluates them; small batches leave nothing to vectorize
+COLUMNAR_BATCH_SIZE = 50000
+
+def require_numpy():
+    """Return the numpy module, or raise ImportError explaining how to install it."""
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("The columnar filter engine requires numpy. "
+                          "Install it with: pip install 'aznuke[columnar]'") from e
+    return numpy
+
+def _column(resources, attr_name):
+    """Read an attribute of every resource, None where it is missing."""
+    try:
+        return list(map(attrgetter(attr_name), resources))
+    except AttributeError:
+        return [getattr(resource, attr_name, None) for resource in resources]
+
+class DictionaryColumn:
+    """
+    A dictionary-encoded column: the distinct values and one code per row.
+
+    Types, locations, resource groups and tag pairs repeat across many
+    resources, so rules are evaluated once per distinct value and mapped
+    back onto the rows with a single array lookup.
+    """
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self, np, items):
+        index = {value: code for code, value in enumerate(dict.fromkeys(items))}
+        self.values = list(index)
+        self.codes = np.fromiter(map(index.__getitem__, items), dtype=np.int64, count=len(items))
+
+    def lookup(self, np, predicate):
+        """Return a row mask of the rows whose value satisfies predicate."""
+        table = np.fromiter((bool(predicate(value)) for value in self.values), dtype=bool, count=len(self.values))
+        return table[self.codes]
+
+class ResourceColumns:
+    """
+    An inventory split into columns for vectorized rule evaluation.
+
+    Columns are built on first use, so only the ones the exclusion rules
+    read are materialized: IDs and names as plain arrays, type, resource
+    group and location dictionary-encoded, and tags as a flattened
+    (row, key/value pair) table.
+    """
+
+    def __init__(self, resources):
+        self.np = require_numpy()
+        self.resources = resources if isinstance(resources, list) else list(resources)
+
+    def __len__(self):
+        return len(self.resources)
+
+    @cached_property
+    def ids(self):
+        return _column(self.resources, 'id')
+
+    @cached_property
+    def names(self):
+        return _column(self.resources, 'name')
+
+    @cached_property
+    def types(self):
+        return DictionaryColumn(self.np, _column(self.resources, 'type'))
+
+    @cached_property
+    def resource_groups(self):
+        return self._string_column('resource_group', _resource_group)
+
+    @cached_property
+    def locations(self):
+        return self._string_column('location', _resource_region)
+
+    def _string_column(self, attr_name, fallback):
+        """
+        Return a dictionary-encoded string attribute column.
+
+        Rows whose attribute is not a string are resolved with
+        fallback(resource), as the per-resource filter does.
+        """
+        np = self.np
+        values = _column(self.resources, attr_name)
+        column = DictionaryColumn(np, values)
+        unresolved = [code for code, value in enumerate(column.values) if not isinstance(value, str)]
+        if not unresolved:
+            return column
+        for row in np.flatnonzero(np.isin(column.codes, unresolved)).tolist():
+            values[row] = fallback(self.resources[row])
+        return DictionaryColumn(np, values)
+
+    def tag_table(self, keys, rows):
+        """
+        Return (rows, pairs) for the tags of the given rows whose keys overlap keys.
+
+        Resources sharing no key with the tag rules cannot match them and
+        are left out of the table.
+        """
+        tags = self.tags
+        selected = [tags[row] for row in rows]
+        tagged = compress(rows, selected)
+        overlapping = list(compress(tagged, map(not_, map(keys.isdisjoint, compress(selected, selected)))))
+        table_rows = []
+        pairs = []
+        for row in overlapping:
+            resource_tags = tags[row]
+            if isinstance(resource_tags, dict):
+                for pair in resource_tags.items():
+                    table_rows.append(row)
+                    pairs.append(pair)
+        return self.np.array(table_rows, dtype=self.np.int64), pairs
+
+    @cached_property
+    def tags(self):
+        return _column(self.resources, 'tags')
+
+    def _match_names(self, pattern, rows):
+        """Return a mask over rows of the names pattern matches."""
+        np = self.np
+        names = self.names
+        selected = [names[row] for row in rows]
+        try:
+            return np.fromiter(map(bool, map(pattern.match, selected)), dtype=bool, count=len(selected))
+        except TypeError:
+            # Some names are not strings; they never match
+            return np.fromiter((isinstance(name, str) and pattern.match(name) is not None for name in selected),
+                               dtype=bool, count=len(selected))
+
+    def preserve_mask(self, matcher):
+        """
+        Return a boolean array marking the resources matcher preserves.
+
+        Agrees with matcher.matches for every resource. Rules on the
+        dictionary-encoded columns run first; the per-row rules (IDs, tags,
+        names) then only look at the resources no earlier rule preserved.
+        """
+        np = self.np
+        mask = self.types.lookup(np, matcher.resource_types.__contains__)
+
+        if matcher.resource_groups:
+            mask |= self.resource_groups.lookup(np, matcher.resource_groups.__contains__)
+
+        if matcher.regions:
+            mask |= self.locations.lookup(np, matcher.regions.__contains__)
+
+        if matcher.resource_ids:
+            rows = np.flatnonzero(~mask).tolist()
+            ids = self.ids
+            hits = map(matcher.resource_ids.__contains__, [ids[row] for row in rows])
+            mask[np.array(list(compress(rows, hits)), dtype=np.int64)] = True
+
+        if matcher.tags:
+            rules = matcher.tags
+            missing = object()
+            rows, pairs = self.tag_table(frozenset(rules), np.flatnonzero(~mask).tolist())
+            if pairs:
+                def tag_matches(pair):
+                    return rules.get(pair[0], missing) == pair[1]
+
+                try:
+                    hits = DictionaryColumn(np, pairs).lookup(np, tag_matches)
+                except TypeError:
+                    # Unhashable tag values cannot be dictionary-encoded
+                    hits = np.fromiter(map(tag_matches, pairs), dtype=bool, count=len(pairs))
+                mask[rows[hits]] = True
+
+        # Names are nearly unique, so they are matched row by row
+        for pattern in matcher.name_patterns:
+            rows = np.flatnonzero(~mask)
+            if not len(rows):
+                break
+            mask[rows] = self._match_names(pattern, rows.tolist())
+
+        return mask
+
+def filter_resources_columnar(resources, exclusions):
+    """
+    Filter resources based on exclusion rules with vectorized column operations.
+
+    Returns the same (resources_to_delete, resources_to_preserve) partition,
+    in input order, as filtering.filter_resources.
+    """
+    columns = ResourceColumns(resources)
+    mask = columns.preserve_mask(compile_exclusions(exclusions))
+    return (
+        list(compress(columns.resources, (~mask).tolist())),
+        list(compress(columns.resources, mask.tolist())),
+    )
@@ -1,27 +1,80 @@
 # deletion.py
 import asyncio
+import contextvars
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
+from azure.core.exceptions import ResourceNotFoundError
 from azure.mgmt.resource import ResourceManagementClient
 from azure.mgmt.network import NetworkManagementClient
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.subscription import SubscriptionClient
+from aznuke.src import aio
 from aznuke.src.animations import print_resource_action, create_progress_bar, async_spinner
+from aznuke.src.clients import get_async_client, get_client
+from aznuke.src.resources import Resource
 
 def get_resource_client(credentials, subscription_id):
-    """Create a resource management client for a specific subscription."""
-    return ResourceManagementClient(credentials, subscription_id)
+    """Return the resource management client for a specific subscription."""
+    if aio.is_async_credential(credentials):
+        return get_async_client(aio.get_async_resource_client, credentials, subscription_id)
+    return get_client(ResourceManagementClient, credentials, subscription_id)
 
 def get_network_client(credentials, subscription_id):
-    """Create a network management client for a specific subscription."""
-    return NetworkManagementClient(credentials, subscription_id)
+    """Return the network management client for a specific subscription."""
+    if aio.is_async_credential(credentials):
+        return get_async_client(aio.get_async_network_client, credentials, subscription_id)
+    return get_client(NetworkManagementClient, credentials, subscription_id)
 
 def get_compute_client(credentials, subscription_id):
-    """Create a compute management client for a specific subscription."""
-    return ComputeManagementClient(credentials, subscription_id)
-
-async def delete_resource(credentials, resource, dry_run=False):
-    """Delete a single resource with proper client initialization."""
-    # Get API version based on resource type
-    api_version = {
+    """Return the compute management client for a specific subscription."""
+    if aio.is_async_credential(credentials):
+        return get_async_client(aio.get_async_compute_client, credentials, subscription_id)
+    return get_client(ComputeManagementClient, credentials, subscription_id)
+
+# Number of cached resources checked for existence at the same time
+DEFAULT_VERIFY_CONCURRENCY = 16
+
+# Number of resources deleted at the same time, in total and per subscription
+DEFAULT_MAX_PARALLEL = 16
+DEFAULT_MAX_PARALLEL_PER_SUBSCRIPTION = 8
+
+# Resource types that are detached or disassociated before they are deleted
+SPECIAL_RESOURCE_TYPES = frozenset([
+    "Microsoft.Network/publicIPAddresses",
+    "Microsoft.Network/networkSecurityGroups",
+    "Microsoft.Network/virtualNetworks/subnets",
+    "Microsoft.Network/networkInterfaces",
+    "Microsoft.Compute/disks",
+])
+
+# Locks of the parent resources (VNets, NICs, VMs) updated by the handlers
+# of SPECIAL_RESOURCE_TYPES during a delete_resources run, by lower-cased ID
+_parent_locks = contextvars.ContextVar("aznuke_parent_locks", default=None)
+
+@asynccontextmanager
+async def parent_lock(parent_id):
+    """
+    Hold the lock of a parent resource while it is read, changed and written back.
+    
+    The resources of a dependency level are processed concurrently, and
+    siblings (two subnets of one VNet, two disks of one VM) update the same
+    parent. Their updates run one at a time so none is lost or rejected
+    with AnotherOperationInProgress. Outside delete_resources no lock is held.
+    """
+    locks = _parent_locks.get()
+    if locks is None:
+        yield
+        return
+    key = parent_id.lower()
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+    async with lock:
+        yield
+
+def get_api_version(resource_type):
+    """Return the API version used to address a resource of the given type."""
+    return {
         'Microsoft.Network/publicIPAddresses': '2023-05-01',
         'Microsoft.Network/networkInterfaces': '2023-05-01',
         'Microsoft.Network/virtualNetworks': '2023-05-01',
@@ -29,7 +82,92 @@ async def delete_resource(credentials, resource, dry_run=False):
         'Microsoft.Network/networkWatchers': '2023-05-01',
         'Microsoft.Compute/virtualMachines': '2023-07-01',
         'Microsoft.Compute/disks': '2023-04-02'
-    }.get(resource.type, '2023-07-01')  # Default to latest if type not found
+    }.get(resource_type, '2023-07-01')  # Default to latest if type not found
+
+async def resource_exists(credentials, resource):
+    """
+    Check that a resource still exists.
+    
+    Resources that cannot be checked are reported as existing so the
+    deletion itself reports the problem.
+    """
+    try:
+        resource_client = get_resource_client(credentials, resource.subscription_id)
+        return await aio.call(
+            resource_client.resources.check_existence_by_id,
+            resource.id,
+            get_api_version(resource.type)
+        )
+    except Exception:
+        return True
+
+async def fetch_resource(credentials, resource):
+    """
+    Read the current state of a resource.
+    
+    Returns a record carrying the resource's current tags and location, or
+    None when the resource no longer exists.
+    """
+    resource_client = get_resource_client(credentials, resource.subscription_id)
+    try:
+        current = await aio.call(
+            resource_client.resources.get_by_id,
+            resource.id,
+            get_api_version(resource.type)
+        )
+    except ResourceNotFoundError:
+        return None
+    return Resource(
+        resource.id,
+        resource.name,
+        resource.type,
+        location=getattr(current, 'location', None) or resource.location,
+        tags=getattr(current, 'tags', None),
+        resource_group=resource.resource_group,
+        subscription_id=resource.subscription_id,
+        subscription_name=resource.subscription_name,
+        details=resource.details,
+    )
+
+async def verify_resources(credentials, resources, max_concurrency=DEFAULT_VERIFY_CONCURRENCY, errors=None):
+    """
+    Return up-to-date records of the resources that still exist, reading them concurrently.
+    
+    The records carry the current tags, so exclusions can be applied again
+    before deleting from an inventory that may be out of date. Resources
+    whose current state cannot be read are left out and, when errors is a
+    list, appended to it as (resource, error).
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def check(resource):
+        async with semaphore:
+            try:
+                return await fetch_resource(credentials, resource)
+            except Exception as e:
+                if errors is not None:
+                    errors.append((resource, str(e)))
+                return None
+    
+    current = await asyncio.gather(*(check(resource) for resource in resources))
+    return [resource for resource in current if resource is not None]
+
+def get_detail(resource, field):
+    """
+    Return (found, value) for a detail field fetched during discovery.
+    
+    found is False when discovery did not fetch the field, in which case
+    handlers look the value up themselves.
+    """
+    details = getattr(resource, 'details', None)
+    if isinstance(details, dict) and field in details:
+        return True, details[field]
+    return False, None
+
+async def delete_resource(credentials, resource, dry_run=False):
+    """Delete a single resource with proper client initialization."""
+    # Get API version based on resource type
+    api_version = get_api_version(resource.type)
 
     print_resource_action(resource, "deleting", dry_run=dry_run)
     
@@ -44,7 +182,8 @@ async def delete_resource(credentials, resource, dry_run=False):
                 provider = next((id_parts[index+1] for index, part in enumerate(id_parts) if part == "providers"), None)
                 resource_type = '/'.join(id_parts[id_parts.index(provider)+1:id_parts.index(resource.name)])
 
-                poller = resource_client.resources.begin_delete(
+                poller = await aio.begin(
+                    resource_client.resources.begin_delete,
                     resource_group_name=resource_group,
                     resource_provider_namespace=provider,
                     parent_resource_path="",
@@ -53,7 +192,7 @@ async def delete_resource(credentials, resource, dry_run=False):
                     api_version=api_version
                 )
                 
-                await asyncio.to_thread(poller.result)
+                await aio.wait(poller)
                 print_resource_action(resource, "deleted", dry_run=dry_run)
                 return True
             return False
@@ -102,42 +241,46 @@ async def disassociate_public_ip(network_client, resource, dry_run=False):
             # Get the resource name
             resource_name = resource.name if hasattr(resource, 'name') else resource.id.split('/')[-1]
             
-            # Get public IP address
-            public_ip = await asyncio.to_thread(
-                network_client.public_ip_addresses.get,
-                resource_group_name=resource_group,
-                public_ip_address_name=resource_name
-            )
-            
-            if not public_ip:
-                print_resource_action(resource, "failed", details="Public IP not found", dry_run=dry_run)
-                return False
+            # Use the IP configuration fetched during discovery, if any
+            found, ip_configuration_id = get_detail(resource, "ip_configuration_id")
+            if not found:
+                # Get public IP address
+                public_ip = await aio.call(
+                    network_client.public_ip_addresses.get,
+                    resource_group_name=resource_group,
+                    public_ip_address_name=resource_name
+                )
+                
+                if not public_ip:
+                    print_resource_action(resource, "failed", details="Public IP not found", dry_run=dry_run)
+                    return False
+                
+                if hasattr(public_ip, 'ip_configuration') and public_ip.ip_configuration:
+                    ip_configuration_id = public_ip.ip_configuration.id
 
             # Extract NIC details from the public IP configuration
-            if hasattr(public_ip, 'ip_configuration') and public_ip.ip_configuration:
-                nic_id = public_ip.ip_configuration.id.split('/ipConfigurations')[0]
+            if ip_configuration_id:
+                nic_id = ip_configuration_id.split('/ipConfigurations')[0]
                 nic_name = nic_id.split('/')[-1]
 
-                # Get the network interface
-                nic = await asyncio.to_thread(
-                    network_client.network_interfaces.get,
-                    resource_group, 
-                    nic_name
-                )
+                async with parent_lock(nic_id):
+                    # Get the network interface
+                    nic = await aio.call(
+                        network_client.network_interfaces.get,
+                        resource_group, 
+                        nic_name
+                    )
 
-                # Remove the public IP from the NIC's IP configuration
-                for ip_config in nic.ip_configurations:
-                    if ip_config.public_ip_address and ip_config.public_ip_address.id == resource.id:
-                        ip_config.public_ip_address = None
+                    # Remove the public IP from the NIC's IP configuration
+                    for ip_config in nic.ip_configurations:
+                        if ip_config.public_ip_address and ip_config.public_ip_address.id == resource.id:
+                            ip_config.public_ip_address = None
 
-                # Update the NIC
-                poller = network_client.network_interfaces.begin_create_or_update(resource_group, nic_name, nic)
-                
-                # Wait for completion using the spinner
-                def poller_result():
-                    return poller.result()
-                
-                await async_spinner(f"Disassociating Public IP {resource_name} from NIC {nic_name}...", asyncio.to_thread(poller_result))
+                    # Update the NIC
+                    poller = await aio.begin(network_client.network_interfaces.begin_create_or_update, resource_group, nic_name, nic)
+                    
+                    # Wait for completion using the spinner
+                    await async_spinner(f"Disassociating Public IP {resource_name} from NIC {nic_name}...", aio.wait(poller))
                 print_resource_action(resource, "deleted", details=f"Disassociated from NIC {nic_name}", dry_run=dry_run)
                 return True
             else:
@@ -165,38 +308,35 @@ async def disassociate_nsg(network_client, resource, dry_run=False):
             resource_name = resource.name if hasattr(resource, 'name') else resource.id.split('/')[-1]
             
             # List all network interfaces in the resource group
-            nics = list(await asyncio.to_thread(network_client.network_interfaces.list, resource_group))
+            nics = await aio.collect(network_client.network_interfaces.list, resource_group)
             
             for nic in nics:
                 if nic.network_security_group and nic.network_security_group.id == resource.id:
                     # Remove the NSG association
                     nic.network_security_group = None
-                    poller = network_client.network_interfaces.begin_create_or_update(resource_group, nic.name, nic)
-                    
-                    # Wait for completion using the spinner
-                    def poller_result():
-                        return poller.result()
-                    
-                    await async_spinner(f"Disassociating NSG from NIC {nic.name}...", asyncio.to_thread(poller_result))
+                    async with parent_lock(nic.id):
+                        poller = await aio.begin(network_client.network_interfaces.begin_create_or_update, resource_group, nic.name, nic)
+                        
+                        # Wait for completion using the spinner
+                        await async_spinner(f"Disassociating NSG from NIC {nic.name}...", aio.wait(poller))
                     disassociations.append(f"NIC: {nic.name}")
 
             # Check for subnet associations and remove them if a virtual network is involved
             if "/virtualNetworks/" in resource.id:
                 vnet_name = resource.id.split('/virtualNetworks/')[1].split('/')[0]
-                subnets = list(await asyncio.to_thread(network_client.subnets.list, resource_group, vnet_name))
+                subnets = await aio.collect(network_client.subnets.list, resource_group, vnet_name)
                 
                 for subnet in subnets:
                     if subnet.network_security_group and subnet.network_security_group.id == resource.id:
                         subnet.network_security_group = None
-                        poller = network_client.subnets.begin_create_or_update(
-                            resource_group, vnet_name, subnet.name, subnet
-                        )
-                        
-                        # Wait for completion using the spinner
-                        def poller_result():
-                            return poller.result()
-                        
-                        await async_spinner(f"Disassociating NSG from Subnet {subnet.name}...", asyncio.to_thread(poller_result))
+                        async with parent_lock(subnet.id.split('/subnets/')[0]):
+                            poller = await aio.begin(
+                                network_client.subnets.begin_create_or_update,
+                                resource_group, vnet_name, subnet.name, subnet
+                            )
+                            
+                            # Wait for completion using the spinner
+                            await async_spinner(f"Disassociating NSG from Subnet {subnet.name}...", aio.wait(poller))
                         disassociations.append(f"Subnet: {subnet.name}")
             
             if disassociations:
@@ -236,37 +376,32 @@ async def delete_subnet(network_client, resource, dry_run=False):
                     raise ValueError("Resource group not found in resource ID")
                 
                 # List all network interfaces in the subnet
-                nics = list(await asyncio.to_thread(network_client.network_interfaces.list, resource_group))
+                nics = await aio.collect(network_client.network_interfaces.list, resource_group)
                 nic_deletions = []
                 
                 for nic in nics:
                     for ip_config in nic.ip_configurations:
                         if ip_config.subnet and ip_config.subnet.id == resource.id:
                             print_resource_action(nic, "deleting", details=f"NIC in Subnet: {resource_name}", dry_run=dry_run)
-                            poller = network_client.network_interfaces.begin_delete(resource_group, nic.name)
+                            poller = await aio.begin(network_client.network_interfaces.begin_delete, resource_group, nic.name)
                             
                             # Wait for completion using the spinner
-                            def poller_result():
-                                return poller.result()
-                            
-                            await async_spinner(f"Deleting NIC {nic.name}...", asyncio.to_thread(poller_result))
+                            await async_spinner(f"Deleting NIC {nic.name}...", aio.wait(poller))
                             nic_deletions.append(nic.name)
                             print_resource_action(nic, "deleted", dry_run=dry_run)
 
-                # Get the virtual network
-                vnet = await asyncio.to_thread(network_client.virtual_networks.get, resource_group, vnet_name)
+                async with parent_lock('/'.join(path_parts[:vnet_index + 2])):
+                    # Get the virtual network
+                    vnet = await aio.call(network_client.virtual_networks.get, resource_group, vnet_name)
 
-                # Remove the subnet
-                vnet.subnets = [subnet for subnet in vnet.subnets if subnet.name != resource_name]
+                    # Remove the subnet
+                    vnet.subnets = [subnet for subnet in vnet.subnets if subnet.name != resource_name]
 
-                # Update the virtual network
-                poller = network_client.virtual_networks.begin_create_or_update(resource_group, vnet_name, vnet)
-                
-                # Wait for completion using the spinner
-                def poller_result():
-                    return poller.result()
-                
-                await async_spinner(f"Removing subnet {resource_name} from VNet {vnet_name}...", asyncio.to_thread(poller_result))
+                    # Update the virtual network
+                    poller = await aio.begin(network_client.virtual_networks.begin_create_or_update, resource_group, vnet_name, vnet)
+                    
+                    # Wait for completion using the spinner
+                    await async_spinner(f"Removing subnet {resource_name} from VNet {vnet_name}...", aio.wait(poller))
                 
                 details = f"Removed from VNet {vnet_name}"
                 if nic_deletions:
@@ -297,22 +432,22 @@ async def detach_network_interface(compute_client, resource, dry_run=False):
                 resource_group = resource.id.split('/resourceGroups/')[1].split('/')[0]
                 vm_name = resource.id.split('/virtualMachines/')[1].split('/')[0]
 
-                # Get the virtual machine
-                vm = await asyncio.to_thread(compute_client.virtual_machines.get, resource_group, vm_name)
+                vm_id = f"{resource.id.split('/virtualMachines/')[0]}/virtualMachines/{vm_name}"
 
-                # Remove the NIC from the VM's network profile
-                vm.network_profile.network_interfaces = [
-                    nic for nic in vm.network_profile.network_interfaces if nic.id != resource.id
-                ]
+                async with parent_lock(vm_id):
+                    # Get the virtual machine
+                    vm = await aio.call(compute_client.virtual_machines.get, resource_group, vm_name)
 
-                # Update the virtual machine
-                poller = compute_client.virtual_machines.begin_create_or_update(resource_group, vm_name, vm)
-                
-                # Wait for completion using the spinner
-                def poller_result():
-                    return poller.result()
-                
-                await async_spinner(f"Detaching NIC from VM {vm_name}...", asyncio.to_thread(poller_result))
+                    # Remove the NIC from the VM's network profile
+                    vm.network_profile.network_interfaces = [
+                        nic for nic in vm.network_profile.network_interfaces if nic.id != resource.id
+                    ]
+
+                    # Update the virtual machine
+                    poller = await aio.begin(compute_client.virtual_machines.begin_create_or_update, resource_group, vm_name, vm)
+                    
+                    # Wait for completion using the spinner
+                    await async_spinner(f"Detaching NIC from VM {vm_name}...", aio.wait(poller))
                 print_resource_action(resource, "deleted", details=f"Detached from VM {vm_name}", dry_run=dry_run)
                 return True
             else:
@@ -336,42 +471,44 @@ async def detach_disk(compute_client, resource, dry_run=False):
             resource_group = resource.id.split('/resourceGroups/')[1].split('/')[0]
             disk_name = resource.name if hasattr(resource, 'name') else resource.id.split('/')[-1]
 
-            disk = await asyncio.to_thread(
-                compute_client.disks.get, resource_group, disk_name
-            )
-
             # managed_by is set to the VM resource ID when the disk is attached
-            if not disk.managed_by:
+            found, managed_by = get_detail(resource, "managed_by")
+            if not found:
+                disk = await aio.call(
+                    compute_client.disks.get, resource_group, disk_name
+                )
+                managed_by = disk.managed_by
+
+            if not managed_by:
                 print_resource_action(resource, "deleted", details="Disk not attached to any VM", dry_run=dry_run)
                 return True
 
-            vm_id = disk.managed_by
+            vm_id = managed_by
             vm_resource_group = vm_id.split('/resourceGroups/')[1].split('/')[0]
             vm_name = vm_id.split('/virtualMachines/')[1].split('/')[0]
 
-            vm = await asyncio.to_thread(
-                compute_client.virtual_machines.get, vm_resource_group, vm_name
-            )
-
-            # Remove this disk from the VM's data disks list
-            original_count = len(vm.storage_profile.data_disks)
-            vm.storage_profile.data_disks = [
-                d for d in vm.storage_profile.data_disks
-                if d.managed_disk is None or d.managed_disk.id != resource.id
-            ]
+            async with parent_lock(vm_id):
+                vm = await aio.call(
+                    compute_client.virtual_machines.get, vm_resource_group, vm_name
+                )
 
-            if len(vm.storage_profile.data_disks) == original_count:
-                print_resource_action(resource, "deleted", details="Disk not found in VM data disks", dry_run=dry_run)
-                return True
+                # Remove this disk from the VM's data disks list
+                original_count = len(vm.storage_profile.data_disks)
+                vm.storage_profile.data_disks = [
+                    d for d in vm.storage_profile.data_disks
+                    if d.managed_disk is None or d.managed_disk.id != resource.id
+                ]
 
-            poller = compute_client.virtual_machines.begin_create_or_update(
-                vm_resource_group, vm_name, vm
-            )
+                if len(vm.storage_profile.data_disks) == original_count:
+                    print_resource_action(resource, "deleted", details="Disk not found in VM data disks", dry_run=dry_run)
+                    return True
 
-            def poller_result():
-                return poller.result()
+                poller = await aio.begin(
+                    compute_client.virtual_machines.begin_create_or_update,
+                    vm_resource_group, vm_name, vm
+                )
 
-            await async_spinner(f"Detaching disk {disk_name} from VM {vm_name}...", asyncio.to_thread(poller_result))
+                await async_spinner(f"Detaching disk {disk_name} from VM {vm_name}...", aio.wait(poller))
             print_resource_action(resource, "deleted", details=f"Detached from VM {vm_name}", dry_run=dry_run)
             return True
         except Exception as e:
@@ -382,78 +519,239 @@ async def detach_disk(compute_client, resource, dry_run=False):
         print_resource_action(resource, "deleted", details="Disk detachment (simulation)", dry_run=dry_run)
         return True
 
+# Deletion order of known resource types: every resource of a type is
+# deleted before the resources of the types after it
+DELETION_TYPE_ORDER = {
+    "Microsoft.Network/virtualNetworks/subnets": 0,
+    "Microsoft.Network/publicIPAddresses": 1,
+    "Microsoft.Network/networkInterfaces": 2,
+    "Microsoft.Compute/virtualMachines": 3,
+    "Microsoft.Network/virtualNetworks": 4,
+    "Microsoft.Network/networkSecurityGroups": 5,
+    "Microsoft.Storage/storageAccounts": 6,
+    "Microsoft.Compute/disks": 7,
+    "Microsoft.Resources/resourceGroups": 8,
+}
+
+def _id_segments(resource_id):
+    """Return the lower-cased segments of an ARM ID (ARM IDs are case-insensitive)."""
+    return [segment for segment in resource_id.lower().split("/") if segment]
+
+class DependencyGraph(Mapping):
+    """
+    Deletion dependencies of a set of resources.
+
+    Maps each resource ID to the resources deleted before it: every resource
+    of an earlier type in DELETION_TYPE_ORDER, and the resources it contains
+    (e.g. the subnets of a virtual network, whose IDs extend its own). The
+    type order is kept as one bucket of resources per type rather than as an
+    edge between every pair, and each resource is linked only to its nearest
+    container, found by walking a trie of ARM ID segments, so the graph
+    takes linear time and memory to build. sort_by_dependencies orders it
+    without materializing the pairwise edges.
+    """
+
+    def __init__(self, resources):
+        self.resources = {}
+        self.levels = {}
+        self.buckets = {}
+        self.children = {}
+
+        trie = {}
+        paths = []
+        for resource in resources:
+            resource_id = resource.id
+            self.resources[resource_id] = resource
+            level = DELETION_TYPE_ORDER.get(getattr(resource, 'type', None))
+            if level is not None:
+                self.levels[resource_id] = level
+                self.buckets.setdefault(level, []).append(resource)
+            if isinstance(resource_id, str):
+                node = trie
+                for segment in _id_segments(resource_id):
+                    node = node.setdefault(segment, {})
+                node.setdefault(None, []).append(resource)
+                paths.append((resource_id, node))
+
+        # The nearest resource stored on the path to a node contains it;
+        # containers further up follow through that one
+        for resource_id, node in paths:
+            container = None
+            walk = trie
+            for segment in _id_segments(resource_id):
+                container = walk.get(None) or container
+                walk = walk[segment]
+            if container:
+                for holder in container:
+                    self.children.setdefault(holder.id, []).append(self.resources[resource_id])
+
+    def __getitem__(self, resource_id):
+        if resource_id not in self.resources:
+            raise KeyError(resource_id)
+        dependencies = []
+        level = self.levels.get(resource_id)
+        if level is not None:
+            for lower in sorted(self.buckets):
+                if lower >= level:
+                    break
+                dependencies.extend(self.buckets[lower])
+        dependencies.extend(self.children.get(resource_id, ()))
+        return dependencies
+
+    def __iter__(self):
+        return iter(self.resources)
+
+    def __len__(self):
+        return len(self.resources)
+
+    def edges(self):
+        """
+        Yield (node, dependency) pairs, linear in the number of resources.
+
+        Nodes are resource IDs, plus one ("level", n) barrier per level of
+        DELETION_TYPE_ORDER that depends on every resource of that level.
+        Each typed resource depends on the barrier of the level below it
+        instead of on every resource of every earlier type, and each
+        container on the resources it directly contains.
+        """
+        previous = None
+        for level in sorted(self.buckets):
+            barrier = ("level", level)
+            for resource in self.buckets[level]:
+                if previous is not None:
+                    yield resource.id, previous
+                yield barrier, resource.id
+            previous = barrier
+        for resource_id, children in self.children.items():
+            for child in children:
+                yield resource_id, child.id
+
 def build_dependency_graph(resources):
-    """Build a dependency graph for the given resources."""
-    dependency_graph = {}
-    
-    # Map resource types to their dependency order
-    resource_type_order = {
-        "Microsoft.Network/virtualNetworks/subnets": 0,
-        "Microsoft.Network/publicIPAddresses": 1,
-        "Microsoft.Network/networkInterfaces": 2,
-        "Microsoft.Compute/virtualMachines": 3,
-        "Microsoft.Network/virtualNetworks": 4,
-        "Microsoft.Network/networkSecurityGroups": 5,
-        "Microsoft.Storage/storageAccounts": 6,
-        "Microsoft.Compute/disks": 7,
-        "Microsoft.Resources/resourceGroups": 8,
-    }
-    
-    # Initialize the dependency graph
+    """Build a dependency graph for the given resources (see DependencyGraph)."""
+    return DependencyGraph(resources)
+
+class DependencyCycleError(ValueError):
+    """Raised when the dependencies of the resources to delete form a cycle."""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__("Dependency cycle: " + " -> ".join(_describe_node(node) for node in cycle))
+
+def _describe_node(node):
+    """Return a readable name for a resource or a DependencyGraph barrier node."""
+    if isinstance(node, tuple):
+        types = [name for name, level in DELETION_TYPE_ORDER.items() if level == node[1]]
+        return f"all {', '.join(types)}"
+    return getattr(node, 'name', None) or str(getattr(node, 'id', node))
+
+def _graph_edges(dependency_graph, index):
+    """Yield the (node, dependency) pairs of a dependency graph, dependencies as IDs."""
+    if isinstance(dependency_graph, DependencyGraph):
+        yield from dependency_graph.edges()
+        return
+    for resource_id in index:
+        for dependency in dependency_graph.get(resource_id, ()):
+            yield resource_id, dependency if isinstance(dependency, str) else dependency.id
+
+def _find_cycle(dependencies, blocked):
+    """Return the nodes of a cycle among blocked nodes, each depending on the next."""
+    node = next(iter(blocked))
+    seen = {}
+    path = []
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = next(dependency for dependency in dependencies[node] if dependency in blocked)
+    return path[seen[node]:] + [node]
+
+def dependency_levels(resources, dependency_graph, strict=False, cycles=None):
+    """
+    Group resources into dependency levels with an iterative (Kahn) topological sort.
+
+    Every resource comes in a later level than all of its dependencies, so
+    the resources of one level can be processed together. Levels keep the
+    input order. Runs in O(V + E) over an ID index of resources;
+    dependencies outside resources are ignored.
+
+    Args:
+        resources: Resources to order
+        dependency_graph: DependencyGraph, or a dictionary mapping resource
+            IDs to the resources (or IDs) processed before them
+        strict: Raise DependencyCycleError on a cycle instead of breaking it
+        cycles: Optional list the cycles broken are appended to, each as
+            the resources involved
+
+    Raises:
+        DependencyCycleError: If strict and the dependencies form a cycle
+    """
+    index = {}
     for resource in resources:
-        resource_id = resource.id
-        dependency_graph[resource_id] = []
-    
-    # Add dependencies based on resource types and relationships
-    for resource in resources:
-        resource_id = resource.id
-        resource_type = resource.type if hasattr(resource, 'type') else ""
-        
-        for other_resource in resources:
-            other_id = other_resource.id
-            other_type = other_resource.type if hasattr(other_resource, 'type') else ""
-            
-            # Skip self-comparison
-            if resource_id == other_id:
+        index.setdefault(resource.id, resource)
+    position = {resource_id: number for number, resource_id in enumerate(index)}
+
+    dependencies = {resource_id: [] for resource_id in index}
+    dependents = {resource_id: [] for resource_id in index}
+    for node, dependency in _graph_edges(dependency_graph, index):
+        if node == dependency:
+            continue
+        # Barrier nodes of a DependencyGraph are created on first use
+        for key in (node, dependency):
+            if key not in dependencies:
+                if not isinstance(key, tuple):
+                    break
+                dependencies[key] = []
+                dependents[key] = []
+        else:
+            dependencies[node].append(dependency)
+            dependents[dependency].append(node)
+
+    pending = {node: len(node_dependencies) for node, node_dependencies in dependencies.items()}
+    ready = [node for node, count in pending.items() if count == 0]
+    levels = []
+    while pending:
+        if not ready:
+            blocked = set(pending)
+            cycle = _find_cycle(dependencies, blocked)
+            cycle_nodes = [index.get(node, node) for node in cycle]
+            if strict:
+                raise DependencyCycleError(cycle_nodes)
+            if cycles is not None:
+                cycles.append([node for node in cycle_nodes if not isinstance(node, tuple)])
+            # Release the resource of the cycle that came first in the input
+            ready = [min((node for node in cycle if node in position), key=position.__getitem__)]
+            pending[ready[0]] = 0
+
+        level = []
+        next_ready = []
+        # Barriers complete in the level that releases them, so the
+        # resources waiting on a barrier join the following level
+        for node in ready:
+            if pending.pop(node, None) is None:
                 continue
-            
-            # Add dependency based on resource type order
-            if (resource_type in resource_type_order and 
-                other_type in resource_type_order and 
-                resource_type_order[resource_type] < resource_type_order[other_type]):
-                dependency_graph[other_id].append(resource)
-            
-            # Add dependency if one resource is contained within another
-            if other_id != resource_id and other_id in resource_id:
-                dependency_graph[resource_id].append(other_resource)
-    
-    return dependency_graph
-
-def sort_by_dependencies(resources, dependency_graph):
-    """Sort resources based on their dependencies."""
-    sorted_resources = []
-    visited = set()
-
-    def visit(resource):
-        resource_id = resource.id
-        if resource_id in visited:
-            return
-        visited.add(resource_id)
-        for dependency in dependency_graph.get(resource_id, []):
-            if isinstance(dependency, str):
-                # Handle the case where the dependency is a string ID
-                dep_resource = next((r for r in resources if r.id == dependency), None)
-                if dep_resource:
-                    visit(dep_resource)
-            else:
-                # Handle the case where the dependency is a resource object
-                visit(dependency)
-        sorted_resources.append(resource)
-
-    for resource in resources:
-        visit(resource)
-
-    return sorted_resources
+            released = next_ready if node in index else ready
+            if node in index:
+                level.append(node)
+            for dependent in dependents[node]:
+                if dependent in pending:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        released.append(dependent)
+        if level:
+            level.sort(key=position.__getitem__)
+            levels.append([index[node] for node in level])
+        ready = next_ready
+    return levels
+
+def sort_by_dependencies(resources, dependency_graph, strict=False, cycles=None):
+    """
+    Sort resources based on their dependencies.
+
+    Returns the levels of dependency_levels one after the other; see there
+    for the arguments.
+    """
+    return [resource
+            for level in dependency_levels(resources, dependency_graph, strict, cycles)
+            for resource in level]
 
 async def delete_empty_resource_groups(credentials, resource_groups, dry_run=False):
     """Delete resource groups that are empty after resource deletion."""
@@ -461,9 +759,9 @@ async def delete_empty_resource_groups(credentials, resource_groups, dry_run=Fal
     for rg_name, subscription_id in resource_groups.items():
         try:
             resource_client = get_resource_client(credentials, subscription_id)
-            remaining = list(await asyncio.to_thread(
+            remaining = await aio.collect(
                 resource_client.resources.list_by_resource_group, rg_name
-            ))
+            )
             if remaining:
                 continue
 
@@ -472,20 +770,57 @@ async def delete_empty_resource_groups(credentials, resource_groups, dry_run=Fal
                 deleted_rgs.append(rg_name)
                 continue
 
-            poller = resource_client.resource_groups.begin_delete(rg_name)
-
-            def poller_result():
-                return poller.result()
+            poller = await aio.begin(resource_client.resource_groups.begin_delete, rg_name)
 
-            await async_spinner(f"Deleting empty resource group {rg_name}...", asyncio.to_thread(poller_result))
+            await async_spinner(f"Deleting empty resource group {rg_name}...", aio.wait(poller))
             deleted_rgs.append(rg_name)
         except Exception as e:
             print(f"  [WARN] Could not delete resource group {rg_name}: {e}")
     return deleted_rgs
 
 
-async def delete_resources(credentials, resources_to_delete, dry_run=True, cleanup_empty_rgs=False):
-    """Delete multiple resources in the correct order with proper async handling."""
+async def _delete_planned_resource(credentials, resource, dry_run):
+    """Pre-process and delete one resource, returning an error message or None."""
+    try:
+        # Handle special resources that need pre-processing
+        if resource.type in SPECIAL_RESOURCE_TYPES:
+            await process_special_resource(credentials, resource, dry_run)
+
+        # Delete the resource
+        result = await delete_resource(credentials, resource, dry_run)
+
+        if result is True or (isinstance(result, tuple) and result[0]):
+            return None
+        return result[1] if isinstance(result, tuple) and len(result) > 1 else "Unknown error"
+    except Exception as e:
+        print_resource_action(resource, "failed", details=str(e), dry_run=dry_run)
+        return str(e)
+
+async def delete_resources(credentials, resources_to_delete, dry_run=True, cleanup_empty_rgs=False,
+                           max_parallel=DEFAULT_MAX_PARALLEL,
+                           max_parallel_per_subscription=DEFAULT_MAX_PARALLEL_PER_SUBSCRIPTION):
+    """
+    Delete multiple resources in the correct order with proper async handling.
+
+    The resources of each subscription are deleted in dependency levels (see
+    dependency_levels): a level starts once every resource of the previous
+    one has been deleted or has failed, and the resources within a level
+    are deleted concurrently. Each subscription runs as its own task with
+    its own limit, so a run takes about as long as its slowest
+    subscription; a subscription that fails reports its remaining
+    resources as failed without stopping the others. Handlers that update
+    a shared parent resource (see parent_lock) take turns. Progress of
+    every subscription goes to one progress bar.
+
+    Args:
+        credentials: Azure credentials
+        resources_to_delete: Resources to delete
+        dry_run: Only simulate the deletion
+        cleanup_empty_rgs: Delete the resource groups left empty afterwards
+        max_parallel: Maximum number of resources deleted at the same time
+        max_parallel_per_subscription: Maximum number of resources of one
+            subscription deleted at the same time
+    """
     deleted_resources = []
     failed_resources = []
 
@@ -508,39 +843,62 @@ async def delete_resources(credentials, resources_to_delete, dry_run=True, clean
     # Create progress bar for overall deletion process
     total_resources = len(resources_to_delete)
     progress_bar = create_progress_bar(total_resources, "Deleting resources" if not dry_run else "Dry run - simulating deletion")
+    global_limit = asyncio.Semaphore(max(1, max_parallel))
 
-    for subscription_id, resources in resources_by_subscription.items():
-        # Build and sort the dependency graph
-        dependency_graph = build_dependency_graph(resources)
-        sorted_resources = sort_by_dependencies(resources, dependency_graph)
-
-        for resource in sorted_resources:
+    async def delete_limited(resource, subscription_limit):
+        # The subscription slot is taken first, so a busy subscription does
+        # not hold global slots while it waits for its own
+        async with subscription_limit, global_limit:
             try:
-                # Handle special resources that need pre-processing
-                if resource.type in [
-                    "Microsoft.Network/publicIPAddresses",
-                    "Microsoft.Network/networkSecurityGroups",
-                    "Microsoft.Network/virtualNetworks/subnets",
-                    "Microsoft.Network/networkInterfaces",
-                    "Microsoft.Compute/disks"
-                ]:
-                    await process_special_resource(credentials, resource, dry_run)
-
-                # Delete the resource
-                result = await delete_resource(credentials, resource, dry_run)
-
-                if result is True or (isinstance(result, tuple) and result[0]):
-                    deleted_resources.append(resource)
-                else:
-                    error_msg = result[1] if isinstance(result, tuple) and len(result) > 1 else "Unknown error"
-                    failed_resources.append((resource, error_msg))
-            except Exception as e:
-                print_resource_action(resource, "failed", details=str(e), dry_run=dry_run)
-                failed_resources.append((resource, str(e)))
+                return await _delete_planned_resource(credentials, resource, dry_run)
             finally:
                 # Update progress bar
                 progress_bar.update(1)
 
+    finished_subscriptions = 0
+
+    async def delete_subscription(subscription_id, resources):
+        nonlocal finished_subscriptions
+        processed = set()
+        try:
+            # Build the dependency graph and group it into levels
+            dependency_graph = build_dependency_graph(resources)
+            cycles = []
+            levels = dependency_levels(resources, dependency_graph, cycles=cycles)
+            for cycle in cycles:
+                print(f"  [WARN] Dependency cycle between {', '.join(str(resource.name) for resource in cycle)}; "
+                      f"deleting in discovery order")
+
+            subscription_limit = asyncio.Semaphore(max(1, max_parallel_per_subscription))
+            for level in levels:
+                errors = await asyncio.gather(*(delete_limited(resource, subscription_limit) for resource in level),
+                                              return_exceptions=True)
+                for resource, error in zip(level, errors):
+                    processed.add(id(resource))
+                    if error is None:
+                        deleted_resources.append(resource)
+                    else:
+                        failed_resources.append((resource, str(error)))
+        except Exception as e:
+            # Only this subscription stops; its remaining resources are reported as failed
+            print(f"  [WARN] Deletion in subscription {subscription_id} stopped: {e}")
+            for resource in resources:
+                if id(resource) not in processed:
+                    failed_resources.append((resource, f"Subscription deletion stopped: {e}"))
+                    progress_bar.update(1)
+        finally:
+            finished_subscriptions += 1
+            progress_bar.set_postfix(subscriptions=f"{finished_subscriptions}/{len(resources_by_subscription)}",
+                                     failed=len(failed_resources))
+
+    # Handlers of one level that update the same parent take turns
+    token = _parent_locks.set({})
+    try:
+        await asyncio.gather(*(delete_subscription(subscription_id, resources)
+                               for subscription_id, resources in resources_by_subscription.items()))
+    finally:
+        _parent_locks.reset(token)
+
     progress_bar.close()
 
     if cleanup_empty_rgs and touched_rgs:
@@ -1,47 +1,366 @@
 # discovery.py
+import contextvars
+import functools
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import ResourceNotFoundError
+
 from aznuke.src.auth import get_resource_client
+from aznuke.src.resources import Resource
+
+# Number of subscriptions scanned concurrently by default
+DEFAULT_DISCOVERY_WORKERS = 8
+
+# Number of resource groups of one subscription listed concurrently when
+# discovery is sharded by resource group
+DEFAULT_SHARD_WORKERS = 8
+
+# Resources handed from discovery workers to the consumer per batch, and the
+# number of batches that may be waiting before workers pause
+STREAM_BATCH_SIZE = 200
+STREAM_QUEUE_SIZE = 16
+
+# Upper bound on the length of a single $filter expression sent to ARM
+MAX_FILTER_LENGTH = 2000
+
+def _quote(value):
+    """Quote a string literal for an OData $filter expression."""
+    return "'" + value.replace("'", "''") + "'"
+
+def _or_filters(field, values, max_length=None):
+    """
+    Build OR-ed "field eq 'value'" $filter expressions.
+    
+    Values are combined into as few expressions as possible while keeping
+    each expression under max_length characters.
+    """
+    max_length = max_length or MAX_FILTER_LENGTH
+    filters = []
+    clauses = []
+    length = 0
+    
+    # dict.fromkeys drops duplicate values while preserving order
+    for value in dict.fromkeys(values):
+        clause = f"{field} eq {_quote(value)}"
+        added_length = len(clause) + (len(" or ") if clauses else 0)
+        if clauses and length + added_length > max_length:
+            filters.append(" or ".join(clauses))
+            clauses = []
+            added_length = len(clause)
+            length = 0
+        clauses.append(clause)
+        length += added_length
+    
+    if clauses:
+        filters.append(" or ".join(clauses))
+    
+    return filters
+
+def build_type_filters(resource_types, max_length=None):
+    """
+    Build OR-ed resourceType $filter expressions for a list of resource types.
+    
+    Args:
+        resource_types: List of resource types to filter by
+        max_length: Maximum length of a single filter expression
+            (defaults to MAX_FILTER_LENGTH)
+    """
+    return _or_filters("resourceType", resource_types, max_length)
+
+def build_location_filters(regions, max_length=None):
+    """
+    Build OR-ed location $filter expressions for a list of regions.
+    
+    Args:
+        regions: List of normalized region names to filter by
+        max_length: Maximum length of a single filter expression
+            (defaults to MAX_FILTER_LENGTH)
+    """
+    return _or_filters("location", regions, max_length)
+
+def build_filters(resource_types=None, regions=None):
+    """
+    Build the $filter expressions used to list resources in a subscription.
+    
+    ARM does not accept resourceType and location clauses in the same
+    filter, so when both are requested only the types are sent and the
+    regions are checked on the results with in_regions. Returns [None] when
+    there is nothing to filter on.
+    
+    Args:
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+    """
+    if resource_types:
+        return build_type_filters(resource_types)
+    if regions:
+        return build_location_filters(regions)
+    return [None]
+
+def normalize_region(region):
+    """Normalize a region name, e.g. 'West US 2' -> 'westus2'."""
+    return region.replace(" ", "").lower()
+
+def in_regions(resource, regions):
+    """Return True if the resource location is one of the normalized regions."""
+    location = getattr(resource, 'location', None)
+    return isinstance(location, str) and normalize_region(location) in regions
+
+def resource_key(resource):
+    """Return a key identifying a resource for de-duplication."""
+    resource_id = getattr(resource, 'id', None)
+    # ARM resource IDs are case-insensitive
+    return resource_id.lower() if isinstance(resource_id, str) else resource
+
+def list_operation(resource_client, resource_group=None):
+    """Return the operation listing a subscription, or one of its resource groups."""
+    if resource_group is None:
+        return resource_client.resources.list
+    return functools.partial(resource_client.resources.list_by_resource_group, resource_group)
+
+def iter_resources(resource_client, resource_types=None, regions=None, resource_group=None):
+    """
+    Yield resources in a subscription as their pages arrive.
+    
+    Resource types and regions are pushed into OR-ed $filter expressions (see
+    build_filters) so the number of list calls does not grow with the number
+    of types and resources outside the regions are not transferred.
+    
+    Args:
+        resource_client: The Azure resource client
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+        resource_group: Optional resource group to restrict the listing to
+    """
+    list_resources = list_operation(resource_client, resource_group)
+    filters = build_filters(resource_types, regions)
+    if filters == [None]:
+        # Get all resources if no specific types or regions are requested
+        yield from list_resources()
+        return
+    
+    region_set = set(regions) if regions else None
+    seen = set()
+    for filter_str in filters:
+        for resource in list_resources(filter=filter_str):
+            if region_set and not in_regions(resource, region_set):
+                continue
+            key = resource_key(resource)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield resource
+
+def _batched(items, size=STREAM_BATCH_SIZE):
+    """Yield lists of up to size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _fan_out(items, produce, max_workers, thread_name_prefix="aznuke-discovery"):
+    """
+    Run produce(item) for every item on a bounded pool of threads.
+    
+    produce returns an iterator of batches. Yields (item, kind, payload)
+    messages as they arrive: ("batch", batch) for every batch and
+    ("error", exception) when produce fails for an item. Batches are handed
+    over through a bounded queue, so producers pause while the consumer is
+    behind, and they stop once the consumer closes this generator.
+    """
+    items = list(items)
+    if not items:
+        return
+    
+    workers = max(1, min(max_workers, len(items)))
+    results = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+    
+    def put(message):
+        # Block while the consumer is behind, but give up once it has gone away
+        while not stop.is_set():
+            try:
+                results.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def run(item):
+        try:
+            for batch in produce(item):
+                if not put((item, "batch", batch)):
+                    return
+        except Exception as e:
+            put((item, "error", e))
+        finally:
+            put((item, "done", None))
+    
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix)
+    try:
+        for item in items:
+            # Workers see the caller's context, e.g. the active client registry
+            executor.submit(contextvars.copy_context().run, run, item)
+        
+        remaining = len(items)
+        while remaining:
+            item, kind, payload = results.get()
+            if kind == "done":
+                remaining -= 1
+            else:
+                yield item, kind, payload
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
 
-def discover_resources(resource_client, resource_types=None):
+def iter_resources_by_resource_group(resource_client, resource_types=None, regions=None,
+                                     max_workers=DEFAULT_SHARD_WORKERS):
+    """
+    Yield resources in a subscription by listing its resource groups concurrently.
+    
+    A single resources.list() is one sequential chain of pages. Listing each
+    resource group with list_by_resource_group instead runs up to
+    max_workers page chains at the same time. Resource groups deleted while
+    the subscription is scanned are skipped.
+    
+    Args:
+        resource_client: The Azure resource client
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+        max_workers: Maximum number of resource groups listed at the same time
+    """
+    groups = [group.name for group in resource_client.resource_groups.list()]
+    
+    def list_group(group):
+        return _batched(iter_resources(resource_client, resource_types, regions, resource_group=group))
+    
+    for group, kind, payload in _fan_out(groups, list_group, max_workers, "aznuke-shard"):
+        if kind == "batch":
+            yield from payload
+        elif not isinstance(payload, ResourceNotFoundError):
+            raise payload
+
+def discover_resources(resource_client, resource_types=None, regions=None):
     """
     Discover resources in a subscription.
     
     Args:
         resource_client: The Azure resource client
         resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
     """
-    if resource_types:
-        # Filter resources by type if specific types are requested
-        resources = []
-        for resource_type in resource_types:
-            # Azure resource types are case-sensitive
-            filter_str = f"resourceType eq '{resource_type}'"
-            filtered_resources = list(resource_client.resources.list(filter=filter_str))
-            resources.extend(filtered_resources)
-        return resources
+    return list(iter_resources(resource_client, resource_types, regions))
+
+def iter_subscription_resources(credentials, subscription, resource_types=None, regions=None, details=False,
+                                shard_workers=None):
+    """
+    Yield compact records of the resources in a single subscription.
+    
+    Each SDK model is converted to a Resource tagged with the subscription,
+    so only the fields aznuke uses are kept alive.
+    
+    Args:
+        credentials: Azure credentials
+        subscription: The subscription to scan
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+        details: Whether to keep the fields deletion handlers need
+        shard_workers: List resource groups concurrently with this many
+            workers instead of listing the subscription in one page chain
+    """
+    resource_client = get_resource_client(credentials, subscription.subscription_id)
+    
+    if shard_workers:
+        resources = iter_resources_by_resource_group(resource_client, resource_types, regions, shard_workers)
     else:
-        # Get all resources if no specific types are requested
-        resources = list(resource_client.resources.list())
-        return resources
+        resources = iter_resources(resource_client, resource_types, regions)
+    for resource in resources:
+        yield Resource.from_sdk(resource, subscription, details)
 
-def discover_all_resources(credentials, subscriptions, resource_types=None):
+def discover_subscription_resources(credentials, subscription, resource_types=None, regions=None):
     """
-    Discover all resources across all subscriptions.
+    Discover resources in a single subscription and tag them with subscription info.
+    
+    Args:
+        credentials: Azure credentials
+        subscription: The subscription to scan
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+    """
+    return list(iter_subscription_resources(credentials, subscription, resource_types, regions))
+
+def iter_all_resource_batches(credentials, subscriptions, resource_types=None,
+                              max_workers=DEFAULT_DISCOVERY_WORKERS, errors=None, regions=None, details=False,
+                              shard_workers=None):
+    """
+    Yield batches of resources across all subscriptions as they are discovered.
+    
+    Subscriptions are scanned concurrently by a bounded pool of workers that
+    hand over batches of up to STREAM_BATCH_SIZE resources through a bounded
+    queue, so memory use does not grow with the size of the estate when the
+    consumer keeps up. A failure in one subscription is reported and skipped
+    so it does not abort the scan.
     
     Args:
         credentials: Azure credentials
         subscriptions: List of subscriptions to scan
         resource_types: Optional list of resource types to filter by
+        max_workers: Maximum number of subscriptions scanned at the same time
+        errors: Optional list that receives (subscription, exception) pairs
+        regions: Optional list of normalized region names to filter by
+        details: Whether to keep the fields deletion handlers need
+        shard_workers: Optional number of resource groups of each
+            subscription listed at the same time (see
+            iter_resources_by_resource_group)
     """
-    all_resources = []
+    def scan(subscription):
+        return _batched(iter_subscription_resources(credentials, subscription, resource_types, regions,
+                                                    details, shard_workers))
     
-    for subscription in subscriptions:
-        resource_client = get_resource_client(credentials, subscription.subscription_id)
-        resources = discover_resources(resource_client, resource_types)
-        
-        # Enhance resources with subscription info
-        for resource in resources:
-            resource.subscription_id = subscription.subscription_id
-            resource.subscription_name = subscription.display_name
-            all_resources.append(resource)
+    for subscription, kind, payload in _fan_out(subscriptions, scan, max_workers or DEFAULT_DISCOVERY_WORKERS):
+        if kind == "batch":
+            yield payload
+        else:
+            # stderr, so the warning never lands in a JSON report streamed to stdout
+            print(f"Warning: Failed to discover resources in subscription "
+                  f"{subscription.display_name} ({subscription.subscription_id}): {payload}", file=sys.stderr)
+            if errors is not None:
+                errors.append((subscription, payload))
+
+def iter_all_resources(credentials, subscriptions, resource_types=None,
+                       max_workers=DEFAULT_DISCOVERY_WORKERS, errors=None, regions=None):
+    """
+    Yield resources across all subscriptions as they are discovered.
+    
+    See iter_all_resource_batches for the concurrency and error handling.
+    """
+    for batch in iter_all_resource_batches(credentials, subscriptions, resource_types, max_workers, errors,
+                                           regions=regions):
+        yield from batch
+
+def discover_all_resources(credentials, subscriptions, resource_types=None,
+                           max_workers=DEFAULT_DISCOVERY_WORKERS, errors=None, regions=None):
+    """
+    Discover all resources across all subscriptions.
     
-    return all_resources
\ No newline at end of file
+    Subscriptions are scanned concurrently by a bounded pool of workers and
+    results are merged as each subscription completes. A failure in one
+    subscription is reported and skipped so it does not abort the scan.
+    
+    Args:
+        credentials: Azure credentials
+        subscriptions: List of subscriptions to scan
+        resource_types: Optional list of resource types to filter by
+        max_workers: Maximum number of subscriptions scanned at the same time
+        errors: Optional list that receives (subscription, exception) pairs
+        regions: Optional list of normalized region names to filter by
+    """
+    return list(iter_all_resources(credentials, subscriptions, resource_types, max_workers, errors,
+                                   regions=regions))
@@ -0,0 +1,324 @@
+# explain.py
+import json
+import re
+import time
+
+from aznuke.src.filtering import _resource_group, _resource_region, _string_attr, compile_exclusions
+
+# One resource in this many is timed, and checked against every rule, in explain mode
+EXPLAIN_SAMPLE_INTERVAL = 100
+
+# Preserved resources listed one by one in the report; the rest are only counted
+EXPLAIN_MAX_PRESERVED = 10000
+
+# Rule kinds in the order ExclusionMatcher checks them; the first rule
+# reported for a preserved resource is the first match in this order
+RULE_KINDS = ("resource_types", "resource_ids", "name_patterns", "resource_groups", "regions", "tags")
+
+def _tag_rule(key, value):
+    return f"{key}={value}"
+
+def _timer_overhead_ns(rounds=1000):
+    """Return the smallest interval perf_counter_ns measures, subtracted from every timing."""
+    overhead = None
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        elapsed = time.perf_counter_ns() - start
+        overhead = elapsed if overhead is None else min(overhead, elapsed)
+    return overhead or 0
+
+def _name_patterns(matcher):
+    """Return (pattern, match) for each configured name pattern, compiled separately."""
+    return [(pattern, re.compile(pattern).match) for pattern in matcher.config.get('name_patterns') or ()]
+
+def _rule_checks(matcher):
+    """
+    Return {kind: check} for the rule kinds the matcher has.
+
+    check(resource) returns the rules of that kind matching the resource,
+    one string per rule, as they appear in the report.
+    """
+    checks = {}
+    if matcher.resource_types:
+        resource_types = matcher.resource_types
+        checks["resource_types"] = lambda resource: [resource.type] if resource.type in resource_types else []
+    if matcher.resource_ids:
+        resource_ids = matcher.resource_ids
+        checks["resource_ids"] = lambda resource: [resource.id] if resource.id in resource_ids else []
+    if matcher.name_patterns:
+        # One expression per configured pattern, so the matching one can be named
+        patterns = _name_patterns(matcher)
+
+        def check_names(resource):
+            name = _string_attr(resource, 'name')
+            if name is None:
+                return []
+            return [pattern for pattern, match in patterns if match(name)]
+
+        checks["name_patterns"] = check_names
+    if matcher.resource_groups:
+        resource_groups = matcher.resource_groups
+
+        def check_resource_group(resource):
+            resource_group = _resource_group(resource)
+            return [resource_group] if resource_group in resource_groups else []
+
+        checks["resource_groups"] = check_resource_group
+    if matcher.regions:
+        regions = matcher.regions
+
+        def check_region(resource):
+            region = _resource_region(resource)
+            return [region] if region in regions else []
+
+        checks["regions"] = check_region
+    if matcher.tags:
+        tag_rules = matcher.tags
+        missing = object()
+
+        def check_tags(resource):
+            tags = getattr(resource, 'tags', None)
+            if not tags or not isinstance(tags, dict):
+                return []
+            return [_tag_rule(key, value) for key, value in tags.items() if tag_rules.get(key, missing) == value]
+
+        checks["tags"] = check_tags
+    return {kind: checks[kind] for kind in RULE_KINDS if kind in checks}
+
+def _first_pattern(patterns):
+    """
+    Return first(name), giving the first configured pattern that matches name, or None.
+
+    Patterns without groups are joined into one alternation with a group
+    per pattern, so a single re.match call names the first of them that
+    matches. Patterns with groups (or that cannot be joined) are matched
+    on their own.
+    """
+    combinable = []
+    separate = []
+    for index, pattern in enumerate(patterns):
+        compiled = re.compile(pattern)
+        if compiled.groups or compiled.groupindex:
+            separate.append((index, compiled.match))
+        else:
+            combinable.append(index)
+
+    combined = None
+    if combinable:
+        try:
+            combined = re.compile("|".join(f"({patterns[index]})" for index in combinable)).match
+        except re.error:
+            separate = sorted(separate + [(index, re.compile(patterns[index]).match) for index in combinable])
+            combinable = []
+
+    def first(name):
+        found = None
+        if combined is not None:
+            match = combined(name)
+            if match:
+                found = combinable[match.lastindex - 1]
+        for index, match in separate:
+            if found is not None and index > found:
+                break
+            if match(name):
+                found = index
+                break
+        return patterns[found] if found is not None else None
+
+    return first
+
+def _first_rule(matcher):
+    """
+    Return first(resource), giving (kind, rule) of the first rule matching resource, or None.
+
+    Rule kinds are checked in RULE_KINDS order and checking stops at the
+    first match, so a preserved resource costs about what the matcher did.
+    """
+    resource_types = matcher.resource_types
+    resource_ids = matcher.resource_ids
+    first_pattern = _first_pattern(list(matcher.config.get('name_patterns') or ())) if matcher.name_patterns else None
+    resource_groups = matcher.resource_groups
+    regions = matcher.regions
+    tag_rules = matcher.tags
+    missing = object()
+
+    def first(resource):
+        if resource.type in resource_types:
+            return "resource_types", resource.type
+        if resource.id in resource_ids:
+            return "resource_ids", resource.id
+        if first_pattern is not None:
+            name = _string_attr(resource, 'name')
+            if name is not None:
+                pattern = first_pattern(name)
+                if pattern is not None:
+                    return "name_patterns", pattern
+        if resource_groups:
+            resource_group = _resource_group(resource)
+            if resource_group in resource_groups:
+                return "resource_groups", resource_group
+        if regions:
+            region = _resource_region(resource)
+            if region in regions:
+                return "regions", region
+        if tag_rules:
+            tags = getattr(resource, 'tags', None)
+            if tags and isinstance(tags, dict):
+                for key, value in tags.items():
+                    if tag_rules.get(key, missing) == value:
+                        return "tags", _tag_rule(key, value)
+        return None
+
+    return first
+
+class ExclusionExplainer:
+    """
+    Record which exclusion rules matched and what evaluating them costs.
+
+    Pass one to filter_resources(explain=...) for every batch of a run.
+    Each resource the filter preserved is checked until its first matching
+    rule (the others matched no rule). One resource in sample_interval is
+    also checked against every rule, for the hit counts, and timed rule
+    kind by rule kind and name pattern by name pattern. Hits and timings
+    are extrapolated from that sample. The time explain mode itself adds
+    is reported next to the filter time.
+    """
+
+    def __init__(self, exclusions, sample_interval=EXPLAIN_SAMPLE_INTERVAL, max_preserved=EXPLAIN_MAX_PRESERVED):
+        matcher = compile_exclusions(exclusions)
+        self.sample_interval = max(1, sample_interval)
+        self.max_preserved = max_preserved
+        self.checks = _rule_checks(matcher)
+        self.first_rule = _first_rule(matcher)
+        self.sampled_hits = {}
+        self.first_matches = {}
+        for kind in self.checks:
+            rules = matcher.tags.items() if kind == "tags" else matcher.config.get(kind) or ()
+            for rule in rules:
+                key = (kind, _tag_rule(*rule) if kind == "tags" else rule)
+                self.sampled_hits[key] = 0
+                self.first_matches[key] = 0
+        self.sampled_ns = dict.fromkeys(self.checks, 0)
+        self.patterns = _name_patterns(matcher)
+        self.pattern_ns = {pattern: 0 for pattern, _ in self.patterns}
+        self.timer_overhead_ns = _timer_overhead_ns()
+        self.sampled = 0
+        self.evaluated = 0
+        self.preserved_count = 0
+        self.filter_seconds = 0.0
+        self.explain_seconds = 0.0
+        self.preserved = []
+
+    def explain(self, resource):
+        """Return (kind, rule) of the first rule matching resource, counting it as a first match."""
+        first = self.first_rule(resource)
+        if first is not None:
+            self.first_matches[first] = self.first_matches.get(first, 0) + 1
+        return first
+
+    def _hit(self, kind, rules):
+        sampled_hits = self.sampled_hits
+        for rule in rules:
+            key = (kind, rule)
+            sampled_hits[key] = sampled_hits.get(key, 0) + 1
+
+    def _time(self, resource):
+        """Count the rules matching resource, adding the time every rule kind and name pattern takes."""
+        overhead = self.timer_overhead_ns
+        sampled_ns = self.sampled_ns
+        for kind, check in self.checks.items():
+            if kind == "name_patterns":
+                continue
+            start = time.perf_counter_ns()
+            rules = check(resource)
+            sampled_ns[kind] += max(0, time.perf_counter_ns() - start - overhead)
+            self._hit(kind, rules)
+
+        name = _string_attr(resource, 'name')
+        if name is not None:
+            pattern_ns = self.pattern_ns
+            matched = []
+            for pattern, match in self.patterns:
+                start = time.perf_counter_ns()
+                found = match(name)
+                elapsed = max(0, time.perf_counter_ns() - start - overhead)
+                pattern_ns[pattern] += elapsed
+                sampled_ns["name_patterns"] += elapsed
+                if found:
+                    matched.append(pattern)
+            self._hit("name_patterns", matched)
+        self.sampled += 1
+
+    def record(self, resources_to_delete, resources_to_preserve, elapsed=0.0):
+        """
+        Record the result of filtering one batch.
+
+        Args:
+            resources_to_delete: Resources no rule matched
+            resources_to_preserve: Resources at least one rule matched
+            elapsed: Seconds the filter took for the batch
+        """
+        start = time.perf_counter()
+        first_rule = self.first_rule
+        first_matches = self.first_matches
+        preserved = self.preserved
+        listed = max(0, self.max_preserved - len(preserved))
+        for position, resource in enumerate(resources_to_preserve):
+            first = first_rule(resource)
+            if first is not None:
+                first_matches[first] = first_matches.get(first, 0) + 1
+            if position < listed:
+                preserved.append({
+                    "id": resource.id,
+                    "name": resource.name,
+                    "type": resource.type,
+                    "rule": {"kind": first[0], "rule": first[1]} if first else None,
+                })
+        self.preserved_count += len(resources_to_preserve)
+
+        deleted = len(resources_to_delete)
+        total = deleted + len(resources_to_preserve)
+        # Keep one sample every sample_interval resources across batches
+        for index in range((-self.evaluated) % self.sample_interval, total, self.sample_interval):
+            self._time(resources_to_delete[index] if index < deleted else resources_to_preserve[index - deleted])
+        self.evaluated += total
+        self.filter_seconds += elapsed
+        self.explain_seconds += time.perf_counter() - start
+
+    def report(self):
+        """Return the explain report as a JSON-serializable dictionary."""
+        scale = self.evaluated / self.sampled if self.sampled else 0
+
+        def timing(ns):
+            return {"sampled_ms": round(ns / 1e6, 6), "estimated_ms": round(ns * scale / 1e6, 3)}
+
+        rules = []
+        for (kind, rule), hits in self.sampled_hits.items():
+            entry = {
+                "kind": kind,
+                "rule": rule,
+                "hits": round(hits * scale),
+                "sampled_hits": hits,
+                "first_match": self.first_matches.get((kind, rule), 0),
+            }
+            if kind == "name_patterns":
+                entry.update(timing(self.pattern_ns.get(rule, 0)))
+            rules.append(entry)
+        return {
+            "resources_evaluated": self.evaluated,
+            "resources_preserved": self.preserved_count,
+            "filter_seconds": round(self.filter_seconds, 6),
+            "explain_seconds": round(self.explain_seconds, 6),
+            "sample_interval": self.sample_interval,
+            "resources_timed": self.sampled,
+            "rule_kinds": {kind: timing(ns) for kind, ns in self.sampled_ns.items()},
+            "rules": rules,
+            "preserved_resources": self.preserved,
+            "preserved_resources_omitted": self.preserved_count - len(self.preserved),
+        }
+
+    def write(self, path):
+        """Write the explain report to path as JSON."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.report(), file, indent=2, default=str)
+            file.write("\n")
@@ -2,6 +2,27 @@
 import yaml
 import re
 import os
+import time
+import multiprocessing
+from collections import namedtuple
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress
+from operator import attrgetter
+
+# Engines filter_resources can evaluate exclusion rules with
+FILTER_ENGINES = ("python", "columnar", "parallel")
+
+# Resources below which the parallel engine filters in-process, since
+# handing them to worker processes would cost more than it saves
+PARALLEL_FILTER_THRESHOLD = 20000
+
+# Resources per chunk sent to a filtering worker process
+PARALLEL_CHUNK_SIZE = 5000
+
+# Resources gathered from the discovery stream before they are handed to
+# the parallel engine
+PARALLEL_BATCH_SIZE = 100000
 
 def find_config_file(config_path):
     """
@@ -39,21 +60,127 @@ def find_config_file(config_path):
     
     return None
 
-def load_exclusions(config_file):
-    """Load exclusion rules from YAML configuration."""
+# Exclusion rule kinds holding a list of strings
+LIST_RULES = ("resource_types", "name_patterns", "resource_ids", "resource_groups", "regions")
+
+# Tag values are compared with ==, so only scalars can ever match
+_TAG_VALUE_TYPES = (str, bool, int, float)
+
+class ExclusionConfigError(ValueError):
+    """Raised when an exclusions file cannot be parsed or contains invalid rules."""
+
+def validate_exclusions(config, source="exclusions"):
+    """
+    Check an exclusion configuration and return it with empty rules dropped.
+    
+    Every rule kind must be known, list rules must be lists of strings,
+    tags a mapping of scalar values and name patterns valid regular
+    expressions. All problems are reported together.
+    
+    Args:
+        config: The parsed configuration (None for an empty file)
+        source: Name of the configuration used in error messages
+    
+    Raises:
+        ExclusionConfigError: If the configuration is invalid
+    """
+    if config is None:
+        return {}
+    if not isinstance(config, dict):
+        raise ExclusionConfigError(f"{source}: expected a mapping of exclusion rules, got {type(config).__name__}")
+    
+    problems = []
+    for key in config:
+        if key not in LIST_RULES and key != 'tags':
+            problems.append(f"unknown exclusion rule '{key}' (expected one of: {', '.join(LIST_RULES + ('tags',))})")
+    
+    for key in LIST_RULES:
+        values = config.get(key)
+        if values is None:
+            continue
+        if not isinstance(values, list):
+            problems.append(f"'{key}' must be a list")
+            continue
+        for value in values:
+            if not isinstance(value, str):
+                problems.append(f"'{key}' entries must be strings, got {value!r}")
+    
+    for pattern in config.get('name_patterns') or ():
+        if isinstance(pattern, str):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                problems.append(f"invalid name pattern {pattern!r}: {e}")
+    
+    tags = config.get('tags')
+    if tags is not None:
+        if not isinstance(tags, dict):
+            problems.append("'tags' must be a mapping of tag names to values")
+        else:
+            for tag_key, tag_value in tags.items():
+                if not isinstance(tag_key, str):
+                    problems.append(f"tag names must be strings, got {tag_key!r}")
+                elif not isinstance(tag_value, _TAG_VALUE_TYPES):
+                    problems.append(f"tag '{tag_key}' must have a single value, got {tag_value!r}")
+    
+    if problems:
+        raise ExclusionConfigError(f"{source}: " + "; ".join(problems))
+    return {key: value for key, value in config.items() if value is not None}
+
+def _parse_exclusions(config_path):
+    """Parse and validate an exclusions file."""
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.load(f, Loader=loader)
+    except yaml.YAMLError as e:
+        raise ExclusionConfigError(f"{config_path}: invalid YAML: {e}") from e
+    return validate_exclusions(config, config_path)
+
+def load_exclusions(config_file, use_cache=True):
+    """
+    Load exclusion rules from YAML configuration and compile them into an ExclusionMatcher.
+    
+    Validated configurations are cached by file path, size and modification
+    time (see cache.ExclusionsCache), so unchanged files skip YAML parsing
+    and validation on later runs.
+    
+    Raises:
+        ExclusionConfigError: If the file is not valid YAML or has invalid rules
+    """
     config_path = find_config_file(config_file)
     
     if not config_path:
         print(f"Warning: Could not find exclusions file at {config_file}. No exclusions will be applied.")
-        return {}
+        return ExclusionMatcher({})
     
     try:
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
-    except Exception as e:
+        stat = os.stat(config_path)
+    except OSError as e:
         print(f"Warning: Failed to load exclusions file: {e}")
-        return {}
-
+        return ExclusionMatcher({})
+    
+    cache = None
+    if use_cache:
+        from aznuke.src.cache import ExclusionsCache
+        cache = ExclusionsCache()
+        config = cache.read(config_path, stat)
+        if config is not None:
+            return ExclusionMatcher(config)
+    
+    try:
+        config = _parse_exclusions(config_path)
+    except OSError as e:
+        print(f"Warning: Failed to load exclusions file: {e}")
+        return ExclusionMatcher({})
+    
+    if cache is not None:
+        try:
+            cache.write(config_path, stat, config)
+        except (OSError, TypeError, ValueError):
+            # Only a cache; values JSON cannot hold are parsed again next run
+            pass
+    return ExclusionMatcher(config)
 
 def _string_attr(resource, attr_name):
     """Return a string resource attribute, ignoring mock/dynamic attributes."""
@@ -78,49 +205,300 @@ def _resource_region(resource):
     """Return the resource location/region when present."""
     return _string_attr(resource, 'location') or _string_attr(resource, 'region')
 
-def should_preserve(resource, exclusions):
-    """Determine if a resource should be preserved based on exclusion rules."""
-    # Check if resource type is excluded
-    if resource.type in exclusions.get('resource_types', []):
-        return True
-    
-    # Check if resource name matches excluded patterns
-    for pattern in exclusions.get('name_patterns', []):
-        if re.match(pattern, resource.name):
-            return True
-    
-    # Check for specific resource IDs
-    if resource.id in exclusions.get('resource_ids', []):
-        return True
-
-    # Check for resource groups
-    if _resource_group(resource) in exclusions.get('resource_groups', []):
-        return True
-
-    # Check for regions
-    if _resource_region(resource) in exclusions.get('regions', []):
-        return True
-    
-    # Check for resource tags
-    if hasattr(resource, 'tags') and resource.tags:
-        for tag_key, tag_value in exclusions.get('tags', {}).items():
-            if tag_key in resource.tags and resource.tags[tag_key] == tag_value:
-                return True
+def _combine_patterns(patterns):
+    """
+    Compile name patterns into as few regular expressions as possible.
+    
+    Patterns are joined into one alternation matched with a single
+    re.match call. Patterns with capture groups keep their own expression
+    so backreferences keep their numbering, as do patterns that cannot be
+    combined (e.g. with inline global flags).
+    """
+    combinable = []
+    separate = []
+    for pattern in patterns:
+        compiled = re.compile(pattern)
+        if compiled.groups or compiled.groupindex:
+            separate.append(compiled)
+        else:
+            combinable.append(pattern)
     
-    return False
+    if combinable:
+        try:
+            separate.insert(0, re.compile("|".join(f"(?:{pattern})" for pattern in combinable)))
+        except re.error:
+            separate[:0] = [re.compile(pattern) for pattern in combinable]
+    return separate
 
-def filter_resources(resources, exclusions, progress_bar=None):
-    """Filter resources based on exclusion rules."""
-    resources_to_delete = []
-    resources_to_preserve = []
+class ExclusionMatcher(Mapping):
+    """
+    Exclusion rules compiled for fast matching.
+    
+    Exact rules (resource types, IDs, resource groups, regions) are hash
+    sets, name patterns are combined into one regular expression and tags
+    are a dictionary lookup, so a resource is checked in roughly constant
+    time whatever the number of rules. The matcher is also a read-only
+    mapping over the configuration it was built from.
+    """
+    
+    def __init__(self, config):
+        self.config = config or {}
+        self.resource_types = frozenset(self.config.get('resource_types') or ())
+        self.resource_ids = frozenset(self.config.get('resource_ids') or ())
+        self.resource_groups = frozenset(self.config.get('resource_groups') or ())
+        self.regions = frozenset(self.config.get('regions') or ())
+        self.name_patterns = _combine_patterns(self.config.get('name_patterns') or ())
+        self.tags = dict(self.config.get('tags') or {})
+        self.matches = self._compile()
+        self._matches_untagged = None
+    
+    def __getitem__(self, key):
+        return self.config[key]
+    
+    def __iter__(self):
+        return iter(self.config)
+    
+    def __len__(self):
+        return len(self.config)
+    
+    def indexed_matches(self, tag_index):
+        """
+        Return a matches(resource) function answering the tag rules from a TagIndex.
+        
+        The resources preserved by tag are looked up once per index instead
+        of per resource; tag_index must cover every resource checked.
+        """
+        if tag_index is None or not self.tags:
+            return self.matches
+        if self._matches_untagged is None:
+            self._matches_untagged = self._compile(include_tags=False)
+        untagged = self._matches_untagged
+        tagged_ids = tag_index.match_any(self.tags)
+        
+        def matches(resource):
+            return resource.id in tagged_ids or untagged(resource)
+        
+        return matches
+    
+    def _compile(self, include_tags=True):
+        """
+        Build the matches(resource) function for these rules.
+        
+        Returns True when any exclusion rule matches the resource. Rules are
+        bound as locals and empty rule kinds are skipped entirely, as are
+        the tag rules unless include_tags is set.
+        """
+        resource_types = self.resource_types
+        resource_ids = self.resource_ids
+        resource_groups = self.resource_groups
+        regions = self.regions
+        name_matchers = [pattern.match for pattern in self.name_patterns]
+        tag_rules = self.tags
+        tag_keys = frozenset(tag_rules) if include_tags else frozenset()
+        missing = object()
+        
+        def matches(resource):
+            if resource.type in resource_types or resource.id in resource_ids:
+                return True
+            
+            if name_matchers:
+                name = resource.name
+                if isinstance(name, str):
+                    for match in name_matchers:
+                        if match(name):
+                            return True
+            
+            if resource_groups:
+                resource_group = getattr(resource, 'resource_group', None)
+                if not isinstance(resource_group, str):
+                    resource_group = _resource_group(resource)
+                if resource_group in resource_groups:
+                    return True
+            
+            if regions and _resource_region(resource) in regions:
+                return True
+            
+            if tag_keys:
+                tags = getattr(resource, 'tags', None)
+                # Only resources sharing a tag key with the rules compare values
+                if tags and isinstance(tags, dict) and not tag_keys.isdisjoint(tags):
+                    for key, value in tags.items():
+                        if tag_rules.get(key, missing) == value:
+                            return True
+            
+            return False
+        
+        return matches
 
+def compile_exclusions(exclusions):
+    """Return exclusions as an ExclusionMatcher, compiling a plain rule dictionary."""
+    if isinstance(exclusions, ExclusionMatcher):
+        return exclusions
+    if isinstance(exclusions, ParallelFilter):
+        return exclusions.matcher
+    return ExclusionMatcher(exclusions)
+
+def should_preserve(resource, exclusions):
+    """Determine if a resource should be preserved based on exclusion rules."""
+    return compile_exclusions(exclusions).matches(resource)
+
+def iter_filtered_resources(resources, exclusions, progress_bar=None, tag_index=None):
+    """
+    Yield (resource, preserved) pairs for a stream of resources.
+    
+    Resources are evaluated one at a time so the input can be a generator
+    that is still being discovered. With a tags.TagIndex covering the
+    resources, tag rules are answered from the index.
+    """
+    matches = compile_exclusions(exclusions).indexed_matches(tag_index)
     for resource in resources:
         # Update progress bar if provided
-        if progress_bar:
+        if progress_bar is not None:
             progress_bar.update(1)
 
         # Check if resource should be preserved based on exclusion rules
-        if should_preserve(resource, exclusions):
+        yield resource, matches(resource)
+
+# The fields of a resource the exclusion rules read, as sent to worker processes
+_FilterRow = namedtuple("_FilterRow", ["id", "name", "type", "resource_group", "location", "tags"])
+
+_get_filter_row = attrgetter(*_FilterRow._fields)
+
+# Matcher of a filtering worker process, built once by _init_filter_worker
+_worker_matcher = None
+
+def _init_filter_worker(config):
+    global _worker_matcher
+    _worker_matcher = ExclusionMatcher(config)
+
+def _preserve_flags(rows):
+    """Return whether each row should be preserved, in a filtering worker process."""
+    matches = _worker_matcher.matches
+    return [matches(row) for row in map(_FilterRow._make, rows)]
+
+def _filter_row(resource):
+    """Return the exclusion-relevant fields of a resource, resolved like the matcher does."""
+    tags = getattr(resource, 'tags', None)
+    return (
+        _string_attr(resource, 'id'),
+        _string_attr(resource, 'name'),
+        _string_attr(resource, 'type'),
+        _resource_group(resource),
+        _resource_region(resource),
+        tags if isinstance(tags, dict) else None,
+    )
+
+def _filter_rows(resources):
+    """Return the exclusion-relevant fields of each resource as plain tuples."""
+    try:
+        return list(map(_get_filter_row, resources))
+    except AttributeError:
+        # SDK models have no resource_group attribute
+        return [_filter_row(resource) for resource in resources]
+
+class ParallelFilter:
+    """
+    Evaluate exclusion rules across a pool of worker processes.
+    
+    Inventories are split into chunks of the resource fields the rules
+    read; each worker compiles the rules once and returns one flag per
+    resource, and the partition is rebuilt in input order. Inventories
+    smaller than threshold, and any inventory on a single CPU, are filtered
+    in-process. The pool is started on first use and stopped by close().
+    """
+    
+    def __init__(self, exclusions, max_workers=None, threshold=PARALLEL_FILTER_THRESHOLD,
+                 chunk_size=PARALLEL_CHUNK_SIZE):
+        self.matcher = compile_exclusions(exclusions)
+        self.max_workers = max_workers
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.executor = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _pool(self):
+        if self.executor is None:
+            # spawn, not fork: discovery threads may hold locks when the pool starts
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_filter_worker,
+                initargs=(dict(self.matcher.config),),
+            )
+        return self.executor
+    
+    def filter(self, resources, progress_bar=None):
+        """Return (resources_to_delete, resources_to_preserve) in input order."""
+        resources = resources if isinstance(resources, list) else list(resources)
+        workers = self.max_workers or os.cpu_count() or 1
+        if len(resources) < self.threshold or workers < 2:
+            return filter_resources(resources, self.matcher, progress_bar)
+        
+        rows = _filter_rows(resources)
+        chunks = [rows[start:start + self.chunk_size] for start in range(0, len(rows), self.chunk_size)]
+        flags = []
+        for chunk_flags in self._pool().map(_preserve_flags, chunks):
+            flags.extend(chunk_flags)
+            if progress_bar is not None:
+                progress_bar.update(len(chunk_flags))
+        return (
+            list(compress(resources, [not flag for flag in flags])),
+            list(compress(resources, flags)),
+        )
+    
+    def close(self):
+        """Stop the worker processes."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+def filter_resources(resources, exclusions, progress_bar=None, engine="python", tag_index=None, explain=None):
+    """
+    Filter resources based on exclusion rules.
+    
+    Args:
+        resources: Resources to filter
+        exclusions: ExclusionMatcher or exclusion rule dictionary
+        progress_bar: Optional progress bar advanced once per resource
+        engine: "python" to check resources one by one, "columnar" to
+            evaluate the rules over column arrays (requires numpy) or
+            "parallel" to spread large inventories over worker processes
+            (exclusions may then be a ParallelFilter whose pool is reused)
+        tag_index: Optional tags.TagIndex of resources the python engine
+            answers tag rules from
+        explain: Optional explain.ExclusionExplainer recording which rules
+            matched and what they cost
+    """
+    if explain is not None:
+        start = time.perf_counter()
+        result = filter_resources(resources, exclusions, progress_bar, engine, tag_index)
+        explain.record(*result, elapsed=time.perf_counter() - start)
+        return result
+    
+    if engine == "parallel":
+        if isinstance(exclusions, ParallelFilter):
+            return exclusions.filter(resources, progress_bar)
+        with ParallelFilter(exclusions) as parallel:
+            return parallel.filter(resources, progress_bar)
+    exclusions = compile_exclusions(exclusions)
+    
+    if engine == "columnar":
+        from aznuke.src.columnar import filter_resources_columnar
+        resources_to_delete, resources_to_preserve = filter_resources_columnar(resources, exclusions)
+        if progress_bar is not None:
+            progress_bar.update(len(resources_to_delete) + len(resources_to_preserve))
+        return resources_to_delete, resources_to_preserve
+    
+    resources_to_delete = []
+    resources_to_preserve = []
+
+    for resource, preserved in iter_filtered_resources(resources, exclusions, progress_bar, tag_index):
+        if preserved:
             resources_to_preserve.append(resource)
         else:
             resources_to_delete.append(resource)
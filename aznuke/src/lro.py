@@ -0,0 +1,239 @@
+# lro.py
+import asyncio
+import contextvars
+import email.utils
+import inspect
+import time
+from contextlib import asynccontextmanager
+
+from azure.core.polling import PollingMethod
+
+# Seconds before the first status check of an operation that gave no Retry-After
+LRO_INITIAL_INTERVAL = 1.0
+
+# Longest pause between two status checks of an operation without Retry-After
+LRO_MAX_INTERVAL = 30.0
+
+# Factor the pause grows by after each status check that finds the operation running
+LRO_BACKOFF = 1.5
+
+# Status checks of sync clients running at the same time, each on a worker thread
+DEFAULT_LRO_POLL_WORKERS = 8
+
+# Manager used by aio.begin inside lro_manager()
+_manager = contextvars.ContextVar("aznuke_lro_manager", default=None)
+
+class DeferredPolling(PollingMethod):
+    """
+    Polling method that hands an operation over to an LROManager.
+
+    It only records what the SDK passes in and reports the operation as
+    finished, so the SDK poller neither polls nor starts a thread of its own.
+    """
+
+    def initialize(self, client, initial_response, deserialization_callback):
+        self.client = client
+        self.initial_response = initial_response
+        self.deserialization_callback = deserialization_callback
+
+    def run(self):
+        pass
+
+    def status(self):
+        return "Deferred"
+
+    def finished(self):
+        return True
+
+    def resource(self):
+        return None
+
+def retry_after(response):
+    """Return the delay in seconds a response asks for with Retry-After, or None."""
+    headers = getattr(getattr(response, 'http_response', None), 'headers', None) or {}
+    for header, scale in (("retry-after-ms", 1000), ("x-ms-retry-after-ms", 1000), ("Retry-After", 1)):
+        value = headers.get(header)
+        if not value:
+            continue
+        try:
+            return max(0.0, float(value) / scale)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return None
+
+class _Operation:
+    """An operation tracked by an LROManager."""
+
+    __slots__ = ("polling", "is_async", "future", "interval", "due")
+
+    def __init__(self, polling, is_async, future, interval, due):
+        self.polling = polling
+        self.is_async = is_async
+        self.future = future
+        self.interval = interval
+        self.due = due
+
+class LROManager:
+    """
+    Start long-running operations and poll all of them from one task.
+
+    Operations are started with a DeferredPolling method and tracked by
+    their ARM status link. A single task checks every operation that is due,
+    honouring Retry-After and otherwise backing off from initial_interval
+    to max_interval, and resolves one future per operation. Status checks of
+    async clients run on the event loop; those of sync clients share at most
+    poll_workers worker threads, however many operations are in flight.
+    """
+
+    def __init__(self, poll_workers=DEFAULT_LRO_POLL_WORKERS, initial_interval=LRO_INITIAL_INTERVAL,
+                 max_interval=LRO_MAX_INTERVAL):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self._poll_limit = asyncio.Semaphore(max(1, poll_workers))
+        self._operations = []
+        self._changed = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._operations)
+
+    async def begin(self, func, *args, **kwargs):
+        """
+        Start a long-running operation and return a future of its result.
+
+        func is a begin_* method of a management client; it is called with
+        a DeferredPolling method as polling. Should func ignore it, its
+        poller is returned instead, to be waited for as usual.
+        """
+        deferred = DeferredPolling()
+        is_async = inspect.iscoroutinefunction(func)
+        if is_async:
+            result = await func(*args, polling=deferred, **kwargs)
+        else:
+            # Sync begin_* methods send their first request before returning
+            result = await asyncio.to_thread(func, *args, polling=deferred, **kwargs)
+            if inspect.isawaitable(result):
+                is_async = True
+                result = await result
+        if not hasattr(deferred, 'initial_response'):
+            return result
+
+        if is_async:
+            from azure.mgmt.core.polling.async_arm_polling import AsyncARMPolling
+            polling = AsyncARMPolling()
+        else:
+            from azure.mgmt.core.polling.arm_polling import ARMPolling
+            polling = ARMPolling()
+        polling.initialize(deferred.client, deferred.initial_response, deferred.deserialization_callback)
+
+        loop = asyncio.get_running_loop()
+        delay = retry_after(deferred.initial_response)
+        operation = _Operation(polling, is_async, loop.create_future(), self.initial_interval,
+                               loop.time() + (self.initial_interval if delay is None else delay))
+        if polling.finished():
+            await self._complete(operation)
+        else:
+            self._operations.append(operation)
+            self._changed.set()
+            if self._task is None or self._task.done():
+                self._task = asyncio.create_task(self._run())
+        return operation.future
+
+    async def _call(self, operation, method):
+        """Run a polling method of an operation: awaited when async, on a worker thread when sync."""
+        async with self._poll_limit:
+            if operation.is_async:
+                return await method()
+            return await asyncio.to_thread(method)
+
+    async def _complete(self, operation):
+        """Resolve the future of a finished operation (raising for failed ones, fetching the final resource)."""
+        try:
+            # run() only checks the outcome and fetches the result once finished
+            await self._call(operation, operation.polling.run)
+            result = operation.polling.resource()
+        except Exception as e:
+            if not operation.future.done():
+                operation.future.set_exception(e)
+        else:
+            if not operation.future.done():
+                operation.future.set_result(result)
+
+    async def _poll(self, operation):
+        """Check the status of one operation and schedule its next check."""
+        polling = operation.polling
+        try:
+            await self._call(operation, polling.update_status)
+        except Exception as e:
+            self._operations.remove(operation)
+            if not operation.future.done():
+                operation.future.set_exception(e)
+            return
+
+        if polling.finished():
+            self._operations.remove(operation)
+            await self._complete(operation)
+            return
+
+        delay = retry_after(getattr(polling, '_pipeline_response', None))
+        if delay is None:
+            delay = operation.interval
+            operation.interval = min(self.max_interval, operation.interval * LRO_BACKOFF)
+        operation.due = asyncio.get_running_loop().time() + delay
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._operations:
+            now = loop.time()
+            due = [operation for operation in self._operations
+                   if operation.due <= now and not operation.future.done()]
+            for operation in [operation for operation in self._operations if operation.future.done()]:
+                # Cancelled by the caller
+                self._operations.remove(operation)
+            if due:
+                await asyncio.gather(*(self._poll(operation) for operation in due))
+                continue
+
+            self._changed.clear()
+            next_due = min((operation.due for operation in self._operations), default=now)
+            try:
+                await asyncio.wait_for(self._changed.wait(), max(0.0, next_due - now))
+            except asyncio.TimeoutError:
+                pass
+
+    async def aclose(self):
+        """Stop polling and cancel the futures of the operations still running."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for operation in self._operations:
+            operation.future.cancel()
+        self._operations.clear()
+
+@asynccontextmanager
+async def lro_manager(poll_workers=DEFAULT_LRO_POLL_WORKERS):
+    """
+    Poll the long-running operations started with aio.begin in this block from one LROManager.
+
+    Operations still running when the block exits are no longer waited
+    for; ARM completes them regardless.
+    """
+    manager = LROManager(poll_workers)
+    token = _manager.set(manager)
+    try:
+        yield manager
+    finally:
+        _manager.reset(token)
+        await manager.aclose()
+
+def get_lro_manager():
+    """Return the LROManager of the enclosing lro_manager() block, or None."""
+    return _manager.get()
@@ -0,0 +1,93 @@
+# report.py
+import json
+import sys
+
+from aznuke.src.animations import show_summary_by_type
+
+class ScanSummary:
+    """
+    Running totals for a scan.
+
+    Only the first max_display selected resources of each type are kept, so
+    the summary stays small no matter how many resources stream through it.
+    """
+
+    def __init__(self, max_display=10):
+        self.max_display = max_display
+        self.total_resources = 0
+        self.resources_identified = 0
+        self.resources_excluded = 0
+        self.counts_by_type = {}
+        self.samples_by_type = {}
+
+    def add(self, resource, preserved):
+        """Record one filtered resource."""
+        self.total_resources += 1
+        if preserved:
+            self.resources_excluded += 1
+            return
+
+        self.resources_identified += 1
+        count = self.counts_by_type.get(resource.type, 0)
+        self.counts_by_type[resource.type] = count + 1
+        if count < self.max_display:
+            self.samples_by_type.setdefault(resource.type, []).append(resource)
+
+    def show(self):
+        """Display the selected resources grouped by type."""
+        show_summary_by_type(self.samples_by_type, self.max_display, counts=self.counts_by_type)
+
+def _resource_entry(resource):
+    """Return the JSON representation of a selected resource."""
+    return {
+        "name": resource.name,
+        "type": resource.type,
+        "subscription_id": resource.subscription_id,
+        "resource_group": getattr(resource, 'resource_group', None),
+    }
+
+class JsonScanWriter:
+    """
+    Write scan results as JSON while resources are still being discovered.
+
+    Selected resources are written as soon as they are added and the totals
+    follow the resource list once close() is called.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.summary = ScanSummary(max_display=0)
+        self._started = False
+        self._first = True
+
+    def _start(self):
+        if not self._started:
+            self.stream.write('{\n  "scan_results": {\n    "resources": [')
+            self._started = True
+
+    def add(self, resource, preserved):
+        """Record one filtered resource, writing it out if it was selected."""
+        self._start()
+        self.summary.add(resource, preserved)
+        if preserved:
+            return
+
+        entry = json.dumps(_resource_entry(resource), indent=2).replace("\n", "\n      ")
+        self.stream.write(("\n      " if self._first else ",\n      ") + entry)
+        self._first = False
+
+    def close(self, error=None):
+        """Finish the JSON document, recording an error if the scan was cut short."""
+        self._start()
+        self.stream.write("\n    ]" if not self._first else "]")
+        fields = {
+            "total_resources": self.summary.total_resources,
+            "resources_identified": self.summary.resources_identified,
+            "resources_excluded": self.summary.resources_excluded,
+        }
+        if error is not None:
+            fields["error"] = str(error)
+        for key, value in fields.items():
+            self.stream.write(f",\n    {json.dumps(key)}: {json.dumps(value)}")
+        self.stream.write("\n  }\n}\n")
+        self.stream.flush()
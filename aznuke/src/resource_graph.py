@@ -0,0 +1,353 @@
+# resource_graph.py
+import email.utils
+import json
+import os
+import time
+from datetime import datetime, timezone
+import urllib.error
+import urllib.request
+
+from aznuke.src.clients import get_subscription_tenant, tenant_credentials
+from aznuke.src.resources import DETAIL_FIELDS, Resource
+
+# Azure Resource Manager endpoint that hosts the Resource Graph API. Can be
+# overridden with AZNUKE_RESOURCE_GRAPH_ENDPOINT (sovereign clouds, test fakes)
+RESOURCE_GRAPH_ENDPOINT = "https://management.azure.com"
+RESOURCE_GRAPH_API_VERSION = "2021-03-01"
+MANAGEMENT_SCOPE = "https://management.azure.com/.default"
+
+# Resource Graph accepts at most 1000 subscriptions and returns at most
+# 1000 rows per request
+SUBSCRIPTION_BATCH_SIZE = 1000
+PAGE_SIZE = 1000
+
+# Retries for throttled (HTTP 429) and timed out requests
+MAX_RETRIES = 3
+
+# Seconds a request may wait on the connection before it is retried
+REQUEST_TIMEOUT = 60
+
+# Resource Graph keeps the change history for 7 days, and a change can take
+# a few minutes to show up in it
+CHANGE_HISTORY_RETENTION = 7 * 24 * 3600
+CHANGE_RECORD_DELAY = 300
+
+# KQL expressions for the detail fields deletion handlers need
+DETAIL_COLUMNS = {
+    "managed_by": "managedBy",
+    "ip_configuration_id": "tostring(properties.ipConfiguration.id)",
+}
+
+# Resource IDs looked up per query when refreshing changed resources
+CHANGED_IDS_PER_QUERY = 200
+
+class ResourceGraphError(Exception):
+    """Raised when a Resource Graph query fails."""
+
+def _kql_string(value):
+    """Quote a string literal for a KQL query."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def _details_column():
+    """Build the KQL expression that packs the detail fields of each type."""
+    cases = []
+    for resource_type, fields in DETAIL_FIELDS.items():
+        packed = ", ".join(f"{_kql_string(field)}, {DETAIL_COLUMNS[field]}" for field in fields)
+        cases.append(f"type =~ {_kql_string(resource_type)}, pack({packed})")
+    return f"details = case({', '.join(cases)}, dynamic(null))"
+
+def build_query(resource_types=None, regions=None, resource_ids=None, details=False):
+    """
+    Build the KQL query used to list resources.
+
+    Only the columns discovery uses are projected, so properties and other
+    heavy columns are never returned.
+
+    Args:
+        resource_types: Optional list of resource types to filter by
+        regions: Optional list of normalized region names to filter by
+        resource_ids: Optional list of resource IDs to restrict the query to
+        details: Whether to also return the fields deletion handlers need
+    """
+    clauses = ["Resources"]
+    if resource_ids:
+        ids = ", ".join(_kql_string(i) for i in dict.fromkeys(resource_ids))
+        clauses.append(f"where id in~ ({ids})")
+    if resource_types:
+        types = ", ".join(_kql_string(t) for t in dict.fromkeys(resource_types))
+        clauses.append(f"where type in~ ({types})")
+    if regions:
+        locations = ", ".join(_kql_string(r) for r in dict.fromkeys(regions))
+        clauses.append(f"where location in~ ({locations})")
+    columns = "id, name, type, location, tags, resourceGroup, subscriptionId"
+    if details:
+        clauses.append(f"extend {_details_column()}")
+        columns += ", details"
+    clauses.append(f"project {columns}")
+    return " | ".join(clauses)
+
+def build_changes_query(since):
+    """
+    Build the KQL query listing resource changes recorded after a point in time.
+
+    Rows are ordered oldest first so later changes to a resource win.
+
+    Args:
+        since: Unix timestamp of the earliest change to return
+    """
+    timestamp = datetime.fromtimestamp(since, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return " | ".join([
+        "resourcechanges",
+        "extend changeTime = todatetime(properties.changeAttributes.timestamp), "
+        "targetResourceId = tostring(properties.targetResourceId), "
+        "changeType = tostring(properties.changeType)",
+        f"where changeTime > datetime({timestamp})",
+        "order by changeTime asc",
+        "project targetResourceId, changeType",
+    ])
+
+def _retry_delay(retry_after, attempt):
+    """
+    Return the seconds to wait before retrying a throttled request.
+
+    Retry-After is either a number of seconds or an HTTP date; when it is
+    missing or unreadable, the delay doubles with every attempt.
+    """
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return 2 ** attempt
+
+def _post(credentials, endpoint, body):
+    """POST a query to the Resource Graph endpoint and return the decoded response."""
+    url = f"{endpoint.rstrip('/')}/providers/Microsoft.ResourceGraph/resources?api-version={RESOURCE_GRAPH_API_VERSION}"
+    data = json.dumps(body).encode("utf-8")
+
+    for attempt in range(MAX_RETRIES + 1):
+        token = credentials.get_token(MANAGEMENT_SCOPE).token
+        request = urllib.request.Request(url, data=data, method="POST", headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code == 429 and attempt < MAX_RETRIES:
+                time.sleep(_retry_delay(e.headers.get("Retry-After"), attempt))
+                continue
+            detail = e.read().decode("utf-8", errors="replace")
+            raise ResourceGraphError(f"Resource Graph query failed with HTTP {e.code}: {detail}") from e
+        except (TimeoutError, urllib.error.URLError) as e:
+            timed_out = isinstance(e, TimeoutError) or isinstance(getattr(e, 'reason', None), TimeoutError)
+            if timed_out and attempt < MAX_RETRIES:
+                time.sleep(2 ** attempt)
+                continue
+            raise ResourceGraphError(f"Resource Graph query failed: {e}") from e
+
+def _group_by_tenant(subscription_ids):
+    """Return the subscriptions by the tenant registered with clients.subscription_tenants() (None for the rest)."""
+    groups = {}
+    for subscription_id in subscription_ids:
+        groups.setdefault(get_subscription_tenant(subscription_id), []).append(subscription_id)
+    return groups
+
+def query_resource_graph_pages(credentials, subscription_ids, query, endpoint=None, page_size=PAGE_SIZE):
+    """
+    Run a Resource Graph query and yield each page of result rows, following skip tokens.
+
+    A token is only valid for the subscriptions of one tenant, so the
+    subscriptions of each tenant are queried separately with a token of
+    their own tenant.
+
+    Args:
+        credentials: Azure credentials
+        subscription_ids: Subscriptions the query is scoped to
+        query: KQL query to run
+        endpoint: Optional Resource Graph endpoint (defaults to Azure public cloud)
+        page_size: Number of rows requested per page
+    """
+    endpoint = endpoint or os.environ.get("AZNUKE_RESOURCE_GRAPH_ENDPOINT", RESOURCE_GRAPH_ENDPOINT)
+
+    for tenant_id, tenant_subscription_ids in _group_by_tenant(subscription_ids).items():
+        tenant_creds = tenant_credentials(credentials, tenant_id)
+        skip_token = None
+
+        while True:
+            options = {"$top": page_size, "resultFormat": "objectArray"}
+            if skip_token:
+                options["$skipToken"] = skip_token
+
+            response = _post(tenant_creds, endpoint, {
+                "subscriptions": tenant_subscription_ids,
+                "query": query,
+                "options": options,
+            })
+
+            rows = response.get("data") or []
+            if rows:
+                yield rows
+
+            skip_token = response.get("$skipToken")
+            if not skip_token:
+                break
+
+def query_resource_graph(credentials, subscription_ids, query, endpoint=None, page_size=PAGE_SIZE):
+    """
+    Run a Resource Graph query and yield result rows, following skip tokens.
+
+    Args:
+        credentials: Azure credentials
+        subscription_ids: Subscriptions the query is scoped to
+        query: KQL query to run
+        endpoint: Optional Resource Graph endpoint (defaults to Azure public cloud)
+        page_size: Number of rows requested per page
+    """
+    for rows in query_resource_graph_pages(credentials, subscription_ids, query, endpoint, page_size):
+        yield from rows
+
+def _type_from_id(resource_id, fallback):
+    """
+    Return the resource type with its original casing.
+
+    Resource Graph lower-cases the type column, so the type is rebuilt from
+    the provider segment of the resource ID when the two agree.
+    """
+    if resource_id and "/providers/" in resource_id:
+        segments = resource_id.rsplit("/providers/", 1)[1].split("/")
+        resource_type = "/".join([segments[0]] + segments[1::2])
+        if not fallback or resource_type.lower() == fallback.lower():
+            return resource_type
+    return fallback
+
+def _to_resource(row, subscription_name=None):
+    """Convert a Resource Graph row to the resource record used by discovery."""
+    return Resource(
+        row.get("id"),
+        row.get("name"),
+        _type_from_id(row.get("id"), row.get("type")),
+        location=row.get("location"),
+        tags=row.get("tags"),
+        resource_group=row.get("resourceGroup"),
+        subscription_id=row.get("subscriptionId") or "",
+        subscription_name=subscription_name,
+        details=row.get("details"),
+    )
+
+def _to_resources(rows, names):
+    """Convert a page of rows, tagging each resource with its subscription."""
+    return [_to_resource(row, names.get((row.get("subscriptionId") or "").lower())) for row in rows]
+
+def iter_all_resource_batches_graph(credentials, subscriptions, resource_types=None, endpoint=None,
+                                    batch_size=SUBSCRIPTION_BATCH_SIZE, regions=None, details=False):
+    """
+    Yield one batch of resources per Resource Graph result page.
+
+    Subscriptions are queried in batches, one paged query per batch. The
+    resources carry the same attributes as discover_all_resources.
+
+    Args:
+        credentials: Azure credentials
+        subscriptions: List of subscriptions to scan
+        resource_types: Optional list of resource types to filter by
+        endpoint: Optional Resource Graph endpoint (defaults to Azure public cloud)
+        batch_size: Maximum number of subscriptions per query
+        regions: Optional list of normalized region names to filter by
+        details: Whether to also return the fields deletion handlers need
+    """
+    subscriptions = list(subscriptions)
+    names = {sub.subscription_id.lower(): sub.display_name for sub in subscriptions}
+    query = build_query(resource_types, regions, details=details)
+
+    for start in range(0, len(subscriptions), batch_size):
+        batch = [sub.subscription_id for sub in subscriptions[start:start + batch_size]]
+        for rows in query_resource_graph_pages(credentials, batch, query, endpoint=endpoint):
+            yield _to_resources(rows, names)
+
+def discover_all_resources_graph(credentials, subscriptions, resource_types=None, endpoint=None,
+                                 batch_size=SUBSCRIPTION_BATCH_SIZE, regions=None):
+    """
+    Discover all resources across subscriptions with Azure Resource Graph.
+
+    Args:
+        credentials: Azure credentials
+        subscriptions: List of subscriptions to scan
+        resource_types: Optional list of resource types to filter by
+        endpoint: Optional Resource Graph endpoint (defaults to Azure public cloud)
+        batch_size: Maximum number of subscriptions per query
+        regions: Optional list of normalized region names to filter by
+    """
+    return [
+        resource
+        for batch in iter_all_resource_batches_graph(credentials, subscriptions, resource_types, endpoint,
+                                                     batch_size, regions)
+        for resource in batch
+    ]
+
+def get_resource_changes(credentials, subscriptions, since, endpoint=None, batch_size=SUBSCRIPTION_BATCH_SIZE):
+    """
+    Return the latest change type ("Create", "Update" or "Delete") of every
+    resource changed after since, keyed by lower-cased resource ID.
+
+    Args:
+        credentials: Azure credentials
+        subscriptions: List of subscriptions to check
+        since: Unix timestamp of the earliest change to return
+        endpoint: Optional Resource Graph endpoint (defaults to Azure public cloud)
+        batch_size: Maximum number of subscriptions per query
+    """
+    subscriptions = list(subscriptions)
+    query = build_changes_query(since)
+    changes = {}
+
+    for start in range(0, len(subscriptions), batch_size):
+        batch = [sub.subscription_id for sub in subscriptions[start:start + batch_size]]
+        for row in query_resource_graph(credentials, batch, query, endpoint=endpoint):
+            resource_id = row.get("targetResourceId")
+            if resource_id:
+                changes[resource_id.lower()] = row.get("changeType")
+    return changes
+
+def iter_incremental_resource_batches_graph(credentials, subscriptions, snapshot_batches, since,
+                                            resource_types=None, endpoint=None, regions=None, details=False):
+    """
+    Yield batches of resources by applying changes since the last snapshot.
+
+    Resources from the snapshot are passed through unless they were changed
+    after since. Created and updated resources are then fetched again with
+    the same type and region selection, so a resource that no longer matches
+    drops out, and deleted resources are left out.
+
+    Args:
+        credentials: Azure credentials
+        subscriptions: List of subscriptions to scan
+        snapshot_batches: Batches of resources from the previous snapshot
+        since: Unix timestamp of the earliest change to apply
+        resource_types: Optional list of resource types to filter by
+        endpoint: Optional Resource Graph endpoint (defaults to Azure public cloud)
+        regions: Optional list of normalized region names to filter by
+        details: Whether to also return the fields deletion handlers need
+    """
+    subscriptions = list(subscriptions)
+    names = {sub.subscription_id.lower(): sub.display_name for sub in subscriptions}
+    changes = get_resource_changes(credentials, subscriptions, since, endpoint=endpoint)
+
+    for batch in snapshot_batches:
+        unchanged = [resource for resource in batch if resource.id.lower() not in changes]
+        if unchanged:
+            yield unchanged
+
+    changed_ids = [resource_id for resource_id, change_type in changes.items() if change_type != "Delete"]
+    subscription_ids = [sub.subscription_id for sub in subscriptions]
+    for start in range(0, len(changed_ids), CHANGED_IDS_PER_QUERY):
+        query = build_query(resource_types, regions, changed_ids[start:start + CHANGED_IDS_PER_QUERY], details)
+        for start_sub in range(0, len(subscription_ids), SUBSCRIPTION_BATCH_SIZE):
+            batch = subscription_ids[start_sub:start_sub + SUBSCRIPTION_BATCH_SIZE]
+            for rows in query_resource_graph_pages(credentials, batch, query, endpoint=endpoint):
+                yield _to_resources(rows, names)
@@ -0,0 +1,114 @@
+# resources.py
+import sys
+
+# Extra fields read by the deletion handlers, by lower-cased resource type.
+# They are only collected when discovery is asked for details.
+DETAIL_FIELDS = {
+    "microsoft.compute/disks": ("managed_by",),
+    "microsoft.network/publicipaddresses": ("ip_configuration_id",),
+}
+
+# SDK model attributes holding detail fields; fields missing here are not
+# part of the generic ARM listing
+SDK_DETAIL_ATTRIBUTES = {
+    "managed_by": "managed_by",
+}
+
+def _intern(value):
+    """Intern a string so equal values share one object across resources."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _sdk_details(resource):
+    """Return the detail fields of an SDK resource model, or None for other types."""
+    fields = DETAIL_FIELDS.get(resource.type.lower()) if isinstance(resource.type, str) else None
+    if not fields:
+        return None
+    return {
+        field: getattr(resource, SDK_DETAIL_ATTRIBUTES[field], None)
+        for field in fields
+        if field in SDK_DETAIL_ATTRIBUTES
+    }
+
+def resource_group_from_id(resource_id):
+    """Return the resource group name from a resource ID, or None."""
+    if isinstance(resource_id, str) and '/resourceGroups/' in resource_id:
+        return resource_id.split('/resourceGroups/')[1].split('/')[0]
+    return None
+
+class Resource:
+    """
+    Compact record of a discovered resource.
+
+    Holds only the fields filtering, dependency sorting and deletion read.
+    Type, location, resource group and subscription strings repeat across
+    many resources and are interned so equal values share one object.
+    details holds the DETAIL_FIELDS that were fetched for the resource, or
+    None when discovery did not collect them.
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "type",
+        "location",
+        "tags",
+        "resource_group",
+        "subscription_id",
+        "subscription_name",
+        "details",
+    )
+
+    def __init__(self, id, name, type, location=None, tags=None, resource_group=None,
+                 subscription_id=None, subscription_name=None, details=None):
+        self.id = id
+        self.name = name
+        self.type = _intern(type)
+        self.location = _intern(location)
+        self.tags = tags or None
+        self.resource_group = _intern(resource_group or resource_group_from_id(id))
+        self.subscription_id = _intern(subscription_id)
+        self.subscription_name = _intern(subscription_name)
+        self.details = details or None
+
+    @classmethod
+    def from_sdk(cls, resource, subscription=None, details=False):
+        """
+        Build a record from an SDK resource model.
+
+        Args:
+            resource: The resource returned by the Azure SDK
+            subscription: Optional subscription the resource was listed in
+            details: Whether to keep the DETAIL_FIELDS of the resource
+        """
+        return cls(
+            resource.id,
+            resource.name,
+            resource.type,
+            location=getattr(resource, 'location', None),
+            tags=getattr(resource, 'tags', None),
+            subscription_id=subscription.subscription_id if subscription else None,
+            subscription_name=subscription.display_name if subscription else None,
+            details=_sdk_details(resource) if details else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from the dictionary returned by to_dict."""
+        return cls(
+            data.get("id"),
+            data.get("name"),
+            data.get("type"),
+            location=data.get("location"),
+            tags=data.get("tags"),
+            resource_group=data.get("resource_group"),
+            subscription_id=data.get("subscription_id"),
+            subscription_name=data.get("subscription_name"),
+            details=data.get("details"),
+        )
+
+    def to_dict(self):
+        """Return the record as a JSON-serializable dictionary."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"Resource(id={self.id!r}, type={self.type!r})"
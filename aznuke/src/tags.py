@@ -0,0 +1,83 @@
+# tags.py
+
+class TagIndex:
+    """
+    Inverted index of resource tags: tag name -> tag value -> resource IDs.
+
+    Built once per batch of discovered resources, so tag exclusions and the
+    --tag selector are answered with dictionary lookups and set operations
+    instead of comparing the tags of every resource against every rule.
+    Values are matched as == does; unhashable values can never equal a
+    configured scalar and are left out.
+    """
+
+    def __init__(self, resources=()):
+        self.index = {}
+        self.add(resources)
+
+    def add(self, resources):
+        """Index the tags of more resources."""
+        index = self.index
+        for resource in resources:
+            tags = getattr(resource, 'tags', None)
+            if not tags or not isinstance(tags, dict):
+                continue
+            resource_id = resource.id
+            for key, value in tags.items():
+                try:
+                    index.setdefault(key, {}).setdefault(value, set()).add(resource_id)
+                except TypeError:
+                    continue
+
+    def ids(self, key, value):
+        """Return the IDs of the resources tagged key=value."""
+        try:
+            return self.index.get(key, {}).get(value, frozenset())
+        except TypeError:
+            return frozenset()
+
+    def match_any(self, tags):
+        """Return the IDs of the resources carrying at least one of the key=value pairs of tags."""
+        matched = set()
+        for key, value in tags.items():
+            matched |= self.ids(key, value)
+        return matched
+
+    def match_all(self, tags):
+        """Return the IDs of the resources carrying every key=value pair of tags."""
+        sets = sorted((self.ids(key, value) for key, value in tags.items()), key=len)
+        if not sets:
+            return set()
+        matched = set(sets[0])
+        for ids in sets[1:]:
+            matched &= ids
+            if not matched:
+                break
+        return matched
+
+def parse_tag(value):
+    """
+    Parse a key=value tag selector into a (key, value) pair.
+
+    Raises:
+        ValueError: If value has no '=' or an empty key
+    """
+    key, sep, tag_value = value.partition("=")
+    key = key.strip()
+    if not sep or not key:
+        raise ValueError(f"Invalid tag selector '{value}': expected key=value")
+    return key, tag_value.strip()
+
+def select_tagged(resources, selector, tag_index=None):
+    """
+    Return the resources carrying every key=value pair of selector, in input order.
+
+    Args:
+        resources: Resources to select from
+        selector: Mapping of tag names to the values they must have
+        tag_index: TagIndex of resources, built when not given
+    """
+    if tag_index is None:
+        tag_index = TagIndex(resources)
+    matched = tag_index.match_all(selector)
+    return [resource for resource in resources if resource.id in matched]
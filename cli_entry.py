@@ -4,6 +4,7 @@
 import sys
 import os
 import asyncio
+import multiprocessing
 from colorama import init, Fore, Style
 
 # Handle bundled executable path resolution
@@ -67,4 +68,7 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
+    # In the PyInstaller binary, the worker processes of --filter-engine
+    # parallel start this script again; let them run as pool workers
+    multiprocessing.freeze_support()
+    main()
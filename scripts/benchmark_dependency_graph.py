@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark deletion planning against the previous pairwise dependency graph.
+
+Builds a synthetic subscription (resource groups holding virtual networks
+with subnets, NICs, public IPs, VMs, disks, NSGs and storage accounts),
+times build_dependency_graph + sort_by_dependencies, and checks that the
+order satisfies every type-order and containment constraint. With
+--compare, the previous O(n^2) builder is timed as well (only practical up
+to a few thousand resources). Its orders violate constraints, since it
+deleted containers before their contents against the type order.
+
+Usage:
+    python scripts/benchmark_dependency_graph.py --resources 20000 --compare 2000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aznuke.src.deletion import DELETION_TYPE_ORDER, build_dependency_graph, sort_by_dependencies
+from aznuke.src.resources import Resource
+
+# Resources created per virtual network, by type
+LAYOUT = [
+    ("Microsoft.Network/virtualNetworks/subnets", 2),
+    ("Microsoft.Network/publicIPAddresses", 2),
+    ("Microsoft.Network/networkInterfaces", 3),
+    ("Microsoft.Compute/virtualMachines", 3),
+    ("Microsoft.Compute/disks", 3),
+    ("Microsoft.Network/networkSecurityGroups", 1),
+    ("Microsoft.Storage/storageAccounts", 1),
+    ("Microsoft.Web/sites", 2),
+]
+
+def make_resources(count):
+    """Return about count synthetic resources of one subscription."""
+    resources = []
+    subscription = "/subscriptions/00000000-0000-0000-0000-000000000000"
+    group = 0
+    while len(resources) < count:
+        rg_id = f"{subscription}/resourceGroups/rg-{group}"
+        resources.append(Resource(rg_id, f"rg-{group}", "Microsoft.Resources/resourceGroups"))
+        for network in range(5):
+            vnet_id = f"{rg_id}/providers/Microsoft.Network/virtualNetworks/vnet-{network}"
+            resources.append(Resource(vnet_id, f"vnet-{network}", "Microsoft.Network/virtualNetworks"))
+            for resource_type, per_network in LAYOUT:
+                for index in range(per_network):
+                    name = f"{resource_type.rsplit('/', 1)[1]}-{network}-{index}"
+                    if resource_type.endswith("/subnets"):
+                        resource_id = f"{vnet_id}/subnets/{name}"
+                    else:
+                        resource_id = f"{rg_id}/providers/{resource_type}/{name}"
+                    resources.append(Resource(resource_id, name, resource_type))
+        group += 1
+    return resources[:count]
+
+def build_pairwise_graph(resources):
+    """The previous builder: every pair of resources compared, O(n^2) edges."""
+    dependency_graph = {resource.id: [] for resource in resources}
+    for resource in resources:
+        resource_id = resource.id
+        resource_type = resource.type
+        for other_resource in resources:
+            other_id = other_resource.id
+            other_type = other_resource.type
+            if resource_id == other_id:
+                continue
+            if (resource_type in DELETION_TYPE_ORDER and
+                    other_type in DELETION_TYPE_ORDER and
+                    DELETION_TYPE_ORDER[resource_type] < DELETION_TYPE_ORDER[other_type]):
+                dependency_graph[other_id].append(resource)
+            if other_id in resource_id:
+                dependency_graph[resource_id].append(other_resource)
+    return dependency_graph
+
+def check_order(ordered, resources):
+    """
+    Return the number of constraints the order violates.
+
+    Checked: each resource follows all resources of earlier types and
+    precedes the resources containing it (whose IDs are a prefix of its own).
+    """
+    position = {resource.id: index for index, resource in enumerate(ordered)}
+    assert len(position) == len(resources), "resources missing from the order"
+
+    violations = 0
+    last_of_level = {}
+    for resource in ordered:
+        level = DELETION_TYPE_ORDER.get(resource.type)
+        if level is not None:
+            last_of_level[level] = max(last_of_level.get(level, -1), position[resource.id])
+    ids = set(position)
+    for resource in ordered:
+        ancestors = []
+        parts = resource.id.split("/")
+        for end in range(2, len(parts)):
+            parent = "/".join(parts[:end])
+            if parent in ids:
+                ancestors.append(parent)
+        violations += sum(position[parent] < position[resource.id] for parent in ancestors)
+
+        level = DELETION_TYPE_ORDER.get(resource.type)
+        if level is None:
+            continue
+        for lower, last in last_of_level.items():
+            if lower < level and last > position[resource.id]:
+                violations += 1
+    return violations
+
+def measure(function, *args):
+    """Return (result, seconds, peak MiB) of function(*args)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+def plan(builder, resources):
+    return sort_by_dependencies(resources, builder(resources))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deletion dependency planning")
+    parser.add_argument("--resources", type=int, nargs="+", default=[1000, 5000, 20000, 100000],
+                        help="Inventory sizes to plan")
+    parser.add_argument("--compare", type=int, default=2000,
+                        help="Also time the pairwise builder up to this many resources (0 to skip)")
+    args = parser.parse_args()
+
+    print(f"{'resources':>10} {'builder':>9} {'seconds':>9} {'peak MiB':>9} {'violations':>10}")
+    for count in args.resources:
+        resources = make_resources(count)
+        runs = [("indexed", build_dependency_graph)]
+        if count <= args.compare:
+            runs.append(("pairwise", build_pairwise_graph))
+        for label, builder in runs:
+            ordered, elapsed, peak = measure(plan, builder, resources)
+            print(f"{count:>10} {label:>9} {elapsed:>9.3f} {peak:>9.1f} {check_order(ordered, resources):>10}")
+
+if __name__ == "__main__":
+    main()
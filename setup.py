@@ -31,6 +31,10 @@ setup(
         "colorama==0.4.6",
         "tqdm==4.66.1",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.8"],
+        "columnar": ["numpy>=1.22"],
+    },
     entry_points={
         "console_scripts": [
             "aznuke=aznuke:main",
@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.aio`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.aio`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.aio import *  # noqa: F401,F403
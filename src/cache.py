@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.cache`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.cache`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.cache import *  # noqa: F401,F403
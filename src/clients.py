@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.clients`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.clients`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.clients import *  # noqa: F401,F403
@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.columnar`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.columnar`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.columnar import *  # noqa: F401,F403
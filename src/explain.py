@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.explain`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.explain`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.explain import *  # noqa: F401,F403
@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.lro`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.lro`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.lro import *  # noqa: F401,F403
@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.report`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.report`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.report import *  # noqa: F401,F403
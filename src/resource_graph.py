@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.resource_graph`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.resource_graph`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.resource_graph import *  # noqa: F401,F403
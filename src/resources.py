@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.resources`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.resources`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.resources import *  # noqa: F401,F403
@@ -0,0 +1,8 @@
+"""Compatibility wrapper for :mod:`aznuke.src.tags`.
+
+The canonical implementation lives under ``aznuke.src``. This module keeps
+legacy ``src.tags`` imports working without maintaining a second copy of the
+logic.
+"""
+
+from aznuke.src.tags import *  # noqa: F401,F403
@@ -9,6 +9,11 @@ from unittest.mock import MagicMock, patch
 # Add the project root directory to Python's module path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep caches written during tests out of the user's cache directory"""
+    monkeypatch.setenv("AZNUKE_CACHE_DIR", str(tmp_path_factory.mktemp("aznuke-cache")))
+
 # Mock fixtures for Azure services
 @pytest.fixture
 def mock_credentials():
@@ -0,0 +1,214 @@
+"""
+Tests for the native async code path
+"""
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from azure.core.async_paging import AsyncItemPaged, AsyncList
+
+from aznuke.src import aio
+from aznuke.src.deletion import get_resource_client, get_network_client
+
+
+def async_pager(items):
+    """Build an AsyncItemPaged that serves the given items as a single page"""
+    async def get_next(continuation_token):
+        return None
+
+    async def extract_data(response):
+        return None, AsyncList(items)
+
+    return AsyncItemPaged(get_next, extract_data)
+
+
+class FakeAsyncCredential:
+    """Stand-in for an azure.identity.aio credential"""
+
+    async def get_token(self, *scopes, **kwargs):
+        return MagicMock(token="token", expires_on=123)
+
+    async def close(self):
+        pass
+
+
+def fake_async_client(resources=None, error=None):
+    """Build an async resource client whose list() serves resources or raises"""
+    client = MagicMock()
+    client.close = AsyncMock()
+
+    def list_resources(filter=None):
+        if error:
+            raise error
+        return async_pager(resources or [])
+
+    client.resources.list.side_effect = list_resources
+    return client
+
+
+def test_is_async_credential():
+    """Test async credentials are told apart from sync ones"""
+    assert aio.is_async_credential(FakeAsyncCredential())
+    assert not aio.is_async_credential(MagicMock())
+
+
+def test_deletion_clients_follow_credential_type():
+    """Test deletion client factories build aio clients for async credentials"""
+    from azure.mgmt.network.aio import NetworkManagementClient
+    from azure.mgmt.resource.resources.aio import ResourceManagementClient
+
+    credentials = FakeAsyncCredential()
+
+    assert isinstance(get_resource_client(credentials, "sub"), ResourceManagementClient)
+    assert isinstance(get_network_client(credentials, "sub"), NetworkManagementClient)
+
+
+@pytest.mark.asyncio
+async def test_call_awaits_async_operations_without_threads():
+    """Test async operations are awaited on the loop and sync ones use a thread"""
+    async def async_get(name):
+        return f"async-{name}"
+
+    with patch('asyncio.to_thread') as mock_to_thread:
+        assert await aio.call(async_get, "vm") == "async-vm"
+        mock_to_thread.assert_not_called()
+
+    assert await aio.call(lambda name: f"sync-{name}", "vm") == "sync-vm"
+
+
+@pytest.mark.asyncio
+async def test_collect_supports_async_and_sync_pagers():
+    """Test list operations are drained for both client flavours"""
+    assert await aio.collect(lambda: async_pager([1, 2])) == [1, 2]
+    assert await aio.collect(lambda: iter([3, 4])) == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_begin_and_wait_on_async_poller():
+    """Test async pollers are started and awaited natively"""
+    from azure.core.polling import AsyncLROPoller
+
+    poller = MagicMock(spec=AsyncLROPoller)
+    poller.result = AsyncMock(return_value="done")
+
+    async def begin_delete(name):
+        return poller
+
+    started = await aio.begin(begin_delete, "rg")
+    assert started is poller
+    assert await aio.wait(started) == "done"
+
+
+@pytest.mark.asyncio
+async def test_begin_sends_sync_requests_off_the_event_loop():
+    """Test the first request of a sync begin_* runs in a worker thread"""
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def begin_delete(name):
+        threads.append(threading.get_ident())
+        return MagicMock(name=name)
+
+    await asyncio.gather(aio.begin(begin_delete, "rg1"), aio.begin(begin_delete, "rg2"))
+
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+@pytest.mark.asyncio
+async def test_iter_resources_aio_combines_type_filters():
+    """Test async discovery uses one OR-ed filter and de-duplicates"""
+    resource = MagicMock()
+    resource.id = "/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Web/sites/app"
+    client = fake_async_client([resource, resource])
+
+    result = [r async for r in aio.iter_resources_aio(client, ["Microsoft.Web/sites", "Microsoft.Web/serverFarms"])]
+
+    assert result == [resource]
+    client.resources.list.assert_called_once_with(
+        filter="resourceType eq 'Microsoft.Web/sites' or resourceType eq 'Microsoft.Web/serverFarms'"
+    )
+
+
+@pytest.mark.asyncio
+@patch('aznuke.src.aio.get_async_resource_client')
+async def test_iter_all_resource_batches_aio_isolates_errors(mock_get_client, capsys):
+    """Test one failing subscription does not stop async discovery of the others"""
+    healthy_sub = MagicMock(subscription_id="sub-ok", display_name="Healthy")
+    broken_sub = MagicMock(subscription_id="sub-broken", display_name="Broken")
+    resource = MagicMock()
+
+    clients = {
+        "sub-ok": fake_async_client([resource]),
+        "sub-broken": fake_async_client(error=Exception("AuthorizationFailed")),
+    }
+    mock_get_client.side_effect = lambda creds, sub_id: clients[sub_id]
+
+    errors = []
+    batches = [
+        batch async for batch in aio.iter_all_resource_batches_aio(
+            FakeAsyncCredential(), [broken_sub, healthy_sub], errors=errors
+        )
+    ]
+
+    assert [[r.id for r in batch] for batch in batches] == [[resource.id]]
+    assert batches[0][0].subscription_id == "sub-ok"
+    assert batches[0][0].subscription_name == "Healthy"
+    assert [sub for sub, _ in errors] == [broken_sub]
+    assert "Broken" in capsys.readouterr().err
+    for client in clients.values():
+        client.close.assert_awaited_once()
+
+
+def test_discovery_workers_default_to_the_backend_default():
+    """Test --discovery-workers is unset by default, so native async keeps its own higher limit"""
+    from aznuke.cli import create_parser
+
+    parser = create_parser(version_string="Azure Nuke test")
+
+    assert parser.parse_args(["scan"]).discovery_workers is None
+    assert parser.parse_args(["delete", "--discovery-workers", "4"]).discovery_workers == 4
+
+
+@pytest.mark.asyncio
+async def test_shared_session_attaches_one_transport_to_clients():
+    """Test clients created inside shared_session share its transport"""
+    pytest.importorskip("aiohttp")
+
+    async with aio.shared_session() as transport:
+        first = aio.get_async_resource_client(FakeAsyncCredential(), "sub-a")
+        second = aio.get_async_network_client(FakeAsyncCredential(), "sub-b")
+        assert first._client._pipeline._transport is transport
+        assert second._client._pipeline._transport is transport
+
+    assert aio._client_options() == {}
+
+
+@pytest.mark.asyncio
+async def test_to_sync_credential_wraps_async_token():
+    """Test async credentials can be handed to sync code running in worker threads"""
+    credentials = await aio.to_sync_credential(FakeAsyncCredential())
+
+    token = await asyncio.to_thread(credentials.get_token, "scope")
+    assert token.token == "token"
+
+
+@pytest.mark.asyncio
+async def test_to_sync_credential_refreshes_tokens_near_expiry():
+    """Test the sync wrapper fetches a new token on the loop once the cached one nears expiry"""
+    credentials = MagicMock()
+    credentials.get_token = AsyncMock(side_effect=[
+        MagicMock(token="first", expires_on=time.time() + 60),
+        MagicMock(token="second", expires_on=time.time() + 3600),
+    ])
+
+    sync_credentials = await aio.to_sync_credential(credentials)
+    # Still valid, so handed out on the loop, but inside the refresh margin
+    assert sync_credentials.get_token(aio.MANAGEMENT_SCOPE).token == "first"
+
+    token = await asyncio.to_thread(sync_credentials.get_token, aio.MANAGEMENT_SCOPE)
+    assert token.token == "second"
+    assert (await asyncio.to_thread(sync_credentials.get_token, aio.MANAGEMENT_SCOPE)).token == "second"
+    assert credentials.get_token.await_count == 2
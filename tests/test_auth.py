@@ -0,0 +1,147 @@
+"""
+Tests for the authentication module
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from azure.core.credentials import AccessToken
+
+from aznuke.src.auth import (
+    CachedTokenCredential,
+    SubscriptionIndex,
+    SubscriptionInfo,
+    create_credential,
+    get_subscriptions,
+)
+
+
+def make_subscription(subscription_id, display_name, tenant_id="tenant-1"):
+    """Create a subscription as the SDK returns it"""
+    sub = MagicMock(subscription_id=subscription_id, tenant_id=tenant_id, state="Enabled")
+    sub.display_name = display_name
+    return sub
+
+
+def test_subscription_index_matches_id_and_name():
+    """Test profiles match a subscription ID or a case-insensitive display name"""
+    dev = SubscriptionInfo("SUB-1", "Development")
+    other_dev = SubscriptionInfo("sub-2", "development")
+    index = SubscriptionIndex([dev, other_dev, SubscriptionInfo("sub-3", "production")])
+    
+    assert index.find("sub-1") == [dev]
+    assert index.find("DEVELOPMENT") == [dev, other_dev]
+    assert index.find("staging") == []
+
+
+@patch('aznuke.src.auth.SubscriptionClient')
+def test_get_subscriptions_lists_every_tenant(mock_client, capsys):
+    """Test all tenants are listed, failing tenants skipped and duplicates dropped"""
+    tenant_client = MagicMock()
+    tenant_client.tenants.list.return_value = [MagicMock(tenant_id=t) for t in ("t1", "t2", "t3")]
+    
+    def subscription_client(credentials):
+        if not hasattr(credentials, "tenant_id"):
+            return tenant_client
+        client = MagicMock()
+        if credentials.tenant_id == "t1":
+            client.subscriptions.list.return_value = [make_subscription("sub-1", "one", "t1")]
+        elif credentials.tenant_id == "t2":
+            client.subscriptions.list.side_effect = Exception("Interaction required")
+        else:
+            client.subscriptions.list.return_value = [
+                make_subscription("SUB-1", "one", "t3"),
+                make_subscription("sub-3", "three", "t3"),
+            ]
+        return client
+    
+    mock_client.side_effect = subscription_client
+    
+    subscriptions = get_subscriptions(object(), all_tenants=True)
+    
+    assert sorted(sub.subscription_id.lower() for sub in subscriptions) == ["sub-1", "sub-3"]
+    assert all(isinstance(sub, SubscriptionInfo) for sub in subscriptions)
+    # The skipped tenant is reported on stderr, away from JSON output
+    assert "t2" in capsys.readouterr().err
+
+
+def make_credential(*lifetimes):
+    """Create a credential returning tokens that expire after the given seconds"""
+    credential = MagicMock()
+    credential.get_token.side_effect = [
+        AccessToken(f"token-{i}", int(time.time() + lifetime)) for i, lifetime in enumerate(lifetimes)
+    ]
+    return credential
+
+
+def test_cached_token_credential_reuses_tokens():
+    """Test tokens are fetched once per scope and tenant"""
+    inner = make_credential(3600, 3600)
+    credentials = CachedTokenCredential(inner)
+
+    assert credentials.get_token("scope").token == "token-0"
+    assert credentials.get_token("scope").token == "token-0"
+    assert credentials.get_token("scope", tenant_id="other").token == "token-1"
+    assert inner.get_token.call_count == 2
+
+
+def test_cached_token_credential_fetches_tenants_concurrently():
+    """Test first fetches for different tenants do not wait on each other, while one tenant is fetched once"""
+    barrier = threading.Barrier(2, timeout=5)
+    inner = MagicMock()
+
+    def get_token(*scopes, tenant_id=None, **kwargs):
+        # Both tenants must be fetching at the same time to pass the barrier
+        barrier.wait()
+        return AccessToken(f"token-{tenant_id}", int(time.time()) + 3600)
+
+    inner.get_token.side_effect = get_token
+    credentials = CachedTokenCredential(inner)
+
+    with ThreadPoolExecutor(4) as pool:
+        tokens = list(pool.map(lambda tenant: credentials.get_token("scope", tenant_id=tenant).token,
+                               ["a", "b", "a", "b"]))
+
+    assert tokens == ["token-a", "token-b", "token-a", "token-b"]
+    assert inner.get_token.call_count == 2
+
+
+def test_cached_token_credential_refreshes_ahead_of_expiry():
+    """Test a token close to expiry is still returned while it is refreshed"""
+    inner = make_credential(300, 3600)
+    credentials = CachedTokenCredential(inner, refresh_margin=600)
+
+    assert credentials.get_token("scope").token == "token-0"
+    assert credentials.get_token("scope").token == "token-0"
+    for _ in range(100):
+        if inner.get_token.call_count == 2 and not credentials._refreshing:
+            break
+        time.sleep(0.01)
+    assert credentials.get_token("scope").token == "token-1"
+
+
+def test_cached_token_credential_fetches_nearly_expired_tokens():
+    """Test tokens about to expire are replaced before they are handed out"""
+    store = MagicMock()
+    store.load.return_value = {}
+    inner = make_credential(60, 3600)
+    credentials = CachedTokenCredential(inner, store)
+
+    assert credentials.get_token("scope").token == "token-0"
+    assert credentials.get_token("scope").token == "token-1"
+    assert store.save.call_count == 2
+    assert [t.token for t in store.save.call_args.args[0].values()] == ["token-1"]
+
+
+def test_create_credential_pins_credential_type():
+    """Test --auth selects a single credential type"""
+    identity = MagicMock()
+
+    assert create_credential(identity, "cli") is identity.AzureCliCredential.return_value
+    assert create_credential(identity, "env", all_tenants=True) is identity.EnvironmentCredential.return_value
+    identity.EnvironmentCredential.assert_called_once_with(additionally_allowed_tenants=["*"])
+    identity.DefaultAzureCredential.assert_not_called()
+    with pytest.raises(ValueError):
+        create_credential(identity, "password")
@@ -0,0 +1,194 @@
+"""
+Tests for the inventory cache module
+"""
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+from aznuke.src.auth import SubscriptionInfo
+from aznuke.src.cache import (
+    InventoryCache,
+    SubscriptionCache,
+    TokenStore,
+    cache_key,
+    subscription_cache_key,
+    token_store_name,
+)
+from aznuke.src.resources import Resource
+
+
+def make_resource(name):
+    """Create a discovered resource as the discovery backends return it"""
+    return Resource.from_dict({
+        "id": f"/subscriptions/sub-1/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/{name}",
+        "name": name,
+        "type": "Microsoft.Storage/storageAccounts",
+        "location": "westus2",
+        "tags": {"env": "dev"},
+        "resource_group": "rg",
+        "subscription_id": "sub-1",
+        "subscription_name": "development",
+    })
+
+
+def test_cache_round_trip(tmp_path):
+    """Test a committed inventory is read back in batches"""
+    cache = InventoryCache(directory=str(tmp_path))
+    writer = cache.writer("key")
+    writer.add([make_resource("a"), make_resource("b")])
+    writer.add([make_resource("c")])
+    writer.commit()
+    
+    created, batches = cache.read("key", batch_size=2)
+    batches = list(batches)
+    
+    assert [[r.name for r in batch] for batch in batches] == [["a", "b"], ["c"]]
+    resource = batches[0][0]
+    assert resource.tags == {"env": "dev"}
+    assert resource.resource_group == "rg"
+    assert resource.subscription_name == "development"
+
+
+def test_cache_expires_after_ttl(tmp_path):
+    """Test entries older than the TTL are ignored"""
+    cache = InventoryCache(directory=str(tmp_path), ttl=60)
+    writer = cache.writer("key")
+    writer.add([make_resource("a")])
+    writer.commit()
+    
+    with patch("aznuke.src.cache.time.time", return_value=os.path.getmtime(cache.path("key")) + 120):
+        assert cache.read("key") is None
+
+
+def test_cache_discard_keeps_previous_entry(tmp_path):
+    """Test an unfinished inventory never replaces the committed one"""
+    cache = InventoryCache(directory=str(tmp_path))
+    writer = cache.writer("key")
+    writer.add([make_resource("a")])
+    writer.commit()
+    
+    writer = cache.writer("key")
+    writer.add([make_resource("b")])
+    writer.discard()
+    
+    _, batches = cache.read("key")
+    assert [r.name for batch in batches for r in batch] == ["a"]
+    assert os.listdir(tmp_path) == ["key.jsonl"]
+
+
+def test_cache_writer_creates_no_file_until_used(tmp_path):
+    """Test a writer that is dropped before the first batch leaves no temporary file"""
+    cache = InventoryCache(directory=str(tmp_path))
+    writer = cache.writer("key")
+    
+    assert os.listdir(tmp_path) == []
+    writer.discard()
+    assert os.listdir(tmp_path) == []
+    
+    writer.commit()
+    assert cache.read("key") is not None
+
+
+def test_cache_with_a_corrupt_record_is_a_miss(tmp_path):
+    """Test a damaged entry yields nothing and is removed, so discovery runs again"""
+    cache = InventoryCache(directory=str(tmp_path), ttl=60)
+    writer = cache.writer("key")
+    writer.add([make_resource("a"), make_resource("b"), make_resource("c")])
+    writer.commit()
+    
+    with open(cache.path("key"), encoding="utf-8") as file:
+        lines = file.readlines()
+    # Truncate the last record halfway
+    lines[-1] = lines[-1][:len(lines[-1]) // 2]
+    with open(cache.path("key"), "w", encoding="utf-8") as file:
+        file.writelines(lines)
+    
+    assert cache.read("key", batch_size=1) is None
+    assert not os.path.exists(cache.path("key"))
+
+
+def test_cache_key_depends_on_selection():
+    """Test the key changes with the subscriptions, types, regions and backend"""
+    sub = MagicMock(subscription_id="SUB-1", tenant_id="tenant-1")
+    other = MagicMock(subscription_id="sub-2", tenant_id="tenant-1")
+    
+    key = cache_key([sub], ["Microsoft.Web/sites"], ["westus2"])
+    
+    assert key == cache_key([sub], ["microsoft.web/sites"], ["westus2"])
+    assert key != cache_key([sub, other], ["Microsoft.Web/sites"], ["westus2"])
+    assert key != cache_key([sub], None, ["westus2"])
+    assert key != cache_key([sub], ["Microsoft.Web/sites"], ["eastus"])
+    assert key != cache_key([sub], ["Microsoft.Web/sites"], ["westus2"], backend="graph")
+
+
+def test_subscription_cache_round_trip(tmp_path):
+    """Test cached subscriptions are read back until the TTL passes"""
+    cache = SubscriptionCache(directory=str(tmp_path), ttl=60)
+    key = subscription_cache_key({"tid": "tenant-1", "oid": "user-1"})
+    cache.write(key, [SubscriptionInfo("sub-1", "development", "tenant-1", "Enabled")])
+    
+    [sub] = cache.read(key)
+    assert (sub.subscription_id, sub.display_name, sub.tenant_id) == ("sub-1", "development", "tenant-1")
+    assert cache.read(subscription_cache_key({"tid": "tenant-1", "oid": "user-2"})) is None
+    
+    with patch("aznuke.src.cache.time.time", return_value=os.path.getmtime(cache.path(key)) + 120):
+        assert cache.read(key) is None
+
+
+@patch("msal_extensions.build_encrypted_persistence")
+def test_token_store_round_trip(mock_persistence, tmp_path):
+    """Test tokens are saved to the encrypted persistence and expired ones dropped"""
+    from azure.core.credentials import AccessToken
+    
+    saved = {}
+    persistence = mock_persistence.return_value
+    persistence.save.side_effect = lambda data: saved.update(data=data)
+    persistence.load.side_effect = lambda: saved["data"]
+    
+    store = TokenStore("cli", directory=str(tmp_path))
+    store.save({
+        "fresh": AccessToken("a", int(os.path.getmtime(tmp_path)) + 3600),
+        "expired": AccessToken("b", 1),
+    })
+    
+    assert {key: token.token for key, token in store.load().items()} == {"fresh": "a"}
+    assert mock_persistence.call_args.args[0] == os.path.join(str(tmp_path), "tokens", "cli.bin")
+
+
+
+@patch("msal_extensions.build_encrypted_persistence")
+def test_token_store_is_not_shared_after_switching_identity(mock_persistence, tmp_path, monkeypatch):
+    """Test tokens stored for one account are not handed out once signed in as another"""
+    from azure.core.credentials import AccessToken
+    
+    files = {}
+    
+    def persistence(path):
+        store = MagicMock()
+        store.save.side_effect = lambda data: files.update({path: data})
+        store.load.side_effect = lambda: files[path]
+        return store
+    mock_persistence.side_effect = persistence
+    
+    def sign_in(user, tenant):
+        # What `az login` records as the active account
+        (tmp_path / "azureProfile.json").write_text(json.dumps({"subscriptions": [
+            {"id": "sub-1", "isDefault": True, "tenantId": tenant, "user": {"name": user, "type": "user"}},
+        ]}), encoding="utf-8-sig")
+    
+    monkeypatch.setenv("AZURE_CONFIG_DIR", str(tmp_path))
+    sign_in("alice@contoso.com", "tenant-1")
+    TokenStore(token_store_name("cli"), directory=str(tmp_path)).save({
+        "|scope": AccessToken("alice-token", int(os.path.getmtime(tmp_path)) + 3600),
+    })
+    assert TokenStore(token_store_name("cli"), directory=str(tmp_path)).load()["|scope"].token == "alice-token"
+    
+    sign_in("bob@fabrikam.com", "tenant-2")
+    assert TokenStore(token_store_name("cli"), directory=str(tmp_path)).load() == {}
+    
+    # Service principals are told apart by their environment variables
+    monkeypatch.setenv("AZURE_CLIENT_ID", "app-1")
+    name = token_store_name("env")
+    monkeypatch.setenv("AZURE_CLIENT_ID", "app-2")
+    assert token_store_name("env") != name
+    assert token_store_name("env") != token_store_name("env", all_tenants=True)
@@ -6,7 +6,9 @@ import inspect
 from unittest.mock import MagicMock, patch
 
 # Import the module to test
-from aznuke.cli import create_parser, parse_resource_types, cmd_scan, cmd_delete
+from aznuke.cli import create_parser, parse_resource_types, parse_regions, cmd_scan, cmd_delete
+from aznuke.src.resources import Resource
+from aznuke.src.auth import CachedTokenCredential
 
 
 def spinner_results(*results):
@@ -22,6 +24,17 @@ def spinner_results(*results):
     return side_effect
 
 
+def stream_batches(*batches):
+    """Return a stream_resources_async replacement yielding the given batches."""
+    def fake_stream(*args, **kwargs):
+        async def generator():
+            for batch in batches:
+                yield batch
+        return generator()
+
+    return fake_stream
+
+
 def test_parse_resource_types():
     """Test parsing resource types from a comma-separated string"""
     # Parse resource types from a string
@@ -40,6 +53,12 @@ def test_parse_resource_types_none():
     assert result is None
 
 
+def test_parse_regions():
+    """Test parsing and normalizing a comma-separated region list"""
+    assert parse_regions("westus2, East US,") == ["westus2", "eastus"]
+    assert parse_regions(None) is None
+
+
 def test_create_parser_scan_uses_supplied_default_config():
     """Test scan parser wiring and configurable default config path."""
     parser = create_parser(default_config_path="/tmp/exclusions.yaml", version_string="Azure Nuke test")
@@ -50,6 +69,15 @@ def test_create_parser_scan_uses_supplied_default_config():
     assert args.profile == "development"
     assert args.output == "json"
     assert args.config == "/tmp/exclusions.yaml"
+    assert args.backend == "arm"
+
+
+def test_create_parser_accepts_graph_backend():
+    """Test selecting the Resource Graph discovery backend."""
+    parser = create_parser(default_config_path="/tmp/exclusions.yaml", version_string="Azure Nuke test")
+
+    assert parser.parse_args(["scan", "--backend", "graph"]).backend == "graph"
+    assert parser.parse_args(["delete", "--backend", "graph"]).backend == "graph"
 
 
 def test_create_parser_delete_wires_safety_options():
@@ -82,9 +110,11 @@ def test_create_parser_delete_wires_safety_options():
 @patch('aznuke.cli.load_exclusions')
 @patch('aznuke.cli.create_progress_bar')
 @patch('aznuke.cli.filter_resources_async')
-@patch('aznuke.cli.show_summary_by_type')
+@patch('aznuke.cli.stream_resources_async')
+@patch('aznuke.src.report.show_summary_by_type')
 async def test_cmd_scan(
     mock_show_summary,
+    mock_stream,
     mock_filter_async,
     mock_progress_bar,
     mock_load_exclusions,
@@ -105,8 +135,9 @@ async def test_cmd_scan(
     mock_resource = MagicMock()
     mock_resources = [mock_resource]
     
-    # Configure the second spinner call to return resources
-    mock_spinner.side_effect = spinner_results(mock_subscriptions, mock_resources)
+    # Subscriptions come from the spinner, resources are streamed
+    mock_spinner.side_effect = spinner_results(mock_subscriptions)
+    mock_stream.side_effect = stream_batches(mock_resources)
     
     mock_exclusions = {"resource_types": ["Microsoft.KeyVault/vaults"]}
     mock_load_exclusions.return_value = mock_exclusions
@@ -122,11 +153,19 @@ async def test_cmd_scan(
     args = MagicMock()
     args.profile = "development"
     args.region = None
+    args.tag = None
+    args.explain = None
     args.checks = None
     args.output = "text"
     args.severity = None
     args.config = "config/exclusions.yaml"
     args.verbose = False
+    args.native_async = False
+    args.filter_engine = "python"
+    args.auth = "default"
+    args.token_cache = False
+    args.no_cache = True
+    args.incremental = False
     
     # Call the function
     await cmd_scan(args)
@@ -134,11 +173,67 @@ async def test_cmd_scan(
     # Verify the function calls
     mock_startup.assert_called_once()
     mock_credentials.assert_called_once()
-    assert mock_spinner.call_count == 2
+    assert mock_spinner.call_count == 1
+    mock_stream.assert_called_once()
     mock_load_exclusions.assert_called_once_with(args.config)
     mock_progress_bar.assert_called_once()
-    mock_filter_async.assert_called_once()
+    mock_filter_async.assert_called_once_with(mock_resources, mock_exclusions, mock_progress_instance, "python", None, None)
     mock_show_summary.assert_called_once()
+    assert mock_show_summary.call_args.kwargs["counts"] == {mock_resource.type: 1}
+
+
+@pytest.mark.asyncio
+@patch('azure.identity.DefaultAzureCredential')
+@patch('aznuke.cli.async_spinner')
+@patch('aznuke.cli.load_exclusions')
+@patch('aznuke.cli.stream_resources_async')
+async def test_cmd_scan_streams_json(mock_stream, mock_load_exclusions, mock_spinner, mock_credentials, capsys):
+    """Test JSON scan output is written from the resource stream"""
+    import json
+
+    def resource(name, resource_type):
+        res = MagicMock()
+        res.name = name
+        res.type = resource_type
+        res.subscription_id = "sub"
+        res.resource_group = "rg"
+        return res
+
+    mock_spinner.side_effect = spinner_results([MagicMock()])
+    mock_stream.side_effect = stream_batches(
+        [resource("vm1", "Microsoft.Compute/virtualMachines"), resource("kv1", "Microsoft.KeyVault/vaults")],
+        [resource("vm2", "Microsoft.Compute/virtualMachines")],
+    )
+    mock_load_exclusions.return_value = {"resource_types": ["Microsoft.KeyVault/vaults"]}
+
+    args = MagicMock()
+    args.profile = None
+    args.region = None
+    args.tag = None
+    args.explain = None
+    args.checks = None
+    args.output = "json"
+    args.severity = None
+    args.native_async = False
+    args.filter_engine = "python"
+    args.auth = "default"
+    args.token_cache = False
+    args.no_cache = True
+    args.incremental = False
+
+    await cmd_scan(args)
+
+    result = json.loads(capsys.readouterr().out)["scan_results"]
+    assert result["total_resources"] == 3
+    assert result["resources_identified"] == 2
+    assert result["resources_excluded"] == 1
+    assert [r["name"] for r in result["resources"]] == ["vm1", "vm2"]
+    assert result["resources"][0] == {
+        "name": "vm1",
+        "type": "Microsoft.Compute/virtualMachines",
+        "subscription_id": "sub",
+        "resource_group": "rg",
+    }
 
 
 @pytest.mark.asyncio
@@ -149,6 +244,7 @@ async def test_cmd_scan(
 @patch('aznuke.cli.load_exclusions')
 @patch('aznuke.cli.create_progress_bar')
 @patch('aznuke.cli.filter_resources_async')
+@patch('aznuke.cli.stream_resources_async')
 @patch('aznuke.cli.show_summary_by_type')
 @patch('aznuke.cli.require_confirmation')
 @patch('aznuke.cli.delete_resources')
@@ -158,6 +254,7 @@ async def test_cmd_delete(
     mock_delete,
     mock_confirmation,
     mock_show_summary,
+    mock_stream,
     mock_filter_async,
     mock_progress_bar,
     mock_load_exclusions,
@@ -175,7 +272,8 @@ async def test_cmd_delete(
     mock_subscription.display_name = "development"
     mock_subscriptions = [mock_subscription]
     
-    mock_spinner.side_effect = spinner_results(mock_subscriptions, [MagicMock()])
+    mock_spinner.side_effect = spinner_results(mock_subscriptions)
+    mock_stream.side_effect = stream_batches([MagicMock()])
     
     mock_exclusions = {"resource_types": ["Microsoft.KeyVault/vaults"]}
     mock_load_exclusions.return_value = mock_exclusions
@@ -197,13 +295,23 @@ async def test_cmd_delete(
     args = MagicMock()
     args.profile = "development"
     args.region = None
+    args.tag = None
+    args.explain = None
     args.checks = None
     args.dry_run = False
     args.config = "config/exclusions.yaml"
     args.protected_subscriptions = None
     args.cleanup_empty_resource_groups = False
+    args.max_parallel = 16
+    args.max_parallel_per_subscription = 8
     args.yes = False
     args.verbose = False
+    args.native_async = False
+    args.filter_engine = "python"
+    args.auth = "default"
+    args.token_cache = False
+    args.no_cache = True
+    args.incremental = False
     
     # Call the function
     await cmd_delete(args)
@@ -211,21 +319,162 @@ async def test_cmd_delete(
     # Verify the function calls
     mock_startup.assert_called_once()
     mock_credentials.assert_called_once()
-    assert mock_spinner.call_count == 2
+    assert mock_spinner.call_count == 1
+    mock_stream.assert_called_once()
     mock_load_exclusions.assert_called_once_with(args.config)
     mock_progress_bar.assert_called_once()
     mock_filter_async.assert_called_once()
     mock_show_summary.assert_called_once()
+    # Tokens of the credential are cached for the whole command
+    credentials = mock_delete.call_args.args[0]
+    assert isinstance(credentials, CachedTokenCredential)
+    assert credentials.credentials is mock_creds_instance
     mock_confirmation.assert_called_once_with(
         mock_resources_to_delete,
-        mock_creds_instance,
+        credentials,
         args.dry_run,
         cleanup_empty_resource_groups=False,
     )
     mock_delete.assert_called_once_with(
-        mock_creds_instance,
+        credentials,
         mock_resources_to_delete,
         args.dry_run,
         cleanup_empty_rgs=False,
+        max_parallel=args.max_parallel,
+        max_parallel_per_subscription=args.max_parallel_per_subscription,
     )
-    mock_completion.assert_called_once_with(True, len(mock_deleted), len(mock_failed)) 
+    mock_completion.assert_called_once_with(True, len(mock_deleted), len(mock_failed))
+
+
+@pytest.mark.asyncio
+@patch('azure.identity.DefaultAzureCredential')
+@patch('aznuke.cli.async_spinner')
+@patch('aznuke.cli.load_exclusions')
+@patch('aznuke.cli.stream_resources_async')
+@patch('aznuke.cli.verify_resources')
+@patch('aznuke.cli.delete_resources')
+@patch('aznuke.cli.show_completion_animation')
+async def test_cmd_delete_reuses_cached_inventory(
+    mock_completion,
+    mock_delete,
+    mock_verify,
+    mock_stream,
+    mock_load_exclusions,
+    mock_spinner,
+    mock_credentials,
+    tmp_path,
+    monkeypatch,
+):
+    """Test a follow-up delete starts from the cached inventory and re-verifies it"""
+    monkeypatch.setenv("AZNUKE_CACHE_DIR", str(tmp_path))
+    subscription = MagicMock(subscription_id="sub-1", display_name="development", tenant_id="tenant-1")
+    resource = Resource.from_dict({
+        "id": "/subscriptions/sub-1/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/sa",
+        "name": "sa",
+        "type": "Microsoft.Storage/storageAccounts",
+        "subscription_id": "sub-1",
+    })
+    
+    mock_load_exclusions.return_value = {}
+    mock_stream.side_effect = stream_batches([resource])
+    mock_delete.return_value = ([], [])
+    
+    async def verify(credentials, resources, errors=None):
+        return []
+    mock_verify.side_effect = verify
+    
+    async def spinner(message, coro, **kwargs):
+        if "subscriptions" in message:
+            coro.close()
+            return [subscription]
+        return await coro
+    mock_spinner.side_effect = spinner
+    
+    parser = create_parser(version_string="Azure Nuke test")
+    
+    await cmd_delete(parser.parse_args(["delete", "--yes", "--dry-run"]))
+    await cmd_delete(parser.parse_args(["delete", "--yes"]))
+    
+    # Only the dry run discovers; the real run deletes only resources that still exist
+    mock_stream.assert_called_once()
+    assert [r.id for r in mock_delete.call_args_list[0].args[1]] == [resource.id]
+    mock_verify.assert_called_once()
+    assert mock_delete.call_args_list[1].args[1] == []
+
+
+@pytest.mark.asyncio
+@patch('azure.identity.DefaultAzureCredential')
+@patch('aznuke.cli.async_spinner')
+@patch('aznuke.cli.load_exclusions')
+@patch('aznuke.cli.stream_resources_async')
+@patch('aznuke.cli.verify_resources')
+@patch('aznuke.cli.delete_resources')
+@patch('aznuke.cli.show_completion_animation')
+async def test_cmd_delete_rechecks_tags_of_cached_inventory(
+    mock_completion,
+    mock_delete,
+    mock_verify,
+    mock_stream,
+    mock_load_exclusions,
+    mock_spinner,
+    mock_credentials,
+    tmp_path,
+    monkeypatch,
+):
+    """Test resources tagged for protection after the cached scan are not deleted"""
+    monkeypatch.setenv("AZNUKE_CACHE_DIR", str(tmp_path))
+    subscription = MagicMock(subscription_id="sub-1", display_name="development", tenant_id="tenant-1")
+    resource = Resource.from_dict({
+        "id": "/subscriptions/sub-1/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts/sa",
+        "name": "sa",
+        "type": "Microsoft.Storage/storageAccounts",
+        "subscription_id": "sub-1",
+    })
+    
+    mock_load_exclusions.return_value = {"tags": {"Protected": "true"}}
+    mock_stream.side_effect = stream_batches([resource])
+    mock_delete.return_value = ([], [])
+    
+    async def verify(credentials, resources, errors=None):
+        # The protection tag was added after the scan was cached
+        return [Resource.from_dict(dict(resources[0].to_dict(), tags={"Protected": "true"}))]
+    mock_verify.side_effect = verify
+    
+    async def spinner(message, coro, **kwargs):
+        if "subscriptions" in message:
+            coro.close()
+            return [subscription]
+        return await coro
+    mock_spinner.side_effect = spinner
+    
+    parser = create_parser(version_string="Azure Nuke test")
+    
+    await cmd_delete(parser.parse_args(["delete", "--yes", "--dry-run"]))
+    await cmd_delete(parser.parse_args(["delete", "--yes"]))
+    
+    # The cached record was selected, but its current tags preserve it
+    mock_stream.assert_called_once()
+    assert [r.id for r in mock_delete.call_args_list[0].args[1]] == [resource.id]
+    mock_verify.assert_called_once()
+    assert mock_delete.call_args_list[1].args[1] == []
+
+
+@pytest.mark.asyncio
+async def test_write_through_cache_keeps_streaming_when_the_cache_fails(capsys):
+    """Test a cache write error drops the cache entry but not the resources"""
+    from aznuke.cli import write_through_cache
+    
+    async def batches():
+        yield ["a"]
+        yield ["b"]
+    
+    writer = MagicMock()
+    writer.add.side_effect = OSError("No space left on device")
+    
+    result = [batch async for batch in write_through_cache(batches(), writer, [], "Inventory cache disabled")]
+    
+    assert result == [["a"], ["b"]]
+    writer.add.assert_called_once()
+    writer.commit.assert_not_called()
+    writer.discard.assert_called()
+    assert "No space left on device" in capsys.readouterr().out
@@ -0,0 +1,101 @@
+"""
+Tests for the client registry module
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from aznuke.src import clients
+from aznuke.src.discovery import _fan_out
+
+
+class FakeClient:
+    """Record how a management client was constructed"""
+
+    def __init__(self, credentials, subscription_id, **options):
+        self.credentials = credentials
+        self.subscription_id = subscription_id
+        self.options = options
+        self.close = MagicMock()
+
+
+class OtherClient(FakeClient):
+    """A second client type"""
+
+
+@pytest.mark.asyncio
+async def test_registry_shares_clients_per_type_and_subscription():
+    """Test one client per (type, subscription) on one pooled transport"""
+    credentials = object()
+
+    async with clients.client_registry() as registry:
+        first = clients.get_client(FakeClient, credentials, "sub-1")
+        assert clients.get_client(FakeClient, credentials, "sub-1") is first
+        other_sub = clients.get_client(FakeClient, credentials, "sub-2")
+        other_type = clients.get_client(OtherClient, credentials, "sub-1")
+
+        assert len({id(first), id(other_sub), id(other_type)}) == 3
+        assert first.options["transport"] is other_type.options["transport"] is registry.transport()
+
+    for client in (first, other_sub, other_type):
+        client.close.assert_called_once()
+    assert clients.get_client(FakeClient, credentials, "sub-1") is not first
+
+
+@pytest.mark.asyncio
+async def test_registry_owns_async_clients():
+    """Test async clients are closed by the registry instead of the caller"""
+    client = MagicMock()
+    client.close = AsyncMock()
+    factory = MagicMock(return_value=client)
+
+    async with clients.client_registry():
+        assert clients.get_async_client(factory, object(), "sub-1") is client
+        await clients.release_async_client(client)
+        client.close.assert_not_awaited()
+
+    client.close.assert_awaited_once()
+    await clients.release_async_client(client)
+    assert client.close.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_discovery_workers_use_active_registry():
+    """Test discovery threads share the clients of the caller's registry"""
+    credentials = object()
+
+    async with clients.client_registry():
+        created = [
+            payload for _, _, payload in _fan_out(
+                ["a", "b", "c"], lambda item: [clients.get_client(FakeClient, credentials, "sub")], 3
+            )
+        ]
+
+    assert len(created) == 3
+    assert all(client is created[0] for client in created)
+
+
+@pytest.mark.asyncio
+async def test_foreign_tenant_clients_request_tokens_from_their_tenant():
+    """Test a subscription of another tenant gets clients whose tokens come from that tenant"""
+    credentials = MagicMock()
+    async_credentials = MagicMock()
+    async_credentials.get_token = AsyncMock()
+    subscriptions = [
+        MagicMock(subscription_id="sub-home", tenant_id="home-tenant"),
+        MagicMock(subscription_id="SUB-FOREIGN", tenant_id="foreign-tenant"),
+    ]
+
+    async with clients.client_registry():
+        with clients.subscription_tenants(subscriptions):
+            client = clients.get_client(FakeClient, credentials, "sub-foreign")
+            assert clients.get_client(FakeClient, credentials, "sub-foreign") is client
+            client.credentials.get_token("scope")
+
+            async_client = clients.get_async_client(FakeClient, async_credentials, "sub-foreign")
+            await async_client.credentials.get_token("scope")
+
+        # Outside the block the credentials are used as they are
+        assert clients.get_client(FakeClient, credentials, "sub-other").credentials is credentials
+
+    credentials.get_token.assert_called_once_with("scope", tenant_id="foreign-tenant")
+    async_credentials.get_token.assert_awaited_once_with("scope", tenant_id="foreign-tenant")
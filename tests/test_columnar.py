@@ -0,0 +1,61 @@
+"""
+Tests for the columnar filter engine
+"""
+import pytest
+from unittest.mock import MagicMock
+
+from aznuke.src.filtering import ExclusionMatcher, filter_resources
+from aznuke.src.resources import Resource
+
+np = pytest.importorskip("numpy")
+
+
+def make_resources():
+    """Create resources covering every rule kind, plus an SDK-like mock"""
+    resources = []
+    for i in range(60):
+        resources.append(Resource(
+            f"/subscriptions/s/resourceGroups/rg{i % 4}/providers/Microsoft.Web/sites/app{i}",
+            f"prod-app{i}" if i % 5 == 0 else f"app{i}",
+            "Microsoft.KeyVault/vaults" if i % 7 == 0 else "Microsoft.Web/sites",
+            location="eastus" if i % 11 == 0 else "westus2",
+            tags={"DoNotDelete": "true"} if i % 9 == 0 else {"env": "dev"},
+        ))
+    sdk_resource = MagicMock()
+    sdk_resource.id = "/subscriptions/s/resourceGroups/keep-rg/providers/Microsoft.Web/sites/legacy"
+    sdk_resource.name = "legacy"
+    sdk_resource.type = "Microsoft.Web/sites"
+    sdk_resource.tags = None
+    resources.append(sdk_resource)
+    return resources
+
+
+def test_columnar_engine_matches_python_engine():
+    """Test both engines return the same partition in input order"""
+    exclusions = ExclusionMatcher({
+        "resource_types": ["Microsoft.KeyVault/vaults"],
+        "name_patterns": ["^prod-.*$", r"^(app)1\1$"],
+        "resource_ids": ["/subscriptions/s/resourceGroups/rg1/providers/Microsoft.Web/sites/app13"],
+        "resource_groups": ["keep-rg"],
+        "regions": ["eastus"],
+        "tags": {"DoNotDelete": "true"},
+    })
+    resources = make_resources()
+    progress_bar = MagicMock()
+
+    expected = filter_resources(resources, exclusions)
+    result = filter_resources(resources, exclusions, progress_bar, engine="columnar")
+
+    assert result == expected
+    assert resources[-1] in result[1]
+    progress_bar.update.assert_called_once_with(len(resources))
+
+
+def test_columnar_engine_without_rules():
+    """Test an empty rule set preserves nothing"""
+    resources = make_resources()
+
+    to_delete, to_preserve = filter_resources(resources, ExclusionMatcher({}), engine="columnar")
+
+    assert to_delete == resources
+    assert to_preserve == []
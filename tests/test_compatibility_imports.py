@@ -4,19 +4,40 @@
 def test_legacy_src_modules_reexport_canonical_implementations():
     """Legacy src.* imports should point at aznuke.src implementations."""
     from aznuke.src import auth as canonical_auth
+    from aznuke.src import cache as canonical_cache
+    from aznuke.src import clients as canonical_clients
+    from aznuke.src import columnar as canonical_columnar
     from aznuke.src import deletion as canonical_deletion
     from aznuke.src import discovery as canonical_discovery
     from aznuke.src import filtering as canonical_filtering
+    from aznuke.src import lro as canonical_lro
+    from aznuke.src import resource_graph as canonical_resource_graph
+    from aznuke.src import resources as canonical_resources
     from aznuke.src import safety as canonical_safety
+    from aznuke.src import tags as canonical_tags
     from src import auth as legacy_auth
+    from src import cache as legacy_cache
+    from src import clients as legacy_clients
+    from src import columnar as legacy_columnar
     from src import deletion as legacy_deletion
     from src import discovery as legacy_discovery
     from src import filtering as legacy_filtering
+    from src import lro as legacy_lro
+    from src import resource_graph as legacy_resource_graph
+    from src import resources as legacy_resources
     from src import safety as legacy_safety
+    from src import tags as legacy_tags
 
     assert legacy_auth.get_credentials is canonical_auth.get_credentials
+    assert legacy_cache.InventoryCache is canonical_cache.InventoryCache
+    assert legacy_clients.ClientRegistry is canonical_clients.ClientRegistry
+    assert legacy_columnar.ResourceColumns is canonical_columnar.ResourceColumns
     assert legacy_discovery.discover_all_resources is canonical_discovery.discover_all_resources
     assert legacy_filtering.filter_resources is canonical_filtering.filter_resources
+    assert legacy_lro.LROManager is canonical_lro.LROManager
+    assert legacy_resource_graph.discover_all_resources_graph is canonical_resource_graph.discover_all_resources_graph
+    assert legacy_resources.Resource is canonical_resources.Resource
     assert legacy_safety.require_confirmation is canonical_safety.require_confirmation
+    assert legacy_tags.TagIndex is canonical_tags.TagIndex
     assert legacy_deletion.detach_disk is canonical_deletion.detach_disk
     assert legacy_deletion.delete_resources is canonical_deletion.delete_resources
@@ -15,8 +15,13 @@ from aznuke.src.deletion import (
     detach_disk,
     build_dependency_graph,
     sort_by_dependencies,
-    delete_resources
+    dependency_levels,
+    delete_resources,
+    verify_resources,
+    DependencyCycleError,
 )
+from aznuke.src.resources import Resource
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
 
 @pytest.mark.asyncio
 @patch('aznuke.src.deletion.get_resource_client')
@@ -58,8 +63,8 @@ async def test_delete_resource_success(mock_to_thread, mock_get_resource_client)
     mock_poller = MagicMock()
     mock_client.resources.begin_delete.return_value = mock_poller
     
-    # Configure asyncio.to_thread to return a completed result
-    mock_to_thread.return_value = MagicMock()
+    # Configure asyncio.to_thread to run the call in place
+    mock_to_thread.side_effect = lambda func, *args, **kwargs: func(*args, **kwargs)
     
     # Create mock credentials
     mock_credentials = MagicMock()
@@ -71,7 +76,9 @@ async def test_delete_resource_success(mock_to_thread, mock_get_resource_client)
     assert result is True
     mock_get_resource_client.assert_called_once_with(mock_credentials, mock_resource.subscription_id)
     mock_client.resources.begin_delete.assert_called_once()
-    mock_to_thread.assert_called_once()
+    # Both the initial request and the wait for the poller run off the event loop
+    assert mock_to_thread.call_count == 2
+    mock_to_thread.assert_called_with(mock_poller.result)
 
 @pytest.mark.asyncio
 @patch('aznuke.src.deletion.get_resource_client')
@@ -177,13 +184,61 @@ async def test_build_dependency_graph():
     # IP should have no dependencies
     assert len(graph[mock_ip.id]) == 0
 
+def test_sort_by_dependencies_orders_types_and_containment():
+    """Test contents are deleted before their containers and types follow the deletion order"""
+    rg_id = "/subscriptions/s/resourceGroups/rg"
+    vnet_id = f"{rg_id}/providers/Microsoft.Network/virtualNetworks/vnet"
+    rg = Resource(rg_id, "rg", "Microsoft.Resources/resourceGroups")
+    vnet = Resource(vnet_id, "vnet", "Microsoft.Network/virtualNetworks")
+    subnet = Resource(f"{vnet_id}/subnets/default", "default", "Microsoft.Network/virtualNetworks/subnets")
+    vm1 = Resource(f"{rg_id}/providers/Microsoft.Compute/virtualMachines/vm1", "vm1", "Microsoft.Compute/virtualMachines")
+    vm10 = Resource(f"{rg_id}/providers/Microsoft.Compute/virtualMachines/vm10", "vm10", "Microsoft.Compute/virtualMachines")
+    nic = Resource(f"{rg_id}/providers/Microsoft.Network/networkInterfaces/nic", "nic", "Microsoft.Network/networkInterfaces")
+    site = Resource(f"{rg_id}/providers/Microsoft.Web/sites/app", "app", "Microsoft.Web/sites")
+    resources = [rg, vnet, site, vm10, vm1, subnet, nic]
+    
+    graph = build_dependency_graph(resources)
+    
+    assert dependency_levels(resources, graph) == [[site, subnet], [nic], [vm10, vm1], [vnet], [rg]]
+    assert sort_by_dependencies(resources, graph) == [site, subnet, nic, vm10, vm1, vnet, rg]
+    assert graph[vnet.id] == [subnet, nic, vm10, vm1, subnet]
+    # vm1's ID is a string prefix of vm10's, but not a container of it
+    assert graph[vm1.id] == [subnet, nic]
+    assert sorted(graph) == sorted(resource.id for resource in resources)
+
+def test_dependency_levels_handles_deep_chains_and_string_ids():
+    """Test long dependency chains are sorted without recursion, with IDs or resources as dependencies"""
+    resources = [Resource(f"/r/{i}", f"r{i}", "t") for i in range(5000)]
+    graph = {resource.id: [] for resource in resources}
+    for i in range(1, len(resources)):
+        graph[resources[i].id].append(resources[i - 1].id if i % 2 else resources[i - 1])
+    graph[resources[0].id].append("/not/being/deleted")
+    
+    levels = dependency_levels(list(reversed(resources)), graph)
+    
+    assert levels == [[resource] for resource in resources]
+
+
+def test_dependency_levels_breaks_or_reports_cycles():
+    """Test cycles are broken in input order and reported, or raised in strict mode"""
+    a, b, c, d = (Resource(f"/r/{name}", name, "t") for name in "abcd")
+    graph = {a.id: [c], b.id: [a], c.id: [b], d.id: [c]}
+    cycles = []
+    
+    assert dependency_levels([a, b, c, d], graph, cycles=cycles) == [[a], [b], [c], [d]]
+    assert len(cycles) == 1 and set(cycles[0]) == {a, b, c}
+    
+    with pytest.raises(DependencyCycleError) as excinfo:
+        sort_by_dependencies([a, b, c, d], graph, strict=True)
+    assert set(excinfo.value.cycle) == {a, b, c}
+
 @pytest.mark.asyncio
 @patch('aznuke.src.deletion.delete_resource')
 @patch('aznuke.src.deletion.process_special_resource')
 @patch('aznuke.src.deletion.create_progress_bar')
-@patch('aznuke.src.deletion.sort_by_dependencies')  # Mock the dependency sorting
+@patch('aznuke.src.deletion.dependency_levels')  # Mock the dependency sorting
 @patch('aznuke.src.deletion.build_dependency_graph')  # Mock the dependency graph building
-async def test_delete_resources(mock_build_dependency_graph, mock_sort_dependencies, mock_create_progress_bar, mock_process_special, mock_delete_resource):
+async def test_delete_resources(mock_build_dependency_graph, mock_dependency_levels, mock_create_progress_bar, mock_process_special, mock_delete_resource):
     """Test deleting multiple resources"""
     # Create mock resources
     mock_resource1 = MagicMock()
@@ -201,7 +256,7 @@ async def test_delete_resources(mock_build_dependency_graph, mock_sort_dependenc
     # Configure the mocks
     mock_dependency_graph = {}
     mock_build_dependency_graph.return_value = mock_dependency_graph
-    mock_sort_dependencies.return_value = resources  # Return the same resources
+    mock_dependency_levels.return_value = [resources]  # Return the same resources as one level
     
     mock_progress_bar = MagicMock()
     mock_create_progress_bar.return_value = mock_progress_bar
@@ -247,4 +302,163 @@ async def test_delete_resources(mock_build_dependency_graph, mock_sort_dependenc
                       if call[0][1].id == mock_resource2.id]
     
     assert len(resource1_calls) >= 1
-    assert len(resource2_calls) >= 1 
\ No newline at end of file
+    assert len(resource2_calls) >= 1 
+@pytest.mark.asyncio
+@patch('aznuke.src.deletion.process_special_resource', new_callable=AsyncMock)
+@patch('aznuke.src.deletion.create_progress_bar')
+async def test_delete_resources_runs_levels_in_parallel(mock_create_progress_bar, mock_process_special):
+    """Test resources of a level are deleted concurrently within the limits, levels one after another"""
+    def resource(subscription, resource_type, name):
+        return Resource(f"/subscriptions/{subscription}/resourceGroups/rg/providers/{resource_type}/{name}",
+                        name, resource_type, subscription_id=subscription)
+    
+    resources = []
+    for subscription in ("s1", "s2"):
+        resources += [resource(subscription, "Microsoft.Compute/virtualMachines", f"vm{i}") for i in range(3)]
+        resources += [resource(subscription, "Microsoft.Network/networkInterfaces", f"nic{i}") for i in range(3)]
+        resources += [resource(subscription, "Microsoft.Network/publicIPAddresses", f"ip{i}") for i in range(3)]
+    
+    running = {"total": 0, "s1": 0, "s2": 0}
+    peaks = {"total": 0, "s1": 0, "s2": 0}
+    events = []
+    
+    async def fake_delete(credentials, resource, dry_run=False):
+        for key in ("total", resource.subscription_id):
+            running[key] += 1
+            peaks[key] = max(peaks[key], running[key])
+        events.append(("start", resource))
+        await asyncio.sleep(0.01)
+        events.append(("end", resource))
+        for key in ("total", resource.subscription_id):
+            running[key] -= 1
+        return True
+    
+    with patch('aznuke.src.deletion.delete_resource', side_effect=fake_delete):
+        deleted, failed = await delete_resources(MagicMock(), resources, dry_run=False,
+                                                 max_parallel=4, max_parallel_per_subscription=2)
+    
+    assert failed == []
+    assert sorted(r.id for r in deleted) == sorted(r.id for r in resources)
+    assert peaks == {"total": 4, "s1": 2, "s2": 2}
+    for subscription in ("s1", "s2"):
+        order = [(event, r.type) for event, r in events if r.subscription_id == subscription]
+        last_end = {t: max(i for i, (event, rt) in enumerate(order) if event == "end" and rt == t) for _, t in order}
+        first_start = {t: min(i for i, (event, rt) in enumerate(order) if event == "start" and rt == t) for _, t in order}
+        assert last_end["Microsoft.Network/publicIPAddresses"] < first_start["Microsoft.Network/networkInterfaces"]
+        assert last_end["Microsoft.Network/networkInterfaces"] < first_start["Microsoft.Compute/virtualMachines"]
+    assert mock_process_special.await_count == 12
+
+@pytest.mark.asyncio
+@patch('aznuke.src.deletion.delete_resource', new_callable=AsyncMock, return_value=True)
+@patch('aznuke.src.deletion.get_network_client')
+@patch('aznuke.src.deletion.create_progress_bar')
+async def test_delete_resources_updates_a_shared_vnet_one_subnet_at_a_time(
+        mock_create_progress_bar, mock_get_network_client, mock_delete_resource):
+    """Test sibling subnets of one VNet, deleted in the same level, do not overwrite each other's VNet update"""
+    import time
+    from types import SimpleNamespace
+    
+    vnet_id = "/subscriptions/s1/resourceGroups/rg/providers/Microsoft.Network/virtualNetworks/vnet1"
+    subnets = [Resource(f"{vnet_id}/subnets/{name}", name, "Microsoft.Network/virtualNetworks/subnets",
+                        subscription_id="s1") for name in ("a", "b")]
+    state = {"subnets": [SimpleNamespace(name=name) for name in ("a", "b", "c")], "active": 0, "peak": 0}
+    
+    def get_vnet(resource_group, vnet_name):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        # Leave room for a concurrent sibling to read the same VNet
+        time.sleep(0.02)
+        return SimpleNamespace(subnets=list(state["subnets"]))
+    
+    def put_vnet(resource_group, vnet_name, vnet):
+        state["subnets"] = vnet.subnets
+        state["active"] -= 1
+        return MagicMock()
+    
+    network_client = mock_get_network_client.return_value
+    network_client.network_interfaces.list.return_value = []
+    network_client.virtual_networks.get.side_effect = get_vnet
+    network_client.virtual_networks.begin_create_or_update.side_effect = put_vnet
+    
+    async def spinner(message, coro, silent=False):
+        return await coro
+    
+    with patch('aznuke.src.deletion.async_spinner', side_effect=spinner):
+        deleted, failed = await delete_resources(MagicMock(), subnets, dry_run=False)
+    
+    assert failed == []
+    assert len(deleted) == 2
+    assert [subnet.name for subnet in state["subnets"]] == ["c"]
+    assert state["peak"] == 1
+
+@pytest.mark.asyncio
+@patch('aznuke.src.deletion.delete_resource', new_callable=AsyncMock, return_value=True)
+@patch('aznuke.src.deletion.create_progress_bar')
+async def test_delete_resources_isolates_failing_subscriptions(mock_create_progress_bar, mock_delete_resource):
+    """Test a subscription whose plan fails does not stop the other subscriptions"""
+    resources = [
+        Resource(f"/subscriptions/{subscription}/resourceGroups/rg/providers/Microsoft.Web/sites/app{i}",
+                 f"app{i}", "Microsoft.Web/sites", subscription_id=subscription)
+        for subscription in ("good", "bad")
+        for i in range(2)
+    ]
+    progress_bar = mock_create_progress_bar.return_value
+    
+    def plan(subscription_resources, graph, cycles=None):
+        if subscription_resources[0].subscription_id == "bad":
+            raise RuntimeError("throttled")
+        return [subscription_resources]
+    
+    with patch('aznuke.src.deletion.dependency_levels', side_effect=plan):
+        deleted, failed = await delete_resources(MagicMock(), resources, dry_run=False)
+    
+    assert deleted == resources[:2]
+    assert [resource for resource, _ in failed] == resources[2:]
+    assert all("throttled" in error for _, error in failed)
+    assert sum(call.args[0] for call in progress_bar.update.call_args_list) == len(resources)
+    progress_bar.set_postfix.assert_called_with(subscriptions="2/2", failed=2)
+
+@pytest.mark.asyncio
+async def test_detach_disk_uses_details_from_discovery():
+    """Test an unattached disk fetched with details skips the disk lookup"""
+    from aznuke.src.resources import Resource
+    
+    resource = Resource(
+        "/subscriptions/sub/resourceGroups/test-rg/providers/Microsoft.Compute/disks/data-disk",
+        "data-disk",
+        "Microsoft.Compute/disks",
+        details={"managed_by": None},
+    )
+    compute_client = MagicMock()
+    
+    result = await detach_disk(compute_client, resource, dry_run=False)
+    
+    assert result is True
+    compute_client.disks.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch('aznuke.src.deletion.get_resource_client')
+async def test_verify_resources_returns_current_tags(mock_get_resource_client):
+    """Test cached resources are re-read, dropping deleted ones and refreshing tags"""
+    rg = "/subscriptions/sub-1/resourceGroups/rg/providers/Microsoft.Storage/storageAccounts"
+    kept = Resource(f"{rg}/kept", "kept", "Microsoft.Storage/storageAccounts", "westus2", subscription_id="sub-1")
+    gone = Resource(f"{rg}/gone", "gone", "Microsoft.Storage/storageAccounts", subscription_id="sub-1")
+    broken = Resource(f"{rg}/broken", "broken", "Microsoft.Storage/storageAccounts", subscription_id="sub-1")
+
+    def get_by_id(resource_id, api_version):
+        if resource_id == gone.id:
+            raise ResourceNotFoundError("gone")
+        if resource_id == broken.id:
+            raise HttpResponseError("throttled")
+        return MagicMock(location="westus2", tags={"Protected": "true"})
+
+    mock_get_resource_client.return_value.resources.get_by_id.side_effect = get_by_id
+    errors = []
+
+    current = await verify_resources(MagicMock(), [kept, gone, broken], errors=errors)
+
+    assert [resource.id for resource in current] == [kept.id]
+    assert current[0].tags == {"Protected": "true"}
+    assert current[0].subscription_id == "sub-1"
+    assert [resource for resource, _ in errors] == [broken]
@@ -5,7 +5,17 @@ import pytest
 from unittest.mock import MagicMock, patch
 
 # Import the module to test
-from aznuke.src.discovery import discover_resources, discover_all_resources
+from aznuke.src.discovery import (
+    STREAM_BATCH_SIZE,
+    STREAM_QUEUE_SIZE,
+    build_filters,
+    build_type_filters,
+    discover_all_resources,
+    discover_resources,
+    iter_all_resource_batches,
+    iter_all_resources,
+    iter_resources_by_resource_group,
+)
 
 
 def test_discover_resources():
@@ -30,16 +40,14 @@ def test_discover_resources_with_resource_types():
     # Create a mock resource client
     mock_client = MagicMock()
     
-    # Configure the mock client to return different resources for different filters
     mock_resource1 = MagicMock()
     mock_resource2 = MagicMock()
     
-    # Different resource types will return different resources
+    # All requested types are combined into a single filter
     def list_side_effect(filter=None):
-        if filter == "resourceType eq 'Microsoft.Storage/storageAccounts'":
-            return [mock_resource1]
-        elif filter == "resourceType eq 'Microsoft.KeyVault/vaults'":
-            return [mock_resource2]
+        if filter == ("resourceType eq 'Microsoft.Storage/storageAccounts' "
+                      "or resourceType eq 'Microsoft.KeyVault/vaults'"):
+            return [mock_resource1, mock_resource2]
         else:
             return []
     
@@ -53,9 +61,45 @@ def test_discover_resources_with_resource_types():
     assert len(result) == 2
     assert mock_resource1 in result
     assert mock_resource2 in result
+    assert mock_client.resources.list.call_count == 1
+
+
+def test_discover_resources_deduplicates_across_filter_chunks():
+    """Test that resources returned by several filter chunks are only kept once"""
+    mock_client = MagicMock()
+    
+    shared = MagicMock()
+    shared.id = "/subscriptions/sub/resourceGroups/rg/providers/Microsoft.Web/sites/app"
+    duplicate = MagicMock()
+    duplicate.id = shared.id.upper()
+    mock_client.resources.list.side_effect = [[shared], [duplicate]]
+    
+    with patch('aznuke.src.discovery.MAX_FILTER_LENGTH', 40):
+        result = discover_resources(mock_client, ["Microsoft.Web/sites", "Microsoft.Web/serverFarms"])
+    
+    assert result == [shared]
     assert mock_client.resources.list.call_count == 2
 
 
+def test_build_type_filters_chunks_long_type_lists():
+    """Test that type filters are OR-ed and split to respect the length limit"""
+    resource_types = [f"Microsoft.Test/type{i}" for i in range(50)]
+    
+    filters = build_type_filters(resource_types, max_length=200)
+    
+    assert len(filters) > 1
+    assert all(len(f) <= 200 for f in filters)
+    assert sum(f.count("resourceType eq") for f in filters) == 50
+    assert filters[0].startswith("resourceType eq 'Microsoft.Test/type0' or ")
+
+
+def test_build_type_filters_quotes_and_deduplicates():
+    """Test that duplicate types are dropped and quotes are escaped"""
+    filters = build_type_filters(["Microsoft.A/b", "Microsoft.A/b", "Odd'Type"])
+    
+    assert filters == ["resourceType eq 'Microsoft.A/b' or resourceType eq 'Odd''Type'"]
+
+
 @patch('aznuke.src.discovery.get_resource_client')
 def test_discover_all_resources(mock_get_client, mock_credentials, mock_subscription):
     """Test discovering all resources across subscriptions"""
@@ -73,7 +117,7 @@ def test_discover_all_resources(mock_get_client, mock_credentials, mock_subscrip
     
     # Verify the result
     assert len(result) == 1
-    assert result[0] == mock_resource
+    assert result[0].id == mock_resource.id
     assert result[0].subscription_id == mock_subscription.subscription_id
     assert result[0].subscription_name == mock_subscription.display_name
     mock_get_client.assert_called_once_with(mock_credentials, mock_subscription.subscription_id)
@@ -97,7 +141,231 @@ def test_discover_all_resources_with_resource_types(mock_get_client, mock_creden
     
     # Verify the result
     assert len(result) == 1
-    assert result[0] == mock_resource
+    assert result[0].id == mock_resource.id
     assert result[0].subscription_id == mock_subscription.subscription_id
     assert result[0].subscription_name == mock_subscription.display_name
-    mock_get_client.assert_called_once_with(mock_credentials, mock_subscription.subscription_id) 
\ No newline at end of file
+    mock_get_client.assert_called_once_with(mock_credentials, mock_subscription.subscription_id) 
+
+@patch('aznuke.src.discovery.get_resource_client')
+def test_discover_all_resources_isolates_subscription_errors(mock_get_client, mock_credentials, capsys):
+    """Test that a failing subscription does not abort discovery of the others"""
+    healthy_sub = MagicMock(subscription_id="sub-ok", display_name="Healthy")
+    broken_sub = MagicMock(subscription_id="sub-broken", display_name="Broken")
+    
+    healthy_client = MagicMock()
+    healthy_resource = MagicMock()
+    healthy_client.resources.list.return_value = [healthy_resource]
+    
+    broken_client = MagicMock()
+    broken_client.resources.list.side_effect = Exception("AuthorizationFailed")
+    
+    mock_get_client.side_effect = lambda creds, sub_id: healthy_client if sub_id == "sub-ok" else broken_client
+    
+    errors = []
+    result = discover_all_resources(mock_credentials, [broken_sub, healthy_sub], errors=errors)
+    
+    assert [r.id for r in result] == [healthy_resource.id]
+    assert result[0].subscription_id == "sub-ok"
+    assert len(errors) == 1
+    assert errors[0][0] is broken_sub
+    # Warnings stay out of stdout, where scan --output json streams its document
+    captured = capsys.readouterr()
+    assert "Broken" in captured.err
+    assert "Broken" not in captured.out
+
+
+@patch('aznuke.src.discovery.get_resource_client')
+def test_discover_all_resources_scans_subscriptions_concurrently(mock_get_client, mock_credentials):
+    """Test that subscriptions are scanned in parallel up to max_workers"""
+    import threading
+    
+    subscriptions = [MagicMock(subscription_id=f"sub-{i}", display_name=f"Sub {i}") for i in range(3)]
+    barrier = threading.Barrier(3, timeout=5)
+    
+    def list_resources():
+        # Every worker must be in flight at once for the barrier to release
+        barrier.wait()
+        return [MagicMock()]
+    
+    mock_client = MagicMock()
+    mock_client.resources.list.side_effect = list_resources
+    mock_get_client.return_value = mock_client
+    
+    result = discover_all_resources(mock_credentials, subscriptions, max_workers=3)
+    
+    assert len(result) == 3
+    assert mock_get_client.call_count == 3
+
+
+def test_discover_all_resources_without_subscriptions(mock_credentials):
+    """Test discovery with no subscriptions returns an empty list"""
+    assert discover_all_resources(mock_credentials, []) == []
+
+
+@patch('aznuke.src.discovery.get_resource_client')
+def test_iter_all_resources_yields_before_slow_subscriptions_finish(mock_get_client, mock_credentials):
+    """Test that resources are streamed while other subscriptions are still scanning"""
+    import threading
+    
+    fast_sub = MagicMock(subscription_id="sub-fast", display_name="Fast")
+    slow_sub = MagicMock(subscription_id="sub-slow", display_name="Slow")
+    release_slow = threading.Event()
+    
+    fast_resource = MagicMock()
+    slow_resource = MagicMock()
+    
+    def slow_list():
+        release_slow.wait(timeout=5)
+        return [slow_resource]
+    
+    fast_client = MagicMock()
+    fast_client.resources.list.return_value = [fast_resource]
+    slow_client = MagicMock()
+    slow_client.resources.list.side_effect = slow_list
+    mock_get_client.side_effect = lambda creds, sub_id: fast_client if sub_id == "sub-fast" else slow_client
+    
+    stream = iter_all_resources(mock_credentials, [slow_sub, fast_sub], max_workers=2)
+    
+    # The fast subscription is delivered while the slow one is still blocked
+    assert next(stream).id is fast_resource.id
+    release_slow.set()
+    assert [r.id for r in stream] == [slow_resource.id]
+
+
+@patch('aznuke.src.discovery.get_resource_client')
+def test_iter_all_resource_batches_stops_workers_when_closed(mock_get_client, mock_credentials, mock_subscription):
+    """Test that closing the stream early stops the discovery workers"""
+    produced = []
+    
+    def endless_list():
+        while True:
+            resource = MagicMock()
+            produced.append(resource)
+            yield resource
+    
+    mock_client = MagicMock()
+    mock_client.resources.list.side_effect = endless_list
+    mock_get_client.return_value = mock_client
+    
+    batches = iter_all_resource_batches(mock_credentials, [mock_subscription])
+    first = next(batches)
+    batches.close()
+    
+    assert len(first) == STREAM_BATCH_SIZE
+    # Workers are bounded by the queue, so only a limited number of batches were produced
+    assert len(produced) <= STREAM_BATCH_SIZE * (STREAM_QUEUE_SIZE + 3)
+
+
+def test_build_filters_pushes_down_regions_without_types():
+    """Test regions become a location filter when no types are requested"""
+    assert build_filters(regions=["westus2", "eastus"]) == ["location eq 'westus2' or location eq 'eastus'"]
+    assert build_filters() == [None]
+
+
+def test_discover_resources_with_regions_uses_location_filter():
+    """Test discovery sends the region filter to ARM"""
+    mock_client = MagicMock()
+    in_region = MagicMock(location="westus2")
+    mock_client.resources.list.return_value = [in_region]
+    
+    result = discover_resources(mock_client, regions=["westus2"])
+    
+    assert result == [in_region]
+    mock_client.resources.list.assert_called_once_with(filter="location eq 'westus2'")
+
+
+def test_discover_resources_with_types_and_regions_checks_location():
+    """Test regions are enforced on results when the filter carries the types"""
+    mock_client = MagicMock()
+    in_region = MagicMock(location="West US 2")
+    out_of_region = MagicMock(location="eastus")
+    mock_client.resources.list.return_value = [in_region, out_of_region]
+    
+    result = discover_resources(mock_client, ["Microsoft.Web/sites"], regions=["westus2"])
+    
+    assert result == [in_region]
+    mock_client.resources.list.assert_called_once_with(filter="resourceType eq 'Microsoft.Web/sites'")
+
+
+@patch('aznuke.src.discovery.get_resource_client')
+def test_discover_all_resources_returns_compact_records(mock_get_client, mock_credentials):
+    """Test discovered SDK models are converted to slotted records"""
+    from aznuke.src.resources import Resource
+    
+    subscription = MagicMock(subscription_id="sub-1", display_name="Sub 1")
+    sdk_resource = MagicMock(
+        id="/subscriptions/sub-1/resourceGroups/rg-a/providers/Microsoft.Web/sites/app",
+        type="Microsoft.Web/sites",
+        location="westus2",
+        tags={"env": "dev"},
+    )
+    sdk_resource.name = "app"
+    mock_get_client.return_value.resources.list.return_value = [sdk_resource]
+    
+    (resource,) = discover_all_resources(mock_credentials, [subscription])
+    
+    assert isinstance(resource, Resource)
+    assert not hasattr(resource, "__dict__")
+    assert (resource.name, resource.type, resource.location) == ("app", "Microsoft.Web/sites", "westus2")
+    assert resource.resource_group == "rg-a"
+    assert resource.tags == {"env": "dev"}
+    assert (resource.subscription_id, resource.subscription_name) == ("sub-1", "Sub 1")
+
+
+def test_resource_from_sdk_keeps_details_on_request():
+    """Test detail fields are only kept for the types that need them when asked"""
+    from aznuke.src.resources import Resource
+    
+    disk = MagicMock(id="/subscriptions/s/resourceGroups/rg/providers/Microsoft.Compute/disks/d",
+                     type="Microsoft.Compute/disks", managed_by="/subscriptions/s/vm")
+    site = MagicMock(id="/subscriptions/s/resourceGroups/rg/providers/Microsoft.Web/sites/app",
+                     type="Microsoft.Web/sites")
+    
+    assert Resource.from_sdk(disk).details is None
+    assert Resource.from_sdk(disk, details=True).details == {"managed_by": "/subscriptions/s/vm"}
+    assert Resource.from_sdk(site, details=True).details is None
+
+
+def test_iter_resources_by_resource_group_lists_groups_concurrently():
+    """Test sharded discovery lists every resource group in parallel and skips deleted groups"""
+    import threading
+    from azure.core.exceptions import ResourceNotFoundError
+    
+    groups = []
+    for name in ("rg-a", "rg-b", "rg-gone"):
+        group = MagicMock()
+        group.name = name
+        groups.append(group)
+    barrier = threading.Barrier(2, timeout=5)
+    
+    def list_by_resource_group(group, **kwargs):
+        if group == "rg-gone":
+            raise ResourceNotFoundError("ResourceGroupNotFound")
+        # Both live groups must be listed at the same time for the barrier to release
+        barrier.wait()
+        return [MagicMock(id=f"/subscriptions/s/resourceGroups/{group}/providers/A.B/c/x")]
+    
+    mock_client = MagicMock()
+    mock_client.resource_groups.list.return_value = groups
+    mock_client.resources.list_by_resource_group.side_effect = list_by_resource_group
+    
+    result = list(iter_resources_by_resource_group(mock_client, ["A.B/c"], max_workers=3))
+    
+    assert sorted(r.id for r in result) == [
+        "/subscriptions/s/resourceGroups/rg-a/providers/A.B/c/x",
+        "/subscriptions/s/resourceGroups/rg-b/providers/A.B/c/x",
+    ]
+    mock_client.resources.list_by_resource_group.assert_any_call("rg-a", filter="resourceType eq 'A.B/c'")
+    mock_client.resources.list.assert_not_called()
+
+
+def test_iter_resources_by_resource_group_raises_other_errors():
+    """Test a failure other than a deleted group fails the subscription"""
+    group = MagicMock()
+    group.name = "rg-a"
+    mock_client = MagicMock()
+    mock_client.resource_groups.list.return_value = [group]
+    mock_client.resources.list_by_resource_group.side_effect = Exception("AuthorizationFailed")
+    
+    with pytest.raises(Exception, match="AuthorizationFailed"):
+        list(iter_resources_by_resource_group(mock_client))
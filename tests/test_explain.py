@@ -0,0 +1,86 @@
+"""
+Tests for the explain module
+"""
+import json
+
+from aznuke.src.explain import ExclusionExplainer
+from aznuke.src.filtering import ExclusionMatcher, filter_resources
+from aznuke.src.resources import Resource
+
+
+def make_resource(name, resource_type="Microsoft.Web/sites", resource_group="rg", tags=None):
+    return Resource(
+        f"/subscriptions/s/resourceGroups/{resource_group}/providers/{resource_type}/{name}",
+        name, resource_type, tags=tags,
+    )
+
+
+def test_explainer_reports_hits_and_first_rule(tmp_path):
+    """Test every matching rule of the sampled resources is counted and the first one is named per preserved resource"""
+    exclusions = ExclusionMatcher({
+        "resource_types": ["Microsoft.KeyVault/vaults"],
+        "name_patterns": ["^prod-.*$", ".*-keep$", "^unused$"],
+        "resource_groups": ["keep-rg"],
+        "tags": {"DoNotDelete": "true"},
+    })
+    resources = [
+        make_resource("prod-kv", "Microsoft.KeyVault/vaults"),
+        make_resource("prod-app-keep", tags={"DoNotDelete": "true"}),
+        make_resource("app", resource_group="keep-rg"),
+        make_resource("scratch"),
+    ]
+    explainer = ExclusionExplainer(exclusions, sample_interval=1)
+    
+    result = filter_resources(resources[:2], exclusions, explain=explainer)
+    result2 = filter_resources(resources[2:], exclusions, explain=explainer, engine="parallel")
+    report = explainer.report()
+    
+    assert result[1] == resources[:2] and result2 == ([resources[3]], [resources[2]])
+    assert report["resources_evaluated"] == 4
+    assert report["resources_preserved"] == 3
+    assert report["resources_timed"] == 4
+    assert report["explain_seconds"] >= 0
+    assert report["preserved_resources_omitted"] == 0
+    assert set(report["rule_kinds"]) == {"resource_types", "name_patterns", "resource_groups", "tags"}
+    rules = {(rule["kind"], rule["rule"]): (rule["hits"], rule["first_match"]) for rule in report["rules"]}
+    assert rules == {
+        ("resource_types", "Microsoft.KeyVault/vaults"): (1, 1),
+        ("name_patterns", "^prod-.*$"): (2, 1),
+        ("name_patterns", ".*-keep$"): (1, 0),
+        ("name_patterns", "^unused$"): (0, 0),
+        ("resource_groups", "keep-rg"): (1, 1),
+        ("tags", "DoNotDelete=true"): (1, 0),
+    }
+    assert [entry["rule"] for entry in report["preserved_resources"]] == [
+        {"kind": "resource_types", "rule": "Microsoft.KeyVault/vaults"},
+        {"kind": "name_patterns", "rule": "^prod-.*$"},
+        {"kind": "resource_groups", "rule": "keep-rg"},
+    ]
+    
+    path = tmp_path / "explain.json"
+    explainer.write(path)
+    assert json.loads(path.read_text())["resources_preserved"] == 3
+
+
+def test_explainer_samples_hits_and_caps_preserved_list():
+    """Test hits are extrapolated from the sample while first matches stay exact and the list is capped"""
+    exclusions = ExclusionMatcher({"name_patterns": ["^a", "^(b)\\1", "^c|^d"], "tags": {"keep": "yes"}})
+    resources = [make_resource(name) for name in ["a1", "bb2", "d3", "a4", "x5", "c6"]]
+    explainer = ExclusionExplainer(exclusions, sample_interval=3, max_preserved=2)
+    
+    _, preserved = filter_resources(resources, exclusions, explain=explainer)
+    report = explainer.report()
+    
+    assert [resource.name for resource in preserved] == ["a1", "bb2", "d3", "a4", "c6"]
+    # Deleted resources come first, so x5 and d3 are sampled, each standing for 3 resources
+    assert report["resources_timed"] == 2
+    rules = {rule["rule"]: (rule["hits"], rule["sampled_hits"], rule["first_match"]) for rule in report["rules"]}
+    assert rules == {
+        "^a": (0, 0, 2),
+        "^(b)\\1": (0, 0, 1),
+        "^c|^d": (3, 1, 2),
+        "keep=yes": (0, 0, 0),
+    }
+    assert report["resources_preserved"] == 5
+    assert [entry["rule"]["rule"] for entry in report["preserved_resources"]] == ["^a", "^(b)\\1"]
+    assert report["preserved_resources_omitted"] == 3
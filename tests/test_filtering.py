@@ -7,7 +7,16 @@ from unittest.mock import MagicMock, patch
 import yaml
 
 # Import the module to test
-from aznuke.src.filtering import find_config_file, load_exclusions, should_preserve, filter_resources
+from aznuke.src.filtering import (
+    find_config_file,
+    load_exclusions,
+    should_preserve,
+    filter_resources,
+    ExclusionMatcher,
+    ExclusionConfigError,
+    ParallelFilter,
+)
+from aznuke.src.resources import Resource
 
 
 def test_find_config_file_exists(tmp_path):
@@ -160,4 +169,118 @@ def test_filter_resources_with_progress_bar(mock_resource):
     filter_resources(resources, exclusions, progress_bar)
     
     # Verify the progress bar was updated
-    progress_bar.update.assert_called_once_with(1) 
+    progress_bar.update.assert_called_once_with(1)
+
+
+def test_load_exclusions_compiles_matcher(temp_config_file):
+    """Test loaded exclusions are a compiled matcher that still reads like the config"""
+    exclusions = load_exclusions(str(temp_config_file))
+    
+    assert isinstance(exclusions, ExclusionMatcher)
+    assert exclusions.get("regions") is None
+    assert "Microsoft.KeyVault/vaults" in exclusions.resource_types
+
+
+def test_load_exclusions_empty_file(tmp_path):
+    """Test an empty exclusions file preserves nothing"""
+    config_file = tmp_path / "exclusions.yaml"
+    config_file.write_text("")
+    
+    exclusions = load_exclusions(str(config_file))
+    
+    assert not should_preserve(Resource("/subscriptions/s/resourceGroups/rg/x", "x", "t"), exclusions)
+
+
+def test_exclusion_matcher_matches_like_rule_list():
+    """Test combined name patterns, backreferences and tags match as separate rules would"""
+    matcher = ExclusionMatcher({
+        "name_patterns": ["^prod-.*$", ".*-do-not-delete$", r"^(\w+)-\1$"],
+        "tags": {"Environment": "Production", "DoNotDelete": True},
+        "resource_groups": ["keep-rg"],
+    })
+    
+    def resource(name, tags=None, resource_group="rg"):
+        return Resource(f"/subscriptions/s/resourceGroups/{resource_group}/providers/t/x/{name}", name, "t", tags=tags)
+    
+    assert matcher.matches(resource("prod-web"))
+    assert matcher.matches(resource("cache-do-not-delete"))
+    assert matcher.matches(resource("echo-echo"))
+    assert not matcher.matches(resource("echo-delta"))
+    assert matcher.matches(resource("app", tags={"Environment": "Production"}))
+    assert matcher.matches(resource("app", tags={"DoNotDelete": True}))
+    assert not matcher.matches(resource("app", tags={"Environment": "Dev", "Owner": "Production"}))
+    assert matcher.matches(resource("app", resource_group="keep-rg"))
+
+
+def test_parallel_filter_matches_in_process_filtering():
+    """Test worker processes return the same partition in input order"""
+    exclusions = ExclusionMatcher({
+        "resource_types": ["Microsoft.KeyVault/vaults"],
+        "name_patterns": ["^prod-.*$"],
+        "tags": {"DoNotDelete": "true"},
+    })
+    resources = [
+        Resource(
+            f"/subscriptions/s/resourceGroups/rg/providers/Microsoft.Web/sites/app{i}",
+            f"prod-{i}" if i % 5 == 0 else f"app{i}",
+            "Microsoft.KeyVault/vaults" if i % 7 == 0 else "Microsoft.Web/sites",
+            tags={"DoNotDelete": "true"} if i % 3 == 0 else None,
+        )
+        for i in range(200)
+    ]
+    progress_bar = MagicMock()
+    
+    with ParallelFilter(exclusions, max_workers=2, threshold=50, chunk_size=30) as parallel:
+        result = filter_resources(resources, parallel, progress_bar, engine="parallel")
+        assert parallel.executor is not None
+    
+    assert result == filter_resources(resources, exclusions)
+    assert sum(call.args[0] for call in progress_bar.update.call_args_list) == len(resources)
+
+
+def test_parallel_filter_stays_in_process_below_threshold(mock_resource):
+    """Test small inventories never start the worker pool"""
+    with ParallelFilter({"resource_types": ["Microsoft.KeyVault/vaults"]}, max_workers=2) as parallel:
+        to_delete, to_preserve = parallel.filter([mock_resource])
+        assert parallel.executor is None
+    
+    assert to_delete == [mock_resource]
+    assert to_preserve == []
+
+
+def test_load_exclusions_rejects_invalid_rules(tmp_path):
+    """Test invalid patterns and unknown rule kinds fail with every problem listed"""
+    config_file = tmp_path / "exclusions.yaml"
+    config_file.write_text('name_patterns:\n  - "^prod-("\nresource_type:\n  - Microsoft.Web/sites\ntags:\n  Owner: [a, b]\n')
+    
+    with pytest.raises(ExclusionConfigError) as error:
+        load_exclusions(str(config_file))
+    
+    message = str(error.value)
+    assert "invalid name pattern '^prod-('" in message
+    assert "unknown exclusion rule 'resource_type'" in message
+    assert "tag 'Owner'" in message
+
+
+def test_load_exclusions_rejects_invalid_yaml(tmp_path):
+    """Test a file that is not valid YAML is an error, not an empty rule set"""
+    config_file = tmp_path / "exclusions.yaml"
+    config_file.write_text("resource_types: [unclosed\n")
+    
+    with pytest.raises(ExclusionConfigError):
+        load_exclusions(str(config_file))
+
+
+def test_load_exclusions_reuses_cache_until_file_changes(temp_config_file):
+    """Test unchanged files are read from the cache and edited ones parsed again"""
+    load_exclusions(str(temp_config_file))
+    
+    with patch("aznuke.src.filtering._parse_exclusions") as mock_parse:
+        exclusions = load_exclusions(str(temp_config_file))
+    mock_parse.assert_not_called()
+    assert "^prod-.*$" in exclusions["name_patterns"]
+    
+    temp_config_file.write_text("regions:\n  - eastus\n")
+    exclusions = load_exclusions(str(temp_config_file))
+    assert dict(exclusions) == {"regions": ["eastus"]}
+
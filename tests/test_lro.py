@@ -0,0 +1,230 @@
+"""
+Tests for the long-running operation manager
+"""
+import asyncio
+import email.utils
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline import PipelineResponse
+from azure.core.rest import HttpRequest
+from azure.core.utils import CaseInsensitiveDict
+
+from aznuke.src import aio
+from aznuke.src.lro import LROManager, get_lro_manager, lro_manager, retry_after
+
+STATUS_URL = "https://management.azure.com/operations/1"
+
+
+class FakeResponse:
+    """Minimal HTTP response as seen by the ARM polling methods"""
+
+    def __init__(self, request, status_code, body=None, headers=None):
+        self.request = request
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.content = json.dumps(body).encode() if body is not None else b""
+        self.reason = "OK"
+        self.content_type = "application/json"
+
+    def text(self, encoding=None):
+        return self.content.decode()
+
+    def body(self):
+        return self.content
+
+
+def pipeline_response(method, status_code, body=None, headers=None):
+    request = HttpRequest(method, STATUS_URL, headers={"x-ms-client-request-id": "request"})
+    return PipelineResponse(request, FakeResponse(request, status_code, body, headers), None)
+
+
+class FakeClient:
+    """Management client whose status link reports the given statuses in turn"""
+
+    def __init__(self, statuses, headers=None):
+        self.statuses = list(statuses)
+        self.headers = {"Retry-After": "0"} if headers is None else headers
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    def send_request(self, request, _return_pipeline_response=False, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            # Long enough for the status checks of other operations to overlap
+            time.sleep(0.005)
+            self.calls.append(time.monotonic())
+            return pipeline_response("GET", 200, {"status": self.statuses.pop(0)}, self.headers)
+        finally:
+            self.active -= 1
+
+
+class FakeAsyncClient(FakeClient):
+    async def send_request(self, request, _return_pipeline_response=False, **kwargs):
+        self.calls.append(time.monotonic())
+        return pipeline_response("GET", 200, {"status": self.statuses.pop(0)}, self.headers)
+
+
+def begin_delete(client, name, polling, retry="0"):
+    """Stand-in for a begin_delete operation accepted by ARM with a status link"""
+    headers = {"Azure-AsyncOperation": STATUS_URL}
+    if retry is not None:
+        headers["Retry-After"] = retry
+    polling.initialize(client, pipeline_response("DELETE", 202, None, headers), lambda response: name)
+    return MagicMock(name="poller")
+
+
+async def begin_delete_async(client, name, polling):
+    return begin_delete(client, name, polling)
+
+
+@pytest.mark.asyncio
+async def test_lro_manager_polls_many_operations_with_few_workers():
+    """Operations in flight share the poll loop and at most poll_workers threads"""
+    manager = LROManager(poll_workers=2, initial_interval=0.01)
+    client = FakeClient(["InProgress"] * 40 + ["Succeeded"] * 20)
+
+    futures = [await manager.begin(begin_delete, client, f"res{i}") for i in range(20)]
+    assert len(manager) == 20
+
+    results = await asyncio.wait_for(asyncio.gather(*futures), 5)
+
+    assert results == [f"res{i}" for i in range(20)]
+    assert len(client.calls) == 60
+    assert client.max_active <= 2
+    assert len(manager) == 0
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_lro_manager_sends_sync_initial_requests_off_the_loop():
+    """The first request of sync operations runs in worker threads, so operations start concurrently"""
+    manager = LROManager(initial_interval=0.01)
+    loop_thread = threading.get_ident()
+    started = threading.Barrier(2, timeout=5)
+    threads = []
+
+    def begin_concurrently(client, name, polling):
+        threads.append(threading.get_ident())
+        # Both initial requests must be in flight at once to pass
+        started.wait()
+        return begin_delete(client, name, polling)
+
+    futures = await asyncio.gather(*(manager.begin(begin_concurrently, FakeClient(["Succeeded"]), name)
+                                     for name in ("a", "b")))
+
+    assert await asyncio.wait_for(asyncio.gather(*futures), 5) == ["a", "b"]
+    assert loop_thread not in threads
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_lro_manager_polls_async_clients_on_the_loop():
+    """Async operations are awaited and polled without worker threads"""
+    manager = LROManager(initial_interval=0.01)
+    client = FakeAsyncClient(["InProgress", "Succeeded"])
+
+    future = await manager.begin(begin_delete_async, client, "res")
+
+    assert await asyncio.wait_for(future, 5) == "res"
+    assert len(client.calls) == 2
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_lro_manager_honours_retry_after():
+    """Retry-After replaces the default interval, however long that is"""
+    manager = LROManager(initial_interval=60)
+    client = FakeClient(["InProgress", "Succeeded"])
+
+    future = await manager.begin(begin_delete, client, "res", retry="0")
+
+    assert await asyncio.wait_for(future, 5) == "res"
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_lro_manager_backs_off_without_retry_after():
+    """Without Retry-After the pause grows after each check, up to max_interval"""
+    manager = LROManager(initial_interval=0.02, max_interval=0.03)
+    client = FakeClient(["InProgress"] * 3 + ["Succeeded"], headers={})
+
+    started = time.monotonic()
+    future = await manager.begin(begin_delete, client, "res", retry=None)
+    assert await asyncio.wait_for(future, 5) == "res"
+
+    times = [started] + client.calls
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    # 0.02 before the first check, then 0.02, 0.03 (1.5x) and 0.03 (capped)
+    for gap, expected in zip(gaps, [0.02, 0.02, 0.03, 0.03]):
+        assert gap >= expected * 0.9
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_lro_manager_fails_the_future_of_failed_operations():
+    """A failed operation raises from its future without affecting the others"""
+    manager = LROManager(initial_interval=0.01)
+    failing = FakeClient(["Failed"])
+    working = FakeClient(["Succeeded"])
+
+    failed = await manager.begin(begin_delete, failing, "bad")
+    succeeded = await manager.begin(begin_delete, working, "good")
+
+    with pytest.raises(HttpResponseError):
+        await asyncio.wait_for(failed, 5)
+    assert await asyncio.wait_for(succeeded, 5) == "good"
+    await manager.aclose()
+
+
+@pytest.mark.asyncio
+async def test_lro_manager_aclose_cancels_pending_operations():
+    manager = LROManager(initial_interval=60)
+    future = await manager.begin(begin_delete, FakeClient(["Succeeded"]), "res", retry=None)
+
+    await manager.aclose()
+
+    assert future.cancelled()
+    assert len(manager) == 0
+
+
+def test_retry_after_parses_seconds_milliseconds_and_dates():
+    def response(headers):
+        return pipeline_response("GET", 200, None, headers)
+
+    assert retry_after(response({"Retry-After": "5"})) == 5
+    assert retry_after(response({"retry-after-ms": "250"})) == 0.25
+    assert retry_after(response({"x-ms-retry-after-ms": "1500", "Retry-After": "9"})) == 1.5
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= retry_after(response({"Retry-After": date})) <= 30
+    assert retry_after(response({"Retry-After": "soon"})) is None
+    assert retry_after(response({})) is None
+    assert retry_after(None) is None
+
+
+@pytest.mark.asyncio
+async def test_aio_begin_uses_the_active_lro_manager():
+    """Inside lro_manager() aio.begin returns a future that aio.wait resolves"""
+    assert get_lro_manager() is None
+    client = FakeClient(["Succeeded"])
+
+    async with lro_manager() as manager:
+        assert get_lro_manager() is manager
+        handle = await aio.begin(begin_delete, client, "res")
+        assert isinstance(handle, asyncio.Future)
+        assert await asyncio.wait_for(aio.wait(handle), 5) == "res"
+
+        # Operations that ignore the polling method keep their own poller
+        poller = MagicMock()
+        poller.result.return_value = "plain"
+        legacy = await aio.begin(MagicMock(return_value=poller))
+        assert legacy is poller
+        assert await aio.wait(legacy) == "plain"
+
+    assert get_lro_manager() is None
@@ -0,0 +1,277 @@
+"""
+Tests for the Resource Graph discovery backend
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from aznuke.src.clients import subscription_tenants
+from aznuke.src.resource_graph import (
+    ResourceGraphError,
+    _retry_delay,
+    _to_resource,
+    build_changes_query,
+    build_query,
+    discover_all_resources_graph,
+    iter_incremental_resource_batches_graph,
+    query_resource_graph,
+)
+
+
+SUB_A = "00000000-0000-0000-0000-00000000000a"
+SUB_B = "00000000-0000-0000-0000-00000000000b"
+
+
+def make_row(subscription_id, name, provider_type="Microsoft.Compute/virtualMachines"):
+    """Build a Resource Graph row the way the service returns it"""
+    resource_id = f"/subscriptions/{subscription_id}/resourceGroups/test-rg/providers/{provider_type}/{name}"
+    return {
+        "id": resource_id,
+        "name": name,
+        "type": provider_type.lower(),
+        "location": "westus2",
+        "tags": {"Environment": "Test"},
+        "resourceGroup": "test-rg",
+        "subscriptionId": subscription_id,
+    }
+
+
+class FakeResourceGraph:
+    """Local HTTP server that mimics the Resource Graph resources endpoint"""
+
+    def __init__(self, rows, page_size=2, status=200, throttled=0, retry_after=None):
+        self.rows = rows
+        self.page_size = page_size
+        self.status = status
+        self.throttled = throttled
+        self.retry_after = retry_after
+        self.requests = []
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+
+                if fake.throttled:
+                    fake.throttled -= 1
+                    self.send_response(429)
+                    if fake.retry_after is not None:
+                        self.send_header("Retry-After", fake.retry_after)
+                    self.end_headers()
+                    return
+
+                if fake.status != 200:
+                    self.send_response(fake.status)
+                    self.end_headers()
+                    self.wfile.write(b'{"error": {"code": "BadRequest"}}')
+                    return
+
+                subscriptions = set(body["subscriptions"])
+                matching = [row for row in fake.rows if row["subscriptionId"] in subscriptions]
+                start = int(body["options"].get("$skipToken") or 0)
+                page = matching[start:start + fake.page_size]
+                response = {"count": len(page), "totalRecords": len(matching), "data": page}
+                if start + fake.page_size < len(matching):
+                    response["$skipToken"] = str(start + fake.page_size)
+
+                payload = json.dumps(response).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def graph_credentials():
+    """Credentials returning a static bearer token"""
+    credentials = MagicMock()
+    credentials.get_token.return_value.token = "fake-token"
+    return credentials
+
+
+def test_build_query_filters_types_case_insensitively():
+    """Test that requested types become an in~ clause before the projection"""
+    query = build_query(["Microsoft.Compute/virtualMachines", "Microsoft.Compute/virtualMachines"])
+
+    assert query == (
+        "Resources | where type in~ ('Microsoft.Compute/virtualMachines') | "
+        "project id, name, type, location, tags, resourceGroup, subscriptionId"
+    )
+
+
+def test_build_query_pushes_down_regions():
+    """Test regions are filtered inside the query"""
+    query = build_query(regions=["westus2", "eastus"])
+
+    assert "where location in~ ('westus2', 'eastus')" in query
+
+
+def test_build_query_projects_details_only_when_requested():
+    """Test detail fields are packed per type only on request"""
+    assert "details" not in build_query()
+
+    query = build_query(details=True)
+
+    assert "type =~ 'microsoft.compute/disks', pack('managed_by', managedBy)" in query
+    assert query.endswith("project id, name, type, location, tags, resourceGroup, subscriptionId, details")
+
+
+def test_query_resource_graph_follows_skip_tokens(graph_credentials):
+    """Test that all pages are fetched by following $skipToken"""
+    rows = [make_row(SUB_A, f"vm{i}") for i in range(5)]
+
+    with FakeResourceGraph(rows, page_size=2) as fake:
+        result = list(query_resource_graph(graph_credentials, [SUB_A], "Resources", endpoint=fake.endpoint))
+
+    assert [row["name"] for row in result] == [f"vm{i}" for i in range(5)]
+    assert len(fake.requests) == 3
+    assert fake.requests[0]["headers"]["Authorization"] == "Bearer fake-token"
+    assert "$skipToken" not in fake.requests[0]["body"]["options"]
+    assert fake.requests[1]["body"]["options"]["$skipToken"] == "2"
+
+
+def test_discover_all_resources_graph_batches_subscriptions(graph_credentials):
+    """Test discovery batches subscriptions and returns SDK-shaped resources"""
+    rows = [make_row(SUB_A, "vm-a"), make_row(SUB_B, "vm-b")]
+    subscriptions = [
+        MagicMock(subscription_id=SUB_A, display_name="Sub A"),
+        MagicMock(subscription_id=SUB_B, display_name="Sub B"),
+    ]
+
+    with FakeResourceGraph(rows) as fake:
+        result = discover_all_resources_graph(
+            graph_credentials, subscriptions, endpoint=fake.endpoint, batch_size=1
+        )
+
+    assert [request["body"]["subscriptions"] for request in fake.requests] == [[SUB_A], [SUB_B]]
+    assert [resource.name for resource in result] == ["vm-a", "vm-b"]
+
+    resource = result[0]
+    # The type keeps ARM casing even though Resource Graph lower-cases it
+    assert resource.type == "Microsoft.Compute/virtualMachines"
+    assert resource.id == rows[0]["id"]
+    assert resource.location == "westus2"
+    assert resource.tags == {"Environment": "Test"}
+    assert resource.resource_group == "test-rg"
+    assert resource.subscription_id == SUB_A
+    assert resource.subscription_name == "Sub A"
+
+
+def test_discover_all_resources_graph_queries_each_tenant_with_its_token():
+    """Test subscriptions of other tenants are queried separately, with a token of their tenant"""
+    credentials = MagicMock()
+    credentials.get_token.side_effect = lambda scope, tenant_id=None: MagicMock(token=f"token-{tenant_id}")
+    rows = [make_row(SUB_A, "vm-a"), make_row(SUB_B, "vm-b")]
+    subscriptions = [
+        MagicMock(subscription_id=SUB_A, display_name="Sub A", tenant_id="home-tenant"),
+        MagicMock(subscription_id=SUB_B, display_name="Sub B", tenant_id="foreign-tenant"),
+    ]
+
+    with FakeResourceGraph(rows) as fake, subscription_tenants(subscriptions):
+        result = discover_all_resources_graph(credentials, subscriptions, endpoint=fake.endpoint)
+
+    assert [resource.name for resource in result] == ["vm-a", "vm-b"]
+    assert [(request["body"]["subscriptions"], request["headers"]["Authorization"]) for request in fake.requests] == [
+        ([SUB_A], "Bearer token-home-tenant"),
+        ([SUB_B], "Bearer token-foreign-tenant"),
+    ]
+
+
+def test_discover_all_resources_graph_child_resource_type(graph_credentials):
+    """Test nested resource types are rebuilt from the resource ID"""
+    rows = [make_row(SUB_A, "vnet/subnets/default", "Microsoft.Network/virtualNetworks")]
+    rows[0]["type"] = "microsoft.network/virtualnetworks/subnets"
+    subscriptions = [MagicMock(subscription_id=SUB_A, display_name="Sub A")]
+
+    with FakeResourceGraph(rows) as fake:
+        result = discover_all_resources_graph(graph_credentials, subscriptions, endpoint=fake.endpoint)
+
+    assert result[0].type == "Microsoft.Network/virtualNetworks/subnets"
+
+
+def test_query_resource_graph_raises_on_error(graph_credentials):
+    """Test that HTTP errors surface as ResourceGraphError"""
+    with FakeResourceGraph([], status=400) as fake:
+        with pytest.raises(ResourceGraphError, match="HTTP 400"):
+            list(query_resource_graph(graph_credentials, [SUB_A], "Resources", endpoint=fake.endpoint))
+
+
+def test_query_resource_graph_retries_throttled_requests(graph_credentials, monkeypatch):
+    """Test that 429 responses are retried after Retry-After, given in seconds or as an HTTP date"""
+    delays = []
+    monkeypatch.setattr("aznuke.src.resource_graph.time.sleep", delays.append)
+    rows = [make_row(SUB_A, "vm1")]
+
+    with FakeResourceGraph(rows, throttled=1, retry_after="Wed, 21 Oct 2015 07:28:00 GMT") as fake:
+        result = list(query_resource_graph(graph_credentials, [SUB_A], "Resources", endpoint=fake.endpoint))
+    with FakeResourceGraph(rows, throttled=2, retry_after="7") as fake:
+        result += list(query_resource_graph(graph_credentials, [SUB_A], "Resources", endpoint=fake.endpoint))
+
+    assert [row["name"] for row in result] == ["vm1", "vm1"]
+    assert delays == [0.0, 7.0, 7.0]
+
+
+def test_retry_delay_falls_back_to_exponential_backoff():
+    """Test that a missing or unreadable Retry-After doubles the delay per attempt"""
+    assert _retry_delay(None, 0) == 1
+    assert _retry_delay("soon", 2) == 4
+    assert _retry_delay("3", 5) == 3.0
+
+
+def test_build_changes_query_starts_after_timestamp():
+    """Test the change history query is bounded by the snapshot time"""
+    query = build_changes_query(0)
+
+    assert query.startswith("resourcechanges")
+    assert "where changeTime > datetime(1970-01-01T00:00:00Z)" in query
+
+
+def test_incremental_batches_apply_changes(monkeypatch):
+    """Test snapshot resources are replaced, added and dropped according to the change history"""
+    kept, updated, deleted = (make_row(SUB_A, name) for name in ("vm-kept", "vm-updated", "vm-deleted"))
+    snapshot = [[_to_resource(kept), _to_resource(updated), _to_resource(deleted)]]
+    created = make_row(SUB_A, "vm-created")
+    changes = [
+        {"targetResourceId": updated["id"].upper(), "changeType": "Update"},
+        {"targetResourceId": deleted["id"], "changeType": "Delete"},
+        {"targetResourceId": created["id"], "changeType": "Create"},
+    ]
+    queries = []
+
+    def fake_pages(credentials, subscription_ids, query, endpoint=None, page_size=None):
+        queries.append(query)
+        yield [dict(updated, tags={"Environment": "Prod"}), created]
+
+    monkeypatch.setattr("aznuke.src.resource_graph.query_resource_graph", lambda *args, **kwargs: iter(changes))
+    monkeypatch.setattr("aznuke.src.resource_graph.query_resource_graph_pages", fake_pages)
+    subscription = MagicMock(subscription_id=SUB_A, display_name="Sub A")
+
+    batches = list(iter_incremental_resource_batches_graph(MagicMock(), [subscription], snapshot, since=0))
+
+    resources = [resource for batch in batches for resource in batch]
+    assert [r.name for r in resources] == ["vm-kept", "vm-updated", "vm-created"]
+    assert resources[1].tags == {"Environment": "Prod"}
+    assert resources[2].subscription_name == "Sub A"
+    assert len(queries) == 1
+    assert "where id in~" in queries[0] and "vm-deleted" not in queries[0]
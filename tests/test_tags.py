@@ -0,0 +1,65 @@
+"""
+Tests for the tags module
+"""
+import pytest
+
+from aznuke.src.filtering import ExclusionMatcher, filter_resources
+from aznuke.src.resources import Resource
+from aznuke.src.tags import TagIndex, parse_tag, select_tagged
+
+
+def make_resources():
+    return [
+        Resource(f"/subscriptions/s/resourceGroups/rg/providers/t/x/r{i}", f"r{i}", "t", tags=tags)
+        for i, tags in enumerate([
+            {"env": "prod", "owner": "ops"},
+            {"env": "prod", "owner": "dev"},
+            {"env": "dev", "DoNotDelete": True},
+            {"env": "dev", "labels": ["a", "b"]},
+            None,
+        ])
+    ]
+
+
+def test_tag_index_set_operations():
+    """Test the index answers any/all tag queries with resource IDs"""
+    resources = make_resources()
+    ids = [resource.id for resource in resources]
+    index = TagIndex(resources)
+    
+    assert index.ids("env", "prod") == {ids[0], ids[1]}
+    assert index.ids("env", "missing") == frozenset()
+    assert index.ids("labels", ["a", "b"]) == frozenset()
+    assert index.match_any({"owner": "ops", "DoNotDelete": True}) == {ids[0], ids[2]}
+    assert index.match_all({"env": "prod", "owner": "dev"}) == {ids[1]}
+    assert index.match_all({"env": "prod", "owner": "nobody"}) == set()
+
+
+def test_select_tagged_keeps_input_order():
+    """Test the --tag selector keeps only resources carrying every tag"""
+    resources = make_resources()
+    
+    assert select_tagged(resources, {"env": "prod"}) == resources[:2]
+    assert select_tagged(resources, {"env": "dev", "DoNotDelete": True}) == [resources[2]]
+
+
+def test_filter_with_tag_index_matches_per_resource_check():
+    """Test tag exclusions answered from the index give the same partition"""
+    resources = make_resources()
+    exclusions = ExclusionMatcher({"tags": {"owner": "ops", "DoNotDelete": True}, "name_patterns": ["^r4$"]})
+    
+    result = filter_resources(resources, exclusions, tag_index=TagIndex(resources))
+    
+    assert result == filter_resources(resources, exclusions)
+    assert result == ([resources[1], resources[3]], [resources[0], resources[2], resources[4]])
+
+
+def test_parse_tag():
+    """Test parsing key=value tag selectors"""
+    assert parse_tag("env=prod") == ("env", "prod")
+    assert parse_tag(" team = a=b ") == ("team", "a=b")
+    assert parse_tag("empty=") == ("empty", "")
+    with pytest.raises(ValueError):
+        parse_tag("env")
+    with pytest.raises(ValueError):
+        parse_tag("=prod")